@@ -23,3 +23,9 @@ class AudioCard(Protocol):
 
     def get_audio_filename(self) -> str:
         ...
+
+    def get_term_audio_data(self) -> Optional[bytes]:
+        ...
+
+    def get_term_audio_filename(self) -> str:
+        ...
@@ -0,0 +1,75 @@
+"""Handles to audio bytes kept either in memory or in a spill file."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+
+class AudioHandle:
+    """Reference to audio data that may live in memory or on disk."""
+
+    __slots__ = ("_data", "_path", "size")
+
+    def __init__(
+        self, *, data: Optional[bytes] = None, path: Optional[str] = None
+    ) -> None:
+        if (data is None) == (path is None):
+            raise ValueError("Either data or path is required")
+        self._data = data
+        self._path = path
+        self.size = len(data) if data is not None else os.path.getsize(str(path))
+
+    @property
+    def in_memory(self) -> bool:
+        return self._data is not None
+
+    @property
+    def path(self) -> Optional[str]:
+        """The spill file, ``None`` while the audio is held in memory."""
+        return self._path
+
+    def read(self) -> bytes:
+        if self._data is not None:
+            return self._data
+        with open(str(self._path), "rb") as fh:
+            return fh.read()
+
+
+class AudioSpool:
+    """Temporary directory holding audio for cards waiting to be saved.
+
+    Files are named by content hash, so identical audio is stored once.
+    With ``durable`` each file is synced to disk before it gets its name,
+    so a journal pointing at it never finds it truncated after a crash.
+    Call :meth:`cleanup` when the cards are no longer needed.
+    """
+
+    def __init__(
+        self, directory: Optional[str] = None, *, durable: bool = False
+    ) -> None:
+        self._owned = directory is None
+        self.durable = durable
+        self.directory = directory or tempfile.mkdtemp(prefix="german_cardgen_")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def store(self, data: bytes) -> AudioHandle:
+        """Write ``data`` to the spool and return a file-backed handle."""
+        path = os.path.join(self.directory, hashlib.sha1(data).hexdigest())
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+                if self.durable:
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            os.replace(tmp_path, path)
+        return AudioHandle(path=path)
+
+    def cleanup(self) -> None:
+        """Remove the spooled files."""
+        if self._owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,104 @@
+"""Parallel audio synthesis for batch imports."""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Optional
+
+from .audio_provider import AudioProvider
+
+
+@dataclass
+class AudioResult:
+    """Audio synthesized for one text, or the error that prevented it."""
+
+    text: str
+    data: Optional[bytes] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+class AudioSynthesisPool:
+    """Synthesize many texts with ``provider`` on a bounded worker pool.
+
+    Identical texts requested while one is still being synthesized share
+    the same request. Throttling and retries are left to the provider, see
+    ``GttsAudioProvider.scheduler``. Once ``is_cancelled`` returns ``True``
+    queued texts fail without calling the provider.
+    """
+
+    def __init__(
+        self,
+        provider: AudioProvider,
+        *,
+        workers: int = 4,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.provider = provider
+        self.workers = max(1, workers)
+        self._is_cancelled = is_cancelled
+        self._executor = ThreadPoolExecutor(self.workers)
+        # Reentrant, a future finishing before submit returns forgets itself
+        self._lock = threading.RLock()
+        self._pending: dict[str, Future[bytes]] = {}
+
+    def __enter__(self) -> AudioSynthesisPool:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def submit(self, text: str) -> Future[bytes]:
+        """Return a future resolving to the audio for ``text``."""
+        with self._lock:
+            future = self._pending.get(text)
+            if future is None:
+                future = self._executor.submit(self._synthesize, text)
+                self._pending[text] = future
+                # Handed the future as argument, a closure over it would make
+                # a cycle keeping the audio alive until the GC runs
+                future.add_done_callback(partial(self._forget, text))
+            return future
+
+    def map(self, texts: Iterable[str]) -> Iterator[AudioResult]:
+        """Yield an :class:`AudioResult` per text in input order.
+
+        Only a few texts per worker are queued ahead of the one being
+        yielded, so long inputs are consumed lazily.
+        """
+        window: deque[tuple[str, Future[bytes]]] = deque()
+        ahead = self.workers * 2
+        for text in texts:
+            window.append((text, self.submit(text)))
+            if len(window) >= ahead:
+                yield self._result(*window.popleft())
+        while window:
+            yield self._result(*window.popleft())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _synthesize(self, text: str) -> bytes:
+        if self._is_cancelled and self._is_cancelled():
+            raise RuntimeError("Cancelled")
+        return self.provider.get_audio(text)
+
+    def _forget(self, text: str, future: Future[bytes]) -> None:
+        with self._lock:
+            if self._pending.get(text) is future:
+                del self._pending[text]
+
+    @staticmethod
+    def _result(text: str, future: Future[bytes]) -> AudioResult:
+        try:
+            return AudioResult(text, data=future.result())
+        except Exception as exc:
+            return AudioResult(text, error=str(exc) or type(exc).__name__)
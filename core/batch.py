@@ -0,0 +1,373 @@
+"""Batch generation of many cards from a pasted term list."""
+
+from __future__ import annotations
+
+import csv
+import io
+import queue
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Optional
+
+from .audio_handle import AudioHandle, AudioSpool
+from .audio_pool import AudioSynthesisPool
+from .audio_provider import AudioProvider
+from .german_card import GermanCard
+from .vocab_provider import (
+    BatchVocabError,
+    BatchVocabProvider,
+    VocabItem,
+    VocabProvider,
+)
+
+if TYPE_CHECKING:
+    from .batch_journal import BatchJournal, JournalEntry
+
+ProgressCallback = Callable[[int, int], None]
+CancelCheck = Callable[[], bool]
+
+
+@dataclass
+class BatchEntry:
+    """Single term requested in a batch import."""
+
+    term: str
+    context: str = ""
+
+
+@dataclass
+class BatchResult:
+    """Outcome of generating the card for one :class:`BatchEntry`."""
+
+    index: int
+    entry: BatchEntry
+    card: Optional[GermanCard] = None
+    error: Optional[str] = None
+    # Index of the entry with the same card id whose result this shares
+    duplicate_of: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.card is not None
+
+
+def parse_batch_input(text: str) -> list[BatchEntry]:
+    """Parse one ``term;context`` entry per line.
+
+    Blank lines and lines starting with ``#`` are ignored. The context is
+    optional and may be quoted CSV-style if it contains semicolons.
+    """
+    entries = []
+    for row in csv.reader(io.StringIO(text), delimiter=";"):
+        if not row:
+            continue
+        term = row[0].strip()
+        if not term or term.startswith("#"):
+            continue
+        context = ";".join(row[1:]).strip()
+        entries.append(BatchEntry(term, context))
+    return entries
+
+
+# Audio of a finished job, or the error it failed with
+AudioOutcome = tuple[Optional[bytes], Optional[str]]
+
+
+class _CardAudio:
+    """Wait for the sentence and term audio of one card.
+
+    The outcomes are read from the future each callback is handed, the
+    futures are never kept. A callback closing over its own future would
+    make a reference cycle holding the audio until the GC runs.
+    """
+
+    def __init__(
+        self, on_ready: Callable[[AudioOutcome, AudioOutcome], None]
+    ) -> None:
+        self._on_ready: Optional[Callable[[AudioOutcome, AudioOutcome], None]]
+        self._on_ready = on_ready
+        self._lock = threading.Lock()
+        self._outcomes: dict[str, AudioOutcome] = {}
+
+    def watch(self, sentence: Future[bytes], term: Future[bytes]) -> None:
+        sentence.add_done_callback(partial(self._done, "sentence"))
+        term.add_done_callback(partial(self._done, "term"))
+
+    def _done(self, name: str, future: Future[bytes]) -> None:
+        outcome: AudioOutcome
+        if future.cancelled():
+            outcome = (None, "Cancelled")
+        elif future.exception() is not None:
+            outcome = (None, str(future.exception()) or "Cancelled")
+        else:
+            outcome = (future.result(), None)
+        with self._lock:
+            self._outcomes[name] = outcome
+            if len(self._outcomes) < 2 or self._on_ready is None:
+                return
+            on_ready, self._on_ready = self._on_ready, None
+            sentence = self._outcomes.pop("sentence")
+            term = self._outcomes.pop("term")
+        # Runs on the worker finishing last
+        on_ready(sentence, term)
+
+
+class BatchCardGenerator:
+    """Generate cards for many terms using pipelined worker pools.
+
+    Vocabulary lookups run on one pool and audio synthesis on another, so
+    the audio of finished terms is produced while later terms are still
+    waiting for the vocabulary provider. The sentence and term audio of a
+    card are synthesized in parallel. Entries that would produce the same
+    card (same card id and context) are generated once and share the
+    result. Providers implementing
+    :class:`BatchVocabProvider` receive up to ``vocab_batch_size`` terms per
+    request. With an ``audio_spool`` the audio of finished cards is moved to
+    disk, so large batches do not hold all audio in memory.
+    """
+
+    def __init__(
+        self,
+        vocab_provider: VocabProvider,
+        audio_provider: AudioProvider,
+        *,
+        vocab_workers: int = 4,
+        audio_workers: int = 4,
+        vocab_batch_size: int = 10,
+        audio_spool: Optional[AudioSpool] = None,
+    ) -> None:
+        self.vocab_provider = vocab_provider
+        self.audio_provider = audio_provider
+        self.vocab_workers = vocab_workers
+        self.audio_workers = audio_workers
+        self.vocab_batch_size = vocab_batch_size
+        self.audio_spool = audio_spool
+
+    def _fetch_vocab(self, entries: list[BatchEntry]) -> list[VocabItem]:
+        provider = self.vocab_provider
+        if len(entries) > 1 and isinstance(provider, BatchVocabProvider):
+            return provider.get_vocab_batch([(e.term, e.context) for e in entries])
+        return [provider.get_vocab(e.term, e.context) for e in entries]
+
+    def iter_results(
+        self,
+        entries: list[BatchEntry],
+        *,
+        on_progress: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[CancelCheck] = None,
+        journal: Optional[BatchJournal] = None,
+    ) -> Iterator[BatchResult]:
+        """Yield a :class:`BatchResult` per entry in completion order.
+
+        ``on_progress`` is called with ``(done, total)`` from the consuming
+        thread after every result. Once ``is_cancelled`` returns ``True`` no
+        new work is started and the remaining entries finish with an error.
+
+        With a ``journal`` of the same entries every finished stage is
+        recorded in it and stages it already recorded are skipped: saved
+        terms yield no result at all, terms with audio are rebuilt without
+        any request and terms with vocabulary only need their audio. The
+        audio then goes to the journal's spool.
+        """
+        if journal is not None and len(journal.entries) != len(entries):
+            raise ValueError("The journal belongs to different entries")
+        todo = [
+            (index, entry)
+            for index, entry in enumerate(entries)
+            if journal is None or not journal.entries[index].saved
+        ]
+        total = len(todo)
+        if on_progress:
+            on_progress(0, total)
+        if not total:
+            return
+
+        results: queue.Queue[BatchResult] = queue.Queue()
+        spool = journal.spool if journal is not None else self.audio_spool
+
+        def cancelled() -> bool:
+            return bool(is_cancelled and is_cancelled())
+
+        vocab_pool = ThreadPoolExecutor(self.vocab_workers)
+        audio_pool = AudioSynthesisPool(
+            self.audio_provider, workers=self.audio_workers, is_cancelled=cancelled
+        )
+
+        def keep(data: bytes) -> bytes | AudioHandle:
+            return spool.store(data) if spool is not None else data
+
+        def finish(
+            index: int,
+            entry: BatchEntry,
+            card: GermanCard,
+            sentence_audio: AudioOutcome,
+            term_audio: AudioOutcome,
+        ) -> None:
+            try:
+                data, error = sentence_audio
+                if data is None:
+                    raise RuntimeError(error or "Cancelled")
+                sentence = keep(data)
+                card.set_audio(sentence, self.audio_provider)
+                term: Optional[bytes | AudioHandle] = None
+                # The term audio is optional, the card is usable without it
+                if term_audio[0] is not None:
+                    term = keep(term_audio[0])
+                    card.set_term_audio(term, self.audio_provider)
+                if journal is not None:
+                    journal.record_audio(
+                        index,
+                        _as_handle(sentence),
+                        _as_handle(term) if term is not None else None,
+                    )
+                results.put(BatchResult(index, entry, card=card))
+            except Exception as exc:
+                results.put(BatchResult(index, entry, error=str(exc) or "Cancelled"))
+
+        def synthesize(index: int, entry: BatchEntry, card: GermanCard) -> None:
+            audio = _CardAudio(partial(finish, index, entry, card))
+            audio.watch(audio_pool.submit(card.sentence), audio_pool.submit(entry.term))
+
+        def continue_with(index: int, entry: BatchEntry, data: VocabItem) -> None:
+            try:
+                card = GermanCard.create_from_vocab(data, entry.context)
+                if not card.is_valid():
+                    raise ValueError("Invalid card data")
+                synthesize(index, entry, card)
+            except Exception as exc:
+                results.put(BatchResult(index, entry, error=str(exc)))
+
+        def lookup(chunk: list[tuple[int, BatchEntry]]) -> None:
+            try:
+                if cancelled():
+                    raise RuntimeError("Cancelled")
+                fetched: list[Optional[VocabItem]] = list(
+                    self._fetch_vocab([entry for _, entry in chunk])
+                )
+                errors: dict[int, Exception] = {}
+            except BatchVocabError as exc:
+                # Keep the items that were fetched, fail only the others
+                fetched, errors = exc.items, exc.errors
+            except Exception as exc:
+                for index, entry in chunk:
+                    results.put(BatchResult(index, entry, error=str(exc)))
+                return
+            if len(fetched) > len(chunk):
+                # The items can't be matched to the terms anymore
+                mismatch = (
+                    f"The provider returned {len(fetched)} items for {len(chunk)}"
+                )
+                for index, entry in chunk:
+                    results.put(BatchResult(index, entry, error=mismatch))
+                return
+            returned = len(fetched)
+            fetched += [None] * (len(chunk) - returned)
+            for position, ((index, entry), data) in enumerate(zip(chunk, fetched)):
+                if data is None and position >= returned:
+                    # Left out by the provider, ask for this term alone
+                    try:
+                        data = self.vocab_provider.get_vocab(entry.term, entry.context)
+                    except Exception as exc:
+                        results.put(BatchResult(index, entry, error=str(exc)))
+                        continue
+                if data is None:
+                    error = errors.get(position, "No vocabulary returned")
+                    results.put(BatchResult(index, entry, error=str(error)))
+                    continue
+                if journal is not None:
+                    try:
+                        journal.record_vocab(index, data)
+                    except Exception as exc:
+                        results.put(BatchResult(index, entry, error=str(exc)))
+                        continue
+                continue_with(index, entry, data)
+
+        # Only the first entry of each card id goes through the pipeline
+        leaders: dict[tuple[str, str], int] = {}
+        duplicates: dict[int, list[tuple[int, BatchEntry]]] = {}
+        unique = []
+        for index, entry in todo:
+            key = GermanCard.unique_id_for_term(entry.term)[1], entry.context
+            leader = leaders.setdefault(key, index)
+            if leader == index:
+                unique.append((index, entry))
+            else:
+                duplicates.setdefault(leader, []).append((index, entry))
+
+        try:
+            lookups = []
+            for index, entry in unique:
+                state = journal.entries[index] if journal is not None else None
+                if state is None or state.vocab is None:
+                    lookups.append((index, entry))
+                elif state.sentence_audio is not None:
+                    results.put(_restored(index, entry, state, self.audio_provider))
+                else:
+                    continue_with(index, entry, state.vocab)
+            batch_size = 1
+            if isinstance(self.vocab_provider, BatchVocabProvider):
+                batch_size = max(1, self.vocab_batch_size)
+            for start in range(0, len(lookups), batch_size):
+                vocab_pool.submit(lookup, lookups[start:start + batch_size])
+            done = 0
+            while done < total:
+                result = results.get()
+                shared = [
+                    BatchResult(
+                        index,
+                        entry,
+                        card=result.card,
+                        error=result.error,
+                        duplicate_of=result.index,
+                    )
+                    for index, entry in duplicates.get(result.index, [])
+                ]
+                for batch_result in [result] + shared:
+                    done += 1
+                    yield batch_result
+                    if on_progress:
+                        on_progress(done, total)
+        finally:
+            vocab_pool.shutdown(wait=True, cancel_futures=True)
+            audio_pool.close()
+
+    def generate(
+        self,
+        entries: list[BatchEntry],
+        *,
+        on_progress: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[CancelCheck] = None,
+    ) -> list[BatchResult]:
+        """Return results for all entries in input order."""
+        results = list(
+            self.iter_results(
+                entries, on_progress=on_progress, is_cancelled=is_cancelled
+            )
+        )
+        return sorted(results, key=lambda r: r.index)
+
+
+def _as_handle(audio: bytes | AudioHandle) -> AudioHandle:
+    return audio if isinstance(audio, AudioHandle) else AudioHandle(data=audio)
+
+
+def _restored(
+    index: int,
+    entry: BatchEntry,
+    state: JournalEntry,
+    audio_provider: AudioProvider,
+) -> BatchResult:
+    """Rebuild a card whose vocabulary and audio a journal recorded."""
+    try:
+        card = GermanCard.create_from_vocab(
+            state.vocab or VocabItem(), entry.context
+        )
+        card.set_audio(state.sentence_audio or b"", audio_provider)
+        if state.term_audio is not None:
+            card.set_term_audio(state.term_audio, audio_provider)
+    except Exception as exc:
+        return BatchResult(index, entry, error=str(exc))
+    return BatchResult(index, entry, card=card)
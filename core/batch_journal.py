@@ -0,0 +1,218 @@
+"""Durable journal of a batch job, so an interrupted job can be resumed."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from .audio_handle import AudioHandle, AudioSpool
+from .batch import BatchEntry
+from .vocab_provider import VocabItem
+
+# The stages a term passes through, in order
+PENDING = "pending"
+VOCAB_DONE = "vocab"
+AUDIO_DONE = "audio"
+SAVED = "saved"
+
+JOURNAL_FILE = "journal.jsonl"
+AUDIO_DIR = "audio"
+
+
+@dataclass
+class JournalEntry:
+    """State of one term of a job, as far as the journal recorded it."""
+
+    entry: BatchEntry
+    state: str = PENDING
+    vocab: Optional[VocabItem] = None
+    sentence_audio: Optional[AudioHandle] = None
+    term_audio: Optional[AudioHandle] = None
+
+    @property
+    def saved(self) -> bool:
+        return self.state == SAVED
+
+
+class BatchJournal:
+    """Append-only record of the progress of a batch job in ``directory``.
+
+    Each finished stage of a term is appended to ``journal.jsonl`` as a
+    JSON line and synced to disk before the job moves on, so paid
+    vocabulary responses and synthesized audio survive a crash. The audio
+    itself is kept in the job's own durable :class:`AudioSpool`. Opening the
+    directory again replays the journal; a line cut short by a crash is
+    ignored and that stage is simply done again.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, JOURNAL_FILE)
+        self.spool = AudioSpool(os.path.join(directory, AUDIO_DIR), durable=True)
+        self.deck_id: Any = None
+        self.created = 0.0
+        self.entries: list[JournalEntry] = []
+        self._lock = threading.Lock()
+        self._replay()
+
+    @classmethod
+    def create(
+        cls, jobs_dir: str, entries: list[BatchEntry], deck_id: Any
+    ) -> BatchJournal:
+        """Start a new job for ``entries`` in a new directory of ``jobs_dir``."""
+        created = time.time()
+        directory = os.path.join(jobs_dir, f"job_{int(created * 1000)}")
+        suffix = 0
+        while os.path.exists(directory):
+            suffix += 1
+            directory = os.path.join(jobs_dir, f"job_{int(created * 1000)}_{suffix}")
+        os.makedirs(directory)
+        journal = cls(directory)
+        journal._append({
+            "op": "job",
+            "created": created,
+            "deck_id": deck_id,
+            "entries": [[e.term, e.context] for e in entries],
+        })
+        journal.created = created
+        journal.deck_id = deck_id
+        journal.entries = [JournalEntry(entry) for entry in entries]
+        return journal
+
+    @property
+    def batch_entries(self) -> list[BatchEntry]:
+        return [state.entry for state in self.entries]
+
+    @property
+    def saved(self) -> int:
+        return sum(1 for entry in self.entries if entry.saved)
+
+    @property
+    def complete(self) -> bool:
+        return all(entry.saved for entry in self.entries)
+
+    def record_vocab(self, index: int, vocab: VocabItem) -> None:
+        """Record the vocabulary fetched for the term at ``index``."""
+        self._append({"op": VOCAB_DONE, "i": index, "vocab": asdict(vocab)})
+        with self._lock:
+            entry = self.entries[index]
+            entry.vocab = vocab
+            entry.state = VOCAB_DONE
+
+    def record_audio(
+        self, index: int, sentence: AudioHandle, term: Optional[AudioHandle]
+    ) -> None:
+        """Record the audio of the term at ``index``, stored in :attr:`spool`."""
+        self._append({
+            "op": AUDIO_DONE,
+            "i": index,
+            "sentence": self._spool_name(sentence),
+            "term": self._spool_name(term) if term is not None else None,
+        })
+        with self._lock:
+            entry = self.entries[index]
+            entry.sentence_audio = sentence
+            entry.term_audio = term
+            entry.state = AUDIO_DONE
+
+    def record_saved(self, indices: list[int]) -> None:
+        """Record that the notes of the terms at ``indices`` were added."""
+        if not indices:
+            return
+        self._append({"op": SAVED, "i": indices})
+        with self._lock:
+            for index in indices:
+                self.entries[index].state = SAVED
+
+    def remove(self) -> None:
+        """Delete the journal and the spooled audio of the job."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _spool_name(self, handle: AudioHandle) -> str:
+        if handle.path is None or os.path.dirname(handle.path) != self.spool.directory:
+            handle = self.spool.store(handle.read())
+        return os.path.basename(str(handle.path))
+
+    def _append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def _replay(self) -> None:
+        try:
+            with open(self.path, "rb") as fh:
+                content = fh.read()
+        except FileNotFoundError:
+            return
+        complete = content.rfind(b"\n") + 1
+        if complete < len(content):
+            # Drop the torn last line, new records must start on a fresh line
+            with open(self.path, "r+b") as fh:
+                fh.truncate(complete)
+        for line in content[:complete].decode("utf-8", "replace").splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, IndexError, TypeError):
+                continue
+
+    def _apply(self, record: dict[str, Any]) -> None:
+        op = record["op"]
+        if op == "job":
+            self.created = float(record["created"])
+            self.deck_id = record["deck_id"]
+            self.entries = [
+                JournalEntry(BatchEntry(term, context))
+                for term, context in record["entries"]
+            ]
+        elif op == VOCAB_DONE:
+            entry = self.entries[record["i"]]
+            entry.vocab = VocabItem(**record["vocab"])
+            entry.state = VOCAB_DONE
+        elif op == AUDIO_DONE:
+            entry = self.entries[record["i"]]
+            sentence = self._spooled(record["sentence"])
+            # Without its audio file the term falls back to the vocab stage
+            if entry.vocab is None or sentence is None:
+                return
+            entry.sentence_audio = sentence
+            entry.term_audio = self._spooled(record["term"]) if record["term"] else None
+            entry.state = AUDIO_DONE
+        elif op == SAVED:
+            for index in record["i"]:
+                self.entries[index].state = SAVED
+
+    def _spooled(self, name: str) -> Optional[AudioHandle]:
+        path = os.path.join(self.spool.directory, os.path.basename(name))
+        if not os.path.isfile(path):
+            return None
+        return AudioHandle(path=path)
+
+
+def find_unfinished(jobs_dir: str) -> list[BatchJournal]:
+    """Return the jobs in ``jobs_dir`` with unsaved terms, oldest first.
+
+    Job directories without any readable journal are removed.
+    """
+    try:
+        names = sorted(os.listdir(jobs_dir))
+    except FileNotFoundError:
+        return []
+    journals = []
+    for name in names:
+        directory = os.path.join(jobs_dir, name)
+        if not os.path.isdir(directory):
+            continue
+        journal = BatchJournal(directory)
+        if not journal.entries or journal.complete:
+            journal.remove()
+            continue
+        journals.append(journal)
+    return sorted(journals, key=lambda journal: journal.created)
@@ -0,0 +1,133 @@
+"""Content-addressed on-disk cache for :class:`AudioProvider` results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Optional
+
+from .audio_provider import AudioProvider
+from .single_flight import SingleFlight
+from .tracing import span
+
+
+class CachedAudioProvider:
+    """Wrap an :class:`AudioProvider` and store its audio on disk.
+
+    Files are named by a hash of ``namespace`` (engine and language, see
+    ``GttsAudioProvider.cache_namespace``) and the normalized text, so the
+    same sentence is synthesized only once regardless of the card it
+    belongs to. Concurrent misses for the same normalized text share one
+    synthesis. When the directory grows beyond ``max_bytes`` the least
+    recently used files are removed.
+    """
+
+    _SUFFIX = ".audio"
+
+    def __init__(
+        self,
+        provider: AudioProvider,
+        directory: str,
+        *,
+        namespace: str = "",
+        max_bytes: int = 200 * 1024 * 1024,
+    ) -> None:
+        self.provider = provider
+        self.directory = directory
+        self.namespace = namespace
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._flights: SingleFlight[str, bytes] = SingleFlight()
+        os.makedirs(directory, exist_ok=True)
+        # file name -> (size, last access)
+        self._index: dict[str, tuple[int, float]] = {}
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.name.endswith(self._SUFFIX):
+                stat = entry.stat()
+                self._index[entry.name] = (stat.st_size, stat.st_mtime)
+        self._total = sum(size for size, _ in self._index.values())
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Return ``text`` with Unicode and whitespace differences removed."""
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+    def _file_name(self, text: str) -> str:
+        raw = json.dumps([self.namespace, self.normalize(text)], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest() + self._SUFFIX
+
+    def _load(self, name: str) -> Optional[bytes]:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            previous = self._index.get(name)
+            self._total += len(data) - (previous[0] if previous else 0)
+            self._index[name] = (len(data), now)
+        return data
+
+    def _store(self, name: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except OSError:
+            # Caching is best effort, the audio itself is still returned
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            previous = self._index.get(name)
+            if previous:
+                self._total -= previous[0]
+            self._index[name] = (len(data), time.time())
+            self._total += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        for name, (size, _) in sorted(self._index.items(), key=lambda i: i[1][1]):
+            if self._total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self._index[name]
+            self._total -= size
+
+    def get_audio(self, text: str) -> bytes:
+        """Return cached audio for ``text``, synthesizing it on a miss."""
+        with span("audio.cache") as current:
+            name = self._file_name(text)
+            data = self._load(name)
+            current.set(hit=data is not None)
+            if data is None:
+                data = self._flights.do(name, lambda: self._synthesize(name, text))
+        return data
+
+    def _synthesize(self, name: str, text: str) -> bytes:
+        data = self.provider.get_audio(text)
+        self._store(name, data)
+        return data
+
+    def get_file_name(self, base: str) -> str:
+        return self.provider.get_file_name(base)
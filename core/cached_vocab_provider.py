@@ -0,0 +1,311 @@
+"""Persistent SQLite-backed cache for :class:`VocabProvider` results."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict
+from typing import Callable, Optional
+
+from .single_flight import SingleFlight
+from .tracing import span
+from .vocab_provider import (
+    BatchVocabError,
+    BatchVocabProvider,
+    StreamingVocabProvider,
+    VocabItem,
+    VocabProvider,
+)
+
+
+class CachedVocabProvider:
+    """Wrap a :class:`VocabProvider` and remember its answers on disk.
+
+    Entries are keyed by term, context and ``namespace``. The namespace
+    should identify everything else that shapes the answer (language,
+    model, prompt templates), see ``OpenaiVocabProvider.cache_namespace``.
+    Entries older than ``ttl_seconds`` are ignored and the least recently
+    used entries are evicted once more than ``max_entries`` are stored.
+
+    Misses are coalesced: while the provider is asked for a term, callers
+    asking for a term that ``normalize`` maps to the same value (with the
+    same context) wait for that answer instead of paying for their own.
+    """
+
+    def __init__(
+        self,
+        provider: VocabProvider,
+        path: str,
+        *,
+        namespace: str = "",
+        max_entries: int = 20000,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+        normalize: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        self.provider = provider
+        self.normalize = normalize
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flights: SingleFlight[tuple[str, str, bool], VocabItem] = SingleFlight()
+        self._closed = False
+        # Batch workers share one connection, access is serialized by _lock.
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS vocab ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS vocab_accessed ON vocab (accessed)"
+            )
+
+    def close(self) -> None:
+        """Close the database; later calls go straight to the provider.
+
+        Safe while lookups are still running on other threads, they just
+        stop using the cache.
+        """
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._db.close()
+
+    def _key(self, term: str, context: str) -> str:
+        raw = json.dumps([self.namespace, term, context], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _flight_key(
+        self, term: str, context: str, refresh: bool = False
+    ) -> tuple[str, str, bool]:
+        # A refresh must not be served the answer it is meant to replace
+        return self.normalize(term) if self.normalize else term, context, refresh
+
+    def _load(self, key: str) -> Optional[VocabItem]:
+        now = self._clock()
+        with self._lock:
+            if self._closed:
+                return None
+            return self._load_locked(key, now)
+
+    def _load_locked(self, key: str, now: float) -> Optional[VocabItem]:
+        with self._db:
+            row = self._db.execute(
+                "SELECT value, created FROM vocab WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._db.execute("DELETE FROM vocab WHERE key = ?", (key,))
+                return None
+            self._db.execute(
+                "UPDATE vocab SET accessed = ? WHERE key = ?", (now, key)
+            )
+        return VocabItem(**json.loads(value))
+
+    def _store(self, key: str, item: VocabItem) -> None:
+        now = self._clock()
+        value = json.dumps(asdict(item), ensure_ascii=False)
+        with self._lock:
+            if self._closed:
+                return
+            self._store_locked(key, value, now)
+
+    def _store_locked(self, key: str, value: str, now: float) -> None:
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO vocab (key, value, created, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM vocab WHERE key IN (SELECT key FROM vocab "
+                "ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def get_vocab(
+        self,
+        term: str,
+        context: str = "",
+        *,
+        refresh: bool = False,
+        store: bool = True,
+    ) -> VocabItem:
+        """Return the cached item, asking the provider on a miss.
+
+        With ``refresh`` the cache is not consulted but the fresh answer
+        replaces any stored one. Without ``store`` the answer is not cached
+        and not shared with other callers, see :meth:`remember`.
+        """
+        with span("vocab.cache") as current:
+            key = self._key(term, context)
+            if not refresh:
+                cached = self._load(key)
+                current.set(hit=cached is not None)
+                if cached is not None:
+                    return cached
+            asked = False
+
+            def fetch() -> VocabItem:
+                nonlocal asked
+                asked = True
+                item = self.provider.get_vocab(term, context)
+                if store:
+                    self._store(key, item)
+                return item
+
+            if store:
+                flight_key = self._flight_key(term, context, refresh)
+                item = self._flights.do(flight_key, fetch)
+            else:
+                item = fetch()
+            current.set(shared=not asked)
+        return item
+
+    def get_vocab_stream(
+        self,
+        term: str,
+        context: str,
+        on_update: Callable[[VocabItem], None],
+        *,
+        refresh: bool = False,
+        store: bool = True,
+    ) -> VocabItem:
+        """Stream the answer on a miss, report a cached one in one update."""
+        key = self._key(term, context)
+        if not refresh:
+            cached = self._load(key)
+            if cached is not None:
+                on_update(cached)
+                return cached
+        streamed = False
+
+        def fetch() -> VocabItem:
+            nonlocal streamed
+            streamed = True
+            if isinstance(self.provider, StreamingVocabProvider):
+                item = self.provider.get_vocab_stream(term, context, on_update)
+            else:
+                item = self.provider.get_vocab(term, context)
+                on_update(item)
+            if store:
+                self._store(key, item)
+            return item
+
+        if not store:
+            return fetch()
+        item = self._flights.do(self._flight_key(term, context, refresh), fetch)
+        if not streamed:
+            # Another caller streamed it, report the finished item at once
+            on_update(item)
+        return item
+
+    def get_vocab_batch(self, items: list[tuple[str, str]]) -> list[VocabItem]:
+        """Serve cached items and look up only the misses.
+
+        Misses normalizing to the same term are requested once.
+        """
+        keys = [self._key(term, context) for term, context in items]
+        results = [self._load(key) for key in keys]
+        # Flight key -> indices of the items waiting for it
+        missing: dict[tuple[str, str, bool], list[int]] = {}
+        for i, item in enumerate(results):
+            if item is None:
+                missing.setdefault(self._flight_key(*items[i]), []).append(i)
+        errors: dict[int, Exception] = {}
+        if missing:
+            first = [indices[0] for indices in missing.values()]
+            requested = [items[i] for i in first]
+            fetched: list[Optional[VocabItem]]
+            try:
+                if isinstance(self.provider, BatchVocabProvider):
+                    fetched = list(self.provider.get_vocab_batch(requested))
+                else:
+                    fetched = [self.provider.get_vocab(t, c) for t, c in requested]
+            except BatchVocabError as exc:
+                fetched = exc.items
+                for position, error in exc.errors.items():
+                    for i in list(missing.values())[position]:
+                        errors[i] = error
+            if len(fetched) != len(requested):
+                raise ValueError(
+                    f"The provider returned {len(fetched)} items "
+                    f"for {len(requested)} terms"
+                )
+            for indices, item in zip(missing.values(), fetched):
+                if item is None:
+                    continue
+                self._store(keys[indices[0]], item)
+                for i in indices:
+                    results[i] = item
+        if errors:
+            # The fetched items are cached, the caller learns which failed
+            raise BatchVocabError(results, errors)
+        # Every position is filled now, the result stays aligned with items
+        complete = []
+        for item in results:
+            if item is None:
+                raise ValueError("The provider returned no item for a term")
+            complete.append(item)
+        return complete
+
+    def remember(self, term: str, context: str, item: VocabItem) -> None:
+        """Cache ``item`` as the answer for ``term`` in ``context``."""
+        self._store(self._key(term, context), item)
+
+    def refreshing(self, *, store: bool = True) -> RefreshingVocabProvider:
+        """Return a provider view that bypasses cached answers.
+
+        Without ``store`` the fresh answers are held back until
+        :meth:`RefreshingVocabProvider.commit`, for speculative lookups
+        whose answer may never be used.
+        """
+        return RefreshingVocabProvider(self, store=store)
+
+
+class RefreshingVocabProvider:
+    """View of a :class:`CachedVocabProvider` always asking the provider."""
+
+    def __init__(self, cache: CachedVocabProvider, *, store: bool = True) -> None:
+        self._cache = cache
+        self._store = store
+        self._lock = threading.Lock()
+        self._held: list[tuple[str, str, VocabItem]] = []
+
+    def get_vocab(self, term: str, context: str = "") -> VocabItem:
+        item = self._cache.get_vocab(term, context, refresh=True, store=self._store)
+        self._hold(term, context, item)
+        return item
+
+    def get_vocab_stream(
+        self,
+        term: str,
+        context: str,
+        on_update: Callable[[VocabItem], None],
+    ) -> VocabItem:
+        item = self._cache.get_vocab_stream(
+            term, context, on_update, refresh=True, store=self._store
+        )
+        self._hold(term, context, item)
+        return item
+
+    def commit(self) -> None:
+        """Cache the answers held back so far."""
+        with self._lock:
+            held, self._held = self._held, []
+        for term, context, item in held:
+            self._cache.remember(term, context, item)
+
+    def _hold(self, term: str, context: str, item: VocabItem) -> None:
+        if not self._store:
+            with self._lock:
+                self._held.append((term, context, item))
@@ -0,0 +1,56 @@
+"""Process-wide cache of the card templates shipped in ``templates/``."""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "..", "templates")
+
+
+@dataclass(frozen=True)
+class CardTemplate:
+    """Front, back and style of a card template."""
+
+    front: str
+    back: str
+    style: str
+
+
+class TemplateCache:
+    """Load each template once and share it between all cards.
+
+    Edited template files are only picked up after ``clear`` is called,
+    which in Anki means after a restart.
+    """
+
+    _FILES = ("front.html", "back.html", "style.css")
+
+    def __init__(self, directory: str = TEMPLATES_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._templates: dict[str, CardTemplate] = {}
+
+    def get(self, name: str) -> CardTemplate:
+        """Return the template stored in the ``name`` folder."""
+        with self._lock:
+            cached = self._templates.get(name)
+        if cached is not None:
+            return cached
+
+        paths = [os.path.join(self.directory, name, f) for f in self._FILES]
+        front, back, style = (self._read(path) for path in paths)
+        template = CardTemplate(front=front, back=back, style=style)
+        with self._lock:
+            self._templates[name] = template
+        return template
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, encoding="utf-8") as fh:
+            return fh.read()
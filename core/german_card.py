@@ -1,14 +1,32 @@
 from __future__ import annotations
 
-import os
 import re
-from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
 
+from .audio_handle import AudioHandle, AudioSpool
 from .audio_provider import AudioProvider
-from .vocab_provider import VocabProvider
+from .card_templates import TemplateCache
+from .tracing import span
+from .vocab_provider import StreamingVocabProvider, VocabItem, VocabProvider
 
 
 class GermanCard:
+    # Batches keep thousands of pending cards, slots keep each one small
+    __slots__ = (
+        "_id",
+        "term",
+        "context",
+        "_audio",
+        "_audio_filename",
+        "_term_audio",
+        "_term_audio_filename",
+        "sentence",
+        "term_translation",
+        "sentence_translation",
+        "_template",
+    )
+
     _UMLAUTS = {
         'ä': 'ae',
         'ö': 'oe',
@@ -17,6 +35,7 @@ class GermanCard:
     }
 
     CARD_TEMPLATE_DEFAULT = "german_card_default"
+    templates = TemplateCache()
 
     def __init__(
         self,
@@ -27,33 +46,30 @@ class GermanCard:
         self._id = self._gen_id(term)
         self.term = term
         self.context = context
-        self._audio_data: Optional[bytes] = None
+        self._audio: Optional[AudioHandle] = None
         self._audio_filename = ""
+        self._term_audio: Optional[AudioHandle] = None
+        self._term_audio_filename = ""
         self.sentence = ""
         self.term_translation = ""
         self.sentence_translation = ""
 
-        #Load templates
-        templates_dir = os.path.join(
-            os.path.dirname(__file__), "..", "templates", template
-        )
-        self._front_template = self._load_template(templates_dir, "front.html")
-        self._back_template = self._load_template(templates_dir, "back.html")
-        self._style_template = self._load_template(templates_dir, "style.css")
-
-    @staticmethod
-    def _load_template(directory: str, filename: str) -> str:
-        path = os.path.join(directory, filename)
-        with open(path, encoding="utf-8") as fh:
-            return fh.read()
-
-    def _gen_id(self, term: str) -> str:
+        # Shared with all other cards using the same template
+        self._template = self.templates.get(template)
+
+    @classmethod
+    def unique_id_for_term(cls, term: str) -> tuple[str, str]:
+        """Return the unique identifier a card for ``term`` would get."""
+        return "id", cls._gen_id(term)
+
+    @classmethod
+    def _gen_id(cls, term: str) -> str:
         """Generate ID based on term value by converting to lowercase and
         replacing spaces with underscores"""
         # Convert to lowercase and replace spaces with underscores
         id_base = term.lower().replace(' ', '_')
         # Replace German umlauts with their ASCII equivalents
-        for umlaut, replacement in self._UMLAUTS.items():
+        for umlaut, replacement in cls._UMLAUTS.items():
             id_base = id_base.replace(umlaut, replacement)
         # Remove any remaining special characters and keep only alphanumeric
         # and underscores
@@ -70,6 +86,10 @@ class GermanCard:
             audio_field = f"[sound:{self._audio_filename}]"
         else:
             audio_field = ""
+        if self._term_audio_filename:
+            term_audio_field = f"[sound:{self._term_audio_filename}]"
+        else:
+            term_audio_field = ""
         return {
             "id": self._id,
             "term": self.term,
@@ -78,21 +98,28 @@ class GermanCard:
             "term_translation": self.term_translation,
             "sentence_translation": self.sentence_translation,
             "context": self.context,
+            "term_audio": term_audio_field,
         }
 
     def get_template(self) -> dict[str, str]:
         return {
-            "qfmt": self._front_template,
-            "afmt": self._back_template,
-            "css": self._style_template,
+            "qfmt": self._template.front,
+            "afmt": self._template.back,
+            "css": self._template.style,
         }
 
     def get_audio_data(self) -> Optional[bytes]:
-        return self._audio_data
+        return self._audio.read() if self._audio else None
 
     def get_audio_filename(self) -> str:
         return self._audio_filename
 
+    def get_term_audio_data(self) -> Optional[bytes]:
+        return self._term_audio.read() if self._term_audio else None
+
+    def get_term_audio_filename(self) -> str:
+        return self._term_audio_filename
+
     @classmethod
     def create_from_user_input(
         cls,
@@ -100,17 +127,123 @@ class GermanCard:
         context: str,
         vocab_provider: VocabProvider,
         audio_provider: AudioProvider,
+        on_update: Optional[Callable[[VocabItem], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
     ) -> GermanCard:
-        """Create a card using vocabulary data from ``vocab_provider``."""
+        """Create a card using vocabulary data from ``vocab_provider``.
+
+        Audio for the term as typed by the user is synthesized while waiting
+        for the vocabulary data. With a :class:`StreamingVocabProvider` the
+        sentence audio starts as soon as the sentence is complete and partial
+        data is passed to ``on_update``. Once ``is_cancelled`` returns
+        ``True`` the stream is abandoned, no further audio is synthesized and
+        ``RuntimeError`` is raised without waiting for running audio jobs.
+        """
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            with span("card.generate"):
+                return cls._create_from_user_input(
+                    pool,
+                    term,
+                    context,
+                    vocab_provider,
+                    audio_provider,
+                    on_update,
+                    is_cancelled,
+                )
+        finally:
+            # Everything needed was awaited, only abandoned jobs may be left
+            pool.shutdown(wait=False, cancel_futures=True)
 
-        data = vocab_provider.get_vocab(term, context)
+    @classmethod
+    def _create_from_user_input(
+        cls,
+        pool: ThreadPoolExecutor,
+        term: str,
+        context: str,
+        vocab_provider: VocabProvider,
+        audio_provider: AudioProvider,
+        on_update: Optional[Callable[[VocabItem], None]],
+        is_cancelled: Optional[Callable[[], bool]],
+    ) -> GermanCard:
+        term_audio = pool.submit(audio_provider.get_audio, term)
+        sentence_audio: Optional[Future[bytes]] = None
+        streamed_sentence = ""
+
+        def check_cancelled() -> None:
+            if is_cancelled and is_cancelled():
+                raise RuntimeError("Cancelled")
+
+        def handle_update(partial: VocabItem) -> None:
+            nonlocal sentence_audio, streamed_sentence
+            # Raising stops reading the stream
+            check_cancelled()
+            if partial.sentence and sentence_audio is None:
+                streamed_sentence = partial.sentence
+                sentence_audio = pool.submit(audio_provider.get_audio, partial.sentence)
+            if on_update:
+                on_update(partial)
+
+        check_cancelled()
+        if isinstance(vocab_provider, StreamingVocabProvider):
+            data = vocab_provider.get_vocab_stream(term, context, handle_update)
+        else:
+            data = vocab_provider.get_vocab(term, context)
+        check_cancelled()
+        card = cls.create_from_vocab(data, context)
+        if sentence_audio is not None and streamed_sentence == card.sentence:
+            card.set_audio(sentence_audio.result(), audio_provider)
+        else:
+            card.attach_audio(audio_provider)
+        check_cancelled()
+        try:
+            card.set_term_audio(term_audio.result(), audio_provider)
+        except Exception:
+            # The term audio is optional, the card is usable without it
+            pass
+        return card
+
+    @classmethod
+    def create_from_vocab(cls, data: VocabItem, context: str) -> GermanCard:
+        """Create a card without audio from already fetched vocabulary data."""
         card = cls(data.term, context)
         card.sentence = data.sentence
         card.term_translation = data.term_translation
         card.sentence_translation = data.sentence_translation
-
-        card._audio_data = audio_provider.get_audio(card.sentence)
-        card._audio_filename = audio_provider.get_file_name(card._id)
-
         return card
 
+    def attach_audio(self, audio_provider: AudioProvider) -> None:
+        """Synthesize the sentence audio using ``audio_provider``."""
+        self.set_audio(audio_provider.get_audio(self.sentence), audio_provider)
+
+    def set_audio(
+        self, data: bytes | AudioHandle, audio_provider: AudioProvider
+    ) -> None:
+        """Use already synthesized sentence audio from ``audio_provider``."""
+        if not isinstance(data, AudioHandle):
+            data = AudioHandle(data=data)
+        self._audio = data
+        self._audio_filename = audio_provider.get_file_name(self._id)
+
+    def attach_term_audio(self, audio_provider: AudioProvider, text: str) -> None:
+        """Synthesize the term audio for ``text`` using ``audio_provider``."""
+        self.set_term_audio(audio_provider.get_audio(text), audio_provider)
+
+    def set_term_audio(
+        self, data: bytes | AudioHandle, audio_provider: AudioProvider
+    ) -> None:
+        """Use already synthesized term audio from ``audio_provider``."""
+        if not isinstance(data, AudioHandle):
+            data = AudioHandle(data=data)
+        self._term_audio = data
+        # "-" never occurs in ids, so this cannot be another term's sentence
+        self._term_audio_filename = audio_provider.get_file_name(f"{self._id}-term")
+
+    def spill_audio(self, spool: AudioSpool) -> None:
+        """Move audio held in memory to ``spool``, keeping only file handles."""
+        if self._audio is not None and self._audio.in_memory:
+            self._audio = spool.store(self._audio.read())
+        if self._term_audio is not None and self._term_audio.in_memory:
+            self._term_audio = spool.store(self._term_audio.read())
+
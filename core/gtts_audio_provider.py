@@ -2,30 +2,69 @@
 
 from __future__ import annotations
 
+import base64
 import io
-import os
-from typing import Any, Optional
+import re
+import threading
+import urllib.parse
+import urllib.request
+from collections.abc import Iterator
+from typing import Any, Callable, Optional
+
+from .request_scheduler import HostScheduler, RequestScheduler
+from .tracing import span
+from .vendor import add_vendor_to_path
+
+# Mirrors gTTS.stream of the gTTS versions allowed by requirements.txt
+_AUDIO_PATTERN = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
 
 
 class GttsAudioProvider:
-    """Retrieve audio data using the gTTS library."""
+    """Retrieve audio data using the gTTS library.
 
-    def __init__(self, lang: str, *, gtts_factory: Optional[Any] = None) -> None:
-        if gtts_factory is None:
-            # Try to import from bundled vendor directory first
-            # This mirrors the approach used for the OpenAI provider and allows
-            # the addon to work without requiring users to install dependencies.
-            try:
-                import sys
+    When ``requests`` is available the gTTS requests are sent through a
+    session kept per thread, so consecutive calls reuse the same keep-alive
+    connection instead of gTTS opening a new session per request. This
+    relies on the request preparation of the pinned gTTS version; gTTS
+    objects without it are synthesized through the public ``write_to_fp``.
 
-                addon_dir = os.path.dirname(os.path.dirname(__file__))
-                vendor_dir = os.path.join(addon_dir, "vendor")
+    Every request goes through ``scheduler``, which throttles each host
+    separately and retries transient failures. The provider is thread
+    safe, so many texts can be synthesized in parallel, see
+    :class:`~core.audio_pool.AudioSynthesisPool`.
+    """
 
-                if os.path.exists(vendor_dir) and vendor_dir not in sys.path:
-                    sys.path.insert(0, vendor_dir)
+    @staticmethod
+    def default_scheduler(
+        requests_per_minute: int = 300, max_concurrency: int = 4
+    ) -> HostScheduler:
+        """Return a polite per-host scheduler for the Google endpoints."""
+        return HostScheduler(
+            lambda: RequestScheduler(
+                requests_per_minute=requests_per_minute,
+                max_concurrency=max_concurrency,
+                max_retries=3,
+                base_delay=0.5,
+                max_delay=30.0,
+            )
+        )
 
+    def __init__(
+        self,
+        lang: str,
+        *,
+        gtts_factory: Optional[Any] = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        scheduler: Optional[HostScheduler] = None,
+    ) -> None:
+        if gtts_factory is None:
+            try:
+                add_vendor_to_path()
+                import requests  # type: ignore
                 from gtts import gTTS  # type: ignore
                 self._gtts_factory = gTTS
+                if session_factory is None:
+                    session_factory = requests.Session
             except ImportError as exc:  # pragma: no cover - import error path
                 raise ImportError(
                     "The 'gTTS' package is missing. Please ensure the addon was "
@@ -34,14 +73,76 @@ class GttsAudioProvider:
         else:
             self._gtts_factory = gtts_factory
 
+        # Sessions are not documented as thread safe, so each thread has one
+        self._session_factory = session_factory
+        self._sessions = threading.local()
+        self.scheduler = scheduler or self.default_scheduler()
         self.lang = lang
 
+    @property
+    def cache_namespace(self) -> str:
+        """Identify the engine and language shaping the audio."""
+        return f"gtts:{self.lang}"
+
     def get_audio(self, text: str) -> bytes:
         """Return MP3 audio bytes for the given text."""
+        with span("audio.gtts", chars=len(text)) as current:
+            data = self._synthesize(text)
+            current.set(bytes=len(data))
+        return data
+
+    def _synthesize(self, text: str) -> bytes:
         tts = self._gtts_factory(text=text, lang=self.lang)
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        return buf.getvalue()
+        # Private gTTS API, pinned in requirements.txt; the public one is
+        # the fallback should it go away
+        prepare = getattr(tts, "_prepare_requests", None)
+        if self._session_factory is not None and callable(prepare):
+            return b"".join(self._stream(tts))
+
+        def write() -> bytes:
+            buf = io.BytesIO()
+            tts.write_to_fp(buf)
+            return buf.getvalue()
+
+        host = f"translate.google.{getattr(tts, 'tld', 'com')}"
+        return self.scheduler.run(host, write)
+
+    def _stream(self, tts: Any) -> Iterator[bytes]:
+        """Send the requests prepared by gTTS through the shared session.
+
+        Mirrors ``gTTS.stream``, which would open a new session per request.
+        """
+        session = self._session()
+        for prepared in tts._prepare_requests():
+            host = urllib.parse.urlsplit(getattr(prepared, "url", "")).netloc
+
+            def send(prepared: Any = prepared) -> list[str]:
+                response = session.send(
+                    prepared,
+                    proxies=urllib.request.getproxies(),
+                    timeout=tts.timeout,
+                )
+                response.raise_for_status()
+                return [
+                    line.decode("utf-8")
+                    for line in response.iter_lines(chunk_size=1024)
+                ]
+
+            found = False
+            for line in self.scheduler.run(host, send):
+                match = _AUDIO_PATTERN.search(line)
+                if match:
+                    found = True
+                    yield base64.b64decode(match.group(1).encode("ascii"))
+            if not found:
+                raise RuntimeError("gTTS returned no audio")
+
+    def _session(self) -> Any:
+        session = getattr(self._sessions, "session", None)
+        if session is None:
+            assert self._session_factory is not None
+            session = self._sessions.session = self._session_factory()
+        return session
 
     def get_file_name(self, base: str) -> str:
         """Return unique audio filename for the provided base id."""
@@ -0,0 +1,174 @@
+"""Offline implementation of the :class:`AudioProvider` interface."""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import IO, Any, Callable, Optional
+
+from .tracing import span
+
+ENGINES = ("espeak-ng", "piper")
+
+
+class LocalTtsAudioProvider:
+    """Synthesize audio on this machine with espeak-ng or Piper.
+
+    ``voice`` is an espeak-ng voice name (``de``) or the path of a Piper
+    ``.onnx`` model. espeak-ng is started once per text, which takes a few
+    milliseconds. Piper needs much longer to load its model, so up to
+    ``workers`` Piper processes are kept running and receive one text after
+    the other. The provider is thread safe, with several threads texts are
+    synthesized on as many CPU cores. :meth:`close` may be called while
+    texts are being synthesized, their processes stop once they are done.
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        voice: str,
+        *,
+        executable: str = "",
+        workers: Optional[int] = None,
+        popen: Callable[..., Any] = subprocess.Popen,
+    ) -> None:
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown TTS engine: {engine}")
+        if not voice:
+            raise ValueError(f"No voice configured for {engine}")
+        found = shutil.which(executable or engine)
+        if found is None:
+            raise FileNotFoundError(
+                f"The '{executable or engine}' program was not found. Please "
+                f"install {engine} or set its path in the addon config."
+            )
+        self.engine = engine
+        self.voice = voice
+        self.executable = found
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self._popen = popen
+        self._lock = threading.Lock()
+        self._closed = False
+        # A slot per process that may run, taken while synthesizing
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle: queue.Queue[_PiperProcess] = queue.Queue()
+
+    @property
+    def cache_namespace(self) -> str:
+        """Identify the engine and voice shaping the audio."""
+        return f"{self.engine}:{os.path.basename(self.voice)}"
+
+    def get_audio(self, text: str) -> bytes:
+        """Return WAV audio bytes for the given text."""
+        with span("audio.local", engine=self.engine, chars=len(text)) as current:
+            if self.engine == "piper":
+                data = self._piper(text)
+            else:
+                data = self._espeak(text)
+            current.set(bytes=len(data))
+        return data
+
+    def get_file_name(self, base: str) -> str:
+        """Return unique audio filename for the provided base id."""
+        return f"{base}_{self.engine.replace('-', '')}.wav"
+
+    def close(self) -> None:
+        """Stop the Piper processes kept running."""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _espeak(self, text: str) -> bytes:
+        process = self._popen(
+            [self.executable, "-v", self.voice, "--stdin", "--stdout"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        data, error = process.communicate(text.encode("utf-8"))
+        if process.returncode != 0 or not data:
+            message = error.decode("utf-8", "replace").strip()
+            raise RuntimeError(f"espeak-ng failed: {message or process.returncode}")
+        return bytes(data)
+
+    def _piper(self, text: str) -> bytes:
+        with self._slots:
+            process = self._acquire_piper()
+            try:
+                data = process.synthesize(text)
+            except Exception:
+                # The process may be left in an unknown state, the next
+                # caller holding this slot starts a new one
+                process.close()
+                raise
+            self._release_piper(process)
+        return data
+
+    def _acquire_piper(self) -> _PiperProcess:
+        # With a slot taken either a process is idle or fewer than
+        # ``workers`` are running
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _PiperProcess(self.executable, self.voice, self._popen)
+
+    def _release_piper(self, process: _PiperProcess) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(process)
+                return
+        process.close()
+
+
+class _PiperProcess:
+    """Piper running in JSON input mode, synthesizing one line at a time.
+
+    Piper prints the path of every file it has written, which tells us
+    when the audio of a request is complete.
+    """
+
+    def __init__(self, executable: str, model: str, popen: Callable[..., Any]):
+        self._directory = tempfile.mkdtemp(prefix="german_cardgen_piper_")
+        self._counter = itertools.count()
+        self._process = popen(
+            [executable, "--model", model, "--json-input"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # Piper logs a lot, an unread pipe would fill up and block it
+            stderr=subprocess.DEVNULL,
+        )
+
+    def synthesize(self, text: str) -> bytes:
+        path = os.path.join(self._directory, f"{next(self._counter)}.wav")
+        stdin: IO[bytes] = self._process.stdin
+        stdout: IO[bytes] = self._process.stdout
+        request = {"text": text, "output_file": path}
+        stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+        stdin.flush()
+        written = stdout.readline().decode("utf-8").strip()
+        if not written:
+            raise RuntimeError("Piper stopped unexpectedly")
+        try:
+            with open(path, "rb") as fh:
+                return fh.read()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except Exception:
+            self._process.kill()
+        shutil.rmtree(self._directory, ignore_errors=True)
@@ -2,16 +2,72 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import re
+import threading
+from dataclasses import fields, replace
 from string import Template
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
-from .vocab_provider import VocabItem
+from .request_scheduler import RequestScheduler, estimate_tokens
+from .streaming_json import StreamingJsonObject, extract_json
+from .tracing import span
+from .vendor import add_vendor_to_path
+from .vocab_provider import BatchVocabError, VocabItem
+
+# Structured output modes, each falling back to the next when unsupported
+STRUCTURED_OUTPUT_MODES = ("strict", "json", "off")
+VOCAB_FIELDS = tuple(field.name for field in fields(VocabItem))
+# Errors of servers rejecting the requested response format
+_UNSUPPORTED_FORMAT = re.compile(r"response_format|json_schema|json_object", re.I)
+
+
+def _object_schema(properties: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def vocab_schema(names: tuple[str, ...] = VOCAB_FIELDS) -> dict[str, Any]:
+    """Return the JSON schema of a :class:`VocabItem` limited to ``names``."""
+    return _object_schema({name: {"type": "string"} for name in names})
+
+
+BATCH_SCHEMA = _object_schema({
+    "items": {
+        "type": "array",
+        "items": _object_schema(
+            {"index": {"type": "integer"}, **vocab_schema()["properties"]}
+        ),
+    }
+})
 
 
 class OpenaiVocabProvider:
-    """Retrieve vocabulary data using OpenAI chat completion."""
+    """Retrieve vocabulary data using OpenAI chat completion.
+
+    ``base_url`` points the client to another OpenAI-compatible server,
+    such as llama.cpp or vLLM; ``None`` uses the OpenAI API. Requests go
+    through ``scheduler``, which retries rate limits and transient errors.
+    Share one scheduler between providers using the same endpoint so they
+    respect the same limits.
+
+    ``structured_output`` asks the server to follow a JSON schema of
+    :class:`VocabItem` (``"strict"``) or to return any JSON object
+    (``"json"``). A server rejecting the format is asked again with the
+    next weaker mode, which is then kept. Without it (``"off"``) the JSON
+    is extracted from whatever text the model returns. In the JSON modes
+    fields that are still missing are requested once more on their own
+    instead of discarding the answer; ``"off"`` makes no extra request.
+    """
+
+    # Expected size of the answer for one term, used to estimate tokens
+    COMPLETION_TOKENS = 150
 
     def __init__(
         self,
@@ -19,26 +75,24 @@ class OpenaiVocabProvider:
         target_language: str,
         *,
         model: str = "gpt-3.5-turbo",
+        base_url: Optional[str] = None,
         openai_client: Optional[Any] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        structured_output: str = "off",
     ) -> None:
+        if structured_output not in STRUCTURED_OUTPUT_MODES:
+            raise ValueError(f"Unknown structured output mode: {structured_output}")
         if openai_client is None:
-            # Try to import from bundled vendor directory first
-            # Ensures the addon works without requiring users to install
-            # dependencies. The vendor directory contains pre-bundled packages
-            # (openai, requests, etc.) that are included with the addon
-            # distribution.
             try:
-                import sys
-
-                # Get the addon directory (plugin/__init__.py is the entry point)
-                addon_dir = os.path.dirname(os.path.dirname(__file__))
-                vendor_dir = os.path.join(addon_dir, "vendor")
-
-                if os.path.exists(vendor_dir) and vendor_dir not in sys.path:
-                    sys.path.insert(0, vendor_dir)
-
+                add_vendor_to_path()
                 import openai
-                self._openai = openai
+
+                # A client instance keeps its HTTP connection pool alive for
+                # as long as the provider is reused. Retries are left to the
+                # scheduler, which knows about the other requests.
+                self._openai: Any = openai.OpenAI(
+                    api_key=api_key, base_url=base_url, max_retries=0
+                )
             except ImportError as exc:
                 raise ImportError(
                     "The 'openai' package is missing. Please ensure the addon "
@@ -54,6 +108,11 @@ class OpenaiVocabProvider:
 
         self.target_language = target_language
         self.model = model
+        self.base_url = base_url
+        self.scheduler = scheduler or RequestScheduler()
+        self.structured_output = structured_output
+        # Parallel requests may find out at once that a mode is unsupported
+        self._mode_lock = threading.Lock()
 
         prompts_dir = os.path.join(os.path.dirname(__file__), "..", "prompts")
         self._system_template = self._load_template(prompts_dir, "vocab.system.md")
@@ -61,6 +120,35 @@ class OpenaiVocabProvider:
             prompts_dir, "vocab.assistant.md"
         )
         self._user_template = self._load_template(prompts_dir, "vocab.user.md")
+        self._repair_template = self._load_template(
+            prompts_dir, "vocab_repair.user.md"
+        )
+        self._batch_system_template = self._load_template(
+            prompts_dir, "vocab_batch.system.md"
+        )
+        self._batch_assistant_template = self._load_template(
+            prompts_dir, "vocab_batch.assistant.md"
+        )
+        self._batch_user_template = self._load_template(
+            prompts_dir, "vocab_batch.user.md"
+        )
+
+    @property
+    def cache_namespace(self) -> str:
+        """Identify the model, language and prompts shaping the responses."""
+        prompts = hashlib.sha256()
+        for template in (
+            self._system_template,
+            self._assistant_template,
+            self._user_template,
+            self._batch_system_template,
+            self._batch_assistant_template,
+            self._batch_user_template,
+            self._repair_template,
+        ):
+            prompts.update(template.template.encode("utf-8") + b"\0")
+        model = f"{self.base_url}:{self.model}" if self.base_url else self.model
+        return f"openai:{model}:{self.target_language}:{prompts.hexdigest()}"
 
     @staticmethod
     def _load_template(directory: str, filename: str) -> Template:
@@ -68,7 +156,11 @@ class OpenaiVocabProvider:
         with open(path, encoding="utf-8") as fh:
             return Template(fh.read())
 
-    def get_vocab(self, term: str, context: str = "") -> VocabItem:
+    def _render_messages(self, term: str, context: str) -> list[dict[str, str]]:
+        with span("vocab.render"):
+            return self._render(term, context)
+
+    def _render(self, term: str, context: str) -> list[dict[str, str]]:
         system_msg = self._system_template.substitute(
             target_language=self.target_language
         )
@@ -76,24 +168,286 @@ class OpenaiVocabProvider:
         user_msg = self._user_template.substitute(
             term=term, target_language=self.target_language, context=context
         )
+        return self._messages(system_msg, assistant_msg, user_msg)
 
-        response = self._openai.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "assistant", "content": assistant_msg},
-                {"role": "user", "content": user_msg},
-            ],
-            temperature=0.7,
-        )
-
-        content = response.choices[0].message.content
-        if content is None:
-            raise ValueError("OpenAI returned empty response")
-        data = json.loads(content)
+    @staticmethod
+    def _to_item(data: dict[str, Any], term: str) -> VocabItem:
         return VocabItem(
             term=data.get("term", term),
             term_translation=data.get("term_translation", ""),
             sentence=data.get("sentence", ""),
             sentence_translation=data.get("sentence_translation", ""),
         )
+
+    @staticmethod
+    def _parse_object(content: str) -> dict[str, Any]:
+        try:
+            data = extract_json(content)
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @staticmethod
+    def _missing_fields(data: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(
+            name
+            for name in VOCAB_FIELDS
+            if not (isinstance(data.get(name), str) and data[name].strip())
+        )
+
+    def _complete_item(
+        self, messages: list[dict[str, str]], content: str, term: str
+    ) -> VocabItem:
+        """Parse ``content`` and ask only for the fields it lacks."""
+        data = self._parse_object(content)
+        missing = self._missing_fields(data)
+        if missing and self.structured_output != "off":
+            with span("vocab.repair", missing=len(missing)) as current:
+                repair = self._repair_template.substitute(
+                    fields=", ".join(f'"{name}"' for name in missing), term=term
+                )
+                reply = self._complete(
+                    messages + [
+                        {"role": "assistant", "content": content},
+                        {"role": "user", "content": repair},
+                    ],
+                    completion_tokens=self.COMPLETION_TOKENS * len(missing)
+                    // len(VOCAB_FIELDS),
+                    schema=vocab_schema(missing),
+                )
+                fixed = self._parse_object(reply)
+                data = {
+                    **data,
+                    **{name: fixed[name] for name in missing if name in fixed},
+                }
+                missing = self._missing_fields(data)
+                current.set(repaired=not missing)
+        if missing:
+            raise ValueError(f"OpenAI returned no {', '.join(missing)}")
+        return self._to_item(data, term)
+
+    def get_vocab(self, term: str, context: str = "") -> VocabItem:
+        messages = self._render_messages(term, context)
+        content = self._complete(messages, schema=vocab_schema())
+        return self._complete_item(messages, content, term)
+
+    def get_vocab_stream(
+        self,
+        term: str,
+        context: str,
+        on_update: Callable[[VocabItem], None],
+    ) -> VocabItem:
+        """Like :meth:`get_vocab` but streams the completion.
+
+        ``on_update`` receives a partial :class:`VocabItem` every time another
+        field of the response is complete, in the order the model writes them.
+        """
+        messages = self._render_messages(term, context)
+        with span("vocab.stream", model=self.model) as current:
+            stream = self.scheduler.run(
+                lambda: self._create(messages, vocab_schema(), stream=True),
+                tokens=estimate_tokens(messages, self.COMPLETION_TOKENS),
+            )
+            parsed = self._consume_stream(stream, on_update)
+            current.set(bytes=len(parsed.text.encode("utf-8")))
+
+        if not parsed.text:
+            raise ValueError("OpenAI returned empty response")
+        item = self._complete_item(messages, parsed.text, term)
+        if self._missing_fields(parsed.fields):
+            # The repaired fields were not streamed
+            on_update(item)
+        return item
+
+    @staticmethod
+    def _consume_stream(
+        stream: Any, on_update: Callable[[VocabItem], None]
+    ) -> StreamingJsonObject:
+        parsed = StreamingJsonObject()
+        partial = VocabItem()
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            completed = parsed.feed(delta)
+            updates = {
+                field.name: completed[field.name]
+                for field in fields(VocabItem)
+                if isinstance(completed.get(field.name), str)
+            }
+            if updates:
+                partial = replace(partial, **updates)
+                on_update(partial)
+        return parsed
+
+    def get_vocab_batch(self, items: list[tuple[str, str]]) -> list[VocabItem]:
+        """Return vocabulary for many ``(term, context)`` pairs in one request.
+
+        Items missing from the response or failing validation are retried
+        one by one with :meth:`get_vocab`. If some of those retries fail a
+        :class:`BatchVocabError` with the other items is raised.
+        """
+        if not items:
+            return []
+
+        system_msg = self._batch_system_template.substitute(
+            target_language=self.target_language
+        )
+        assistant_msg = self._batch_assistant_template.template
+        requested = [
+            {"index": index, "term": term, "context": context}
+            for index, (term, context) in enumerate(items)
+        ]
+        user_msg = self._batch_user_template.substitute(
+            count=len(items),
+            items=json.dumps(requested, ensure_ascii=False, indent=2),
+            target_language=self.target_language,
+        )
+
+        try:
+            content = self._complete(
+                self._messages(system_msg, assistant_msg, user_msg),
+                completion_tokens=self.COMPLETION_TOKENS * len(items),
+                schema=BATCH_SCHEMA,
+            )
+            parsed = self._parse_batch(content, len(items))
+        except ValueError:
+            parsed = {}
+
+        results: list[Optional[VocabItem]] = []
+        errors: dict[int, Exception] = {}
+        for index, (term, context) in enumerate(items):
+            item = parsed.get(index)
+            if item is None:
+                try:
+                    item = self.get_vocab(term, context)
+                except Exception as exc:
+                    errors[index] = exc
+            results.append(item)
+        if errors:
+            raise BatchVocabError(results, errors)
+        return [item for item in results if item is not None]
+
+    @staticmethod
+    def _parse_batch(content: str, count: int) -> dict[int, VocabItem]:
+        """Map request indices to valid items of a batch response."""
+        data = extract_json(content)
+        if isinstance(data, dict):
+            # The JSON modes require an object, the array may have any key
+            data = data.get("items") or next(
+                (value for value in data.values() if isinstance(value, list)), None
+            )
+        if not isinstance(data, list):
+            raise ValueError("OpenAI returned no JSON array")
+
+        parsed = {}
+        duplicates = set()
+        for position, entry in enumerate(data):
+            if not isinstance(entry, dict):
+                continue
+            index = entry.get("index", position)
+            if not isinstance(index, int) or not 0 <= index < count:
+                continue
+            values = [entry.get(name) for name in VOCAB_FIELDS]
+            if not all(isinstance(v, str) and v.strip() for v in values):
+                continue
+            if index in parsed:
+                duplicates.add(index)
+            parsed[index] = VocabItem(**{f: str(entry[f]) for f in VOCAB_FIELDS})
+        # Which of several answers for an index is meant is unknown, all of
+        # them are rejected and the term is asked for on its own
+        for index in duplicates:
+            del parsed[index]
+        return parsed
+
+    @staticmethod
+    def _messages(
+        system_msg: str, assistant_msg: str, user_msg: str
+    ) -> list[dict[str, str]]:
+        return [
+            {"role": "system", "content": system_msg},
+            {"role": "assistant", "content": assistant_msg},
+            {"role": "user", "content": user_msg},
+        ]
+
+    def _complete(
+        self,
+        messages: list[dict[str, str]],
+        completion_tokens: int = COMPLETION_TOKENS,
+        schema: Optional[dict[str, Any]] = None,
+    ) -> str:
+        with span("vocab.request", model=self.model) as current:
+            response = self.scheduler.run(
+                lambda: self._create(messages, schema),
+                tokens=estimate_tokens(messages, completion_tokens),
+                usage=self._total_tokens,
+            )
+            usage = getattr(response, "usage", None)
+            current.set(structured_output=self.structured_output)
+            if usage is not None:
+                current.set(
+                    prompt_tokens=getattr(usage, "prompt_tokens", None),
+                    completion_tokens=getattr(usage, "completion_tokens", None),
+                )
+
+        content = response.choices[0].message.content
+        if content is None:
+            raise ValueError("OpenAI returned empty response")
+        return str(content)
+
+    def _create(
+        self,
+        messages: list[dict[str, str]],
+        schema: Optional[dict[str, Any]],
+        **kwargs: Any,
+    ) -> Any:
+        """Send the request, with the response format the server supports."""
+        while True:
+            args = dict(kwargs, model=self.model, messages=messages, temperature=0.7)
+            mode = self.structured_output
+            response_format = self._response_format(schema, mode)
+            if response_format is None:
+                return self._openai.chat.completions.create(**args)
+            try:
+                return self._openai.chat.completions.create(
+                    response_format=response_format, **args
+                )
+            except Exception as exc:
+                status = getattr(exc, "status_code", None)
+                if status not in (400, 422) or not _UNSUPPORTED_FORMAT.search(
+                    str(exc)
+                ):
+                    raise
+                self._downgrade(mode)
+
+    def _downgrade(self, failed: str) -> None:
+        """Use the mode weaker than ``failed`` from now on.
+
+        Another request may have downgraded further already, the mode never
+        becomes stronger again.
+        """
+        modes = STRUCTURED_OUTPUT_MODES
+        weaker = modes.index(failed) + 1
+        with self._mode_lock:
+            if modes.index(self.structured_output) < weaker:
+                self.structured_output = modes[weaker]
+
+    @staticmethod
+    def _response_format(
+        schema: Optional[dict[str, Any]], mode: str
+    ) -> Optional[dict[str, Any]]:
+        if mode == "strict" and schema is not None:
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": "vocab", "strict": True, "schema": schema},
+            }
+        if mode in ("strict", "json"):
+            return {"type": "json_object"}
+        return None
+
+    @staticmethod
+    def _total_tokens(response: Any) -> Optional[int]:
+        total = getattr(getattr(response, "usage", None), "total_tokens", None)
+        return total if isinstance(total, int) else None
@@ -0,0 +1,58 @@
+"""Speculative work started before the user asks for it."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Callable, Generic, Optional, TypeVar
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+
+class Prefetch(Generic[K, T]):
+    """Compute a result for ``key`` on a background thread ahead of need.
+
+    ``compute`` receives a function telling whether the prefetch was
+    cancelled, so it can stop before its expensive stages. :meth:`take`
+    hands out the result only for the same key and only once.
+    """
+
+    def __init__(self, key: K, compute: Callable[[Callable[[], bool]], T]) -> None:
+        self.key = key
+        self._cancelled = threading.Event()
+        self._taken = False
+        self._future: Future[T] = Future()
+        self._future.set_running_or_notify_cancel()
+        self._compute = compute
+        threading.Thread(target=self._run, name="prefetch", daemon=True).start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the prefetch as early as possible and discard its result."""
+        self._cancelled.set()
+
+    def take(self, key: K) -> Optional[Future[T]]:
+        """Return the pending result if it was computed for ``key``.
+
+        The prefetch is cancelled if the key differs, it can no longer be
+        used.
+        """
+        if self._taken or self.cancelled or key != self.key:
+            self.cancel()
+            return None
+        self._taken = True
+        return self._future
+
+    def _run(self) -> None:
+        try:
+            if self.cancelled:
+                raise RuntimeError("Cancelled")
+            result = self._compute(self._cancelled.is_set)
+        except BaseException as exc:
+            self._future.set_exception(exc)
+        else:
+            self._future.set_result(result)
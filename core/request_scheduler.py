@@ -0,0 +1,306 @@
+"""Rate-limit aware scheduling of API requests."""
+
+from __future__ import annotations
+
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Status codes worth another attempt: timeouts, conflicts, rate limits and
+# server side failures
+RETRY_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Errors raised by the OpenAI client and requests when no response was
+# received at all
+RETRY_ERROR_NAMES = frozenset(
+    {"APIConnectionError", "APITimeoutError", "ConnectionError", "Timeout"}
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Return ``True`` for rate limits and transient network or server errors.
+
+    The check is duck-typed so ``core`` does not depend on the OpenAI client
+    or requests.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # requests.HTTPError keeps the status on its response
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRY_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return any(cls.__name__ in RETRY_ERROR_NAMES for cls in type(error).__mro__)
+
+
+def retry_after(error: BaseException, now: float) -> Optional[float]:
+    """Return the delay in seconds the server asked for, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - now)
+
+
+def estimate_tokens(messages: list[dict[str, str]], completion: int = 0) -> int:
+    """Roughly estimate the tokens used by chat ``messages``.
+
+    Four characters per token is OpenAI's rule of thumb; ``completion``
+    is added for the expected size of the answer.
+    """
+    chars = sum(len(message.get("content", "")) for message in messages)
+    return chars // 4 + 4 * len(messages) + completion
+
+
+class _Reservation:
+    __slots__ = ("start", "tokens")
+
+    def __init__(self, start: float, tokens: int) -> None:
+        self.start = start
+        self.tokens = tokens
+
+
+@dataclass(frozen=True)
+class SchedulerMetrics:
+    """Snapshot of the scheduler counters."""
+
+    queue_depth: int
+    in_flight: int
+    requests: int
+    retries: int
+    failures: int
+    throttled: int
+    total_wait: float
+    max_wait: float
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class RequestScheduler:
+    """Run API calls within request and token budgets, retrying failures.
+
+    ``requests_per_minute`` and ``tokens_per_minute`` are enforced over a
+    sliding one minute window, ``0`` disables a budget. At most
+    ``max_concurrency`` calls run at once. Retryable errors (see
+    :func:`is_retryable`) are attempted again up to ``max_retries`` times
+    with exponential backoff and full jitter. A ``Retry-After`` header on
+    the error pauses all callers, since the limit is shared by the key.
+
+    ``clock``, ``sleep`` and ``rng`` can be replaced in tests.
+    """
+
+    WINDOW = 60.0
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._retryable = retryable
+        self._clock = clock
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        # Requests made in the last WINDOW, oldest first
+        self._window: deque[_Reservation] = deque()
+        self._window_tokens = 0
+        self._paused_until = 0.0
+        self._waiting = 0
+        self._in_flight = 0
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._throttled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def run(
+        self,
+        call: Callable[[], T],
+        *,
+        tokens: int = 0,
+        usage: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """Run ``call`` once the budgets allow it and return its result.
+
+        ``tokens`` is the estimated cost of the request. ``usage`` may return
+        the actual tokens from the result, replacing the estimate in the
+        window.
+        """
+        attempt = 0
+        while True:
+            entry = self._acquire(tokens)
+            try:
+                result = call()
+            except Exception as e:
+                self._release()
+                if attempt >= self.max_retries or not self._retryable(e):
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                attempt += 1
+                self._backoff(e, attempt)
+                continue
+            self._release()
+            if usage is not None:
+                actual = usage(result)
+                if actual is not None:
+                    self._correct(entry, actual)
+            return result
+
+    def metrics(self) -> SchedulerMetrics:
+        with self._lock:
+            return SchedulerMetrics(
+                queue_depth=self._waiting,
+                in_flight=self._in_flight,
+                requests=self._requests,
+                retries=self._retries,
+                failures=self._failures,
+                throttled=self._throttled,
+                total_wait=self._total_wait,
+                max_wait=self._max_wait,
+            )
+
+    def _acquire(self, tokens: int) -> _Reservation:
+        started = self._clock()
+        with self._lock:
+            self._waiting += 1
+        try:
+            self._slots.acquire()
+            while True:
+                with self._lock:
+                    now = self._clock()
+                    delay = self._budget_delay(now, tokens)
+                    if delay <= 0:
+                        entry = _Reservation(now, tokens)
+                        self._window.append(entry)
+                        self._window_tokens += tokens
+                        waited = now - started
+                        self._requests += 1
+                        self._in_flight += 1
+                        self._total_wait += waited
+                        self._max_wait = max(self._max_wait, waited)
+                        return entry
+                    self._throttled += 1
+                # The slot is kept while sleeping, so waiting callers keep
+                # their place
+                self._sleep(delay)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _budget_delay(self, now: float, tokens: int) -> float:
+        """Return how long to wait before a request of ``tokens`` fits."""
+        while self._window and now - self._window[0].start >= self.WINDOW:
+            self._window_tokens -= self._window.popleft().tokens
+        if now < self._paused_until:
+            return self._paused_until - now
+
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            index = len(self._window) - self.requests_per_minute
+            return self._window[index].start + self.WINDOW - now
+
+        if (
+            self.tokens_per_minute
+            and self._window
+            and self._window_tokens + tokens > self.tokens_per_minute
+        ):
+            # Wait until enough old requests leave the window. A request
+            # larger than the whole budget runs once the window is empty.
+            excess = self._window_tokens + tokens - self.tokens_per_minute
+            for entry in self._window:
+                excess -= entry.tokens
+                if excess <= 0:
+                    break
+            return entry.start + self.WINDOW - now
+        return 0.0
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _correct(self, entry: _Reservation, actual: int) -> None:
+        with self._lock:
+            if any(e is entry for e in self._window):
+                self._window_tokens += actual - entry.tokens
+            entry.tokens = actual
+
+    def _backoff(self, error: BaseException, attempt: int) -> None:
+        now = self._clock()
+        delay = self._rng.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        requested = retry_after(error, time.time())
+        with self._lock:
+            self._retries += 1
+            if requested is not None:
+                delay = max(delay, requested)
+                self._paused_until = max(self._paused_until, now + delay)
+        self._sleep(delay)
+
+
+class HostScheduler:
+    """Keep a separate :class:`RequestScheduler` per host.
+
+    Schedulers are created by ``factory`` on first use of a host, so every
+    host gets its own budgets and one slow host does not hold up others.
+    """
+
+    def __init__(self, factory: Callable[[], RequestScheduler]) -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._schedulers: dict[str, RequestScheduler] = {}
+
+    def for_host(self, host: str) -> RequestScheduler:
+        with self._lock:
+            scheduler = self._schedulers.get(host)
+            if scheduler is None:
+                scheduler = self._schedulers[host] = self._factory()
+            return scheduler
+
+    def run(self, host: str, call: Callable[[], T]) -> T:
+        return self.for_host(host).run(call)
@@ -0,0 +1,50 @@
+"""Coalesce concurrent calls for the same key into a single call."""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Hashable
+from concurrent.futures import Future
+from typing import Callable, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class SingleFlight(Generic[K, V]):
+    """Run at most one call per key at a time.
+
+    Callers asking for a key while its call is still running wait for it
+    and receive the same result, or the same exception. Nothing is kept
+    once the call finished, remembering results is left to the caches.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[K, Future[V]] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: K, call: Callable[[], V]) -> V:
+        """Return the result of ``call``, or of the running call for ``key``."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+        try:
+            result = call()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result
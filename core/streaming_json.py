@@ -0,0 +1,84 @@
+"""Incremental extraction of fields from a JSON object arriving in chunks."""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Any
+
+_DECODER = json.JSONDecoder()
+_SEPARATOR = re.compile(r"[\s,]*")
+_COLON = re.compile(r"\s*:\s*")
+
+
+class StreamingJsonObject:
+    """Collect top-level fields of a JSON object as soon as they are complete.
+
+    Text before the opening brace (e.g. a Markdown code fence) is ignored.
+    Nested values are returned once fully received.
+    """
+
+    def __init__(self) -> None:
+        self.fields: dict[str, Any] = {}
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+
+    @property
+    def text(self) -> str:
+        """Return all text fed so far."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> dict[str, Any]:
+        """Add ``chunk`` and return the fields completed by it."""
+        self._buffer += chunk
+        completed: dict[str, Any] = {}
+        buffer = self._buffer
+        if not self._started:
+            start = buffer.find("{", self._pos)
+            if start < 0:
+                self._pos = len(buffer)
+                return completed
+            self._pos = start + 1
+            self._started = True
+
+        while True:
+            separator = _SEPARATOR.match(buffer, self._pos)
+            pos = separator.end() if separator else self._pos
+            if pos >= len(buffer) or buffer[pos] == "}":
+                break
+            try:
+                key, pos = _DECODER.raw_decode(buffer, pos)
+                colon = _COLON.match(buffer, pos)
+                if colon is None:
+                    break
+                value, end = _DECODER.raw_decode(buffer, colon.end())
+            except json.JSONDecodeError:
+                break
+            if end >= len(buffer) and not isinstance(value, (str, list, dict)):
+                # A number or literal at the very end may still be growing
+                break
+            self._pos = end
+            if isinstance(key, str):
+                self.fields[key] = value
+                completed[key] = value
+        return completed
+
+
+_JSON_START = re.compile(r"[\[{]")
+
+
+def extract_json(text: str) -> Any:
+    """Return the first JSON object or array found in ``text``.
+
+    Text around it, such as Markdown code fences or a sentence the model
+    added despite the instructions, is ignored. Raises ``ValueError`` if
+    ``text`` contains no valid JSON value.
+    """
+    for match in _JSON_START.finditer(text):
+        try:
+            value, _ = _DECODER.raw_decode(text, match.start())
+        except json.JSONDecodeError:
+            continue
+        return value
+    raise ValueError("OpenAI returned no JSON")
@@ -0,0 +1,232 @@
+"""Lightweight timing spans for the stages of card generation.
+
+Tracing is off by default. :func:`span` then returns a shared no-op object,
+so instrumented code pays for little more than a function call::
+
+    with span("vocab.request", model=self.model) as s:
+        response = ...
+        s.set(completion_tokens=response.usage.completion_tokens)
+
+Once :func:`configure` enabled it, every finished span is kept for
+:func:`summary` and optionally appended to a rolling JSONL log.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Any, Optional
+
+Record = dict[str, Any]
+
+
+class Span:
+    """Timing of one stage, with attributes such as byte or token counts."""
+
+    __slots__ = ("name", "attrs", "parent", "_tracer", "_started", "_wall")
+
+    def __init__(self, tracer: Tracer, name: str, attrs: dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[str] = None
+        self._tracer = tracer
+        self._started = 0.0
+        self._wall = 0.0
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> Span:
+        stack = self._tracer._stack()
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._wall = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        duration = time.perf_counter() - self._started
+        stack = self._tracer._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self._tracer._finish(self, duration)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@dataclass(frozen=True)
+class StageSummary:
+    """Durations of one stage in milliseconds."""
+
+    name: str
+    count: int
+    p50: float
+    p95: float
+    total: float
+
+
+class RollingJsonlLog:
+    """Append records to ``path`` as JSON lines.
+
+    Once the file exceeds ``max_bytes`` it is renamed to ``path.1`` (the
+    previous ``path.1`` becomes ``path.2`` and so on) and a new one starts.
+    """
+
+    def __init__(
+        self, path: str, *, max_bytes: int = 5 * 1024 * 1024, backups: int = 2
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def write(self, record: Record) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line)
+
+    def _rotate(self) -> None:
+        for index in range(self.backups, 0, -1):
+            source = f"{self.path}.{index - 1}" if index > 1 else self.path
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        if not self.backups:
+            os.remove(self.path)
+
+
+class Tracer:
+    """Collect finished spans per stage and write them to ``log``.
+
+    Only the last ``keep`` durations of a stage are used for the summary.
+    """
+
+    def __init__(
+        self, log: Optional[RollingJsonlLog] = None, *, keep: int = 1000
+    ) -> None:
+        self.log = log
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._durations: dict[str, deque[float]] = {}
+
+    def span(self, name: str, **attrs: Any) -> Span:
+        return Span(self, name, attrs)
+
+    def summary(self) -> list[StageSummary]:
+        with self._lock:
+            stages = {name: sorted(d) for name, d in self._durations.items()}
+        return [
+            StageSummary(
+                name=name,
+                count=len(durations),
+                p50=_percentile(durations, 0.50),
+                p95=_percentile(durations, 0.95),
+                total=sum(durations),
+            )
+            for name, durations in sorted(stages.items())
+        ]
+
+    def _stack(self) -> list[Span]:
+        stack: Optional[list[Span]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _finish(self, span: Span, duration: float) -> None:
+        ms = duration * 1000
+        with self._lock:
+            durations = self._durations.get(span.name)
+            if durations is None:
+                durations = self._durations[span.name] = deque(maxlen=self.keep)
+            durations.append(ms)
+        if self.log is None:
+            return
+        record: Record = {
+            "ts": round(span._wall, 3),
+            "span": span.name,
+            "ms": round(ms, 3),
+            "thread": threading.current_thread().name,
+        }
+        if span.parent:
+            record["parent"] = span.parent
+        record.update(span.attrs)
+        try:
+            self.log.write(record)
+        except Exception:
+            # Tracing must never break card generation
+            pass
+
+
+def _percentile(ordered: list[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure(enabled: bool, log_path: Optional[str] = None) -> Optional[Tracer]:
+    """Switch tracing on or off and return the active tracer.
+
+    With ``log_path`` spans are also written to a :class:`RollingJsonlLog`.
+    Calling it again with the same arguments keeps the collected spans.
+    """
+    global _tracer
+    if not enabled:
+        _tracer = None
+        return None
+    current = _tracer
+    if current is not None:
+        current_path = current.log.path if current.log else None
+        if current_path == log_path:
+            return current
+    _tracer = Tracer(RollingJsonlLog(log_path) if log_path else None)
+    return _tracer
+
+
+def tracer() -> Optional[Tracer]:
+    """Return the active tracer, ``None`` while tracing is off."""
+    return _tracer
+
+
+def span(name: str, **attrs: Any) -> Span | _NoopSpan:
+    """Return a context manager timing the stage ``name``."""
+    active = _tracer
+    if active is None:
+        return _NOOP
+    return active.span(name, **attrs)
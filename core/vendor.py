@@ -0,0 +1,20 @@
+"""Access to the third-party packages bundled with the addon."""
+
+import os
+import sys
+
+# Bundled by scripts/bundle.py next to the core package
+VENDOR_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vendor")
+# Pure Python packages, when the bundle was built with --zip
+VENDOR_ZIP = VENDOR_DIR + ".zip"
+
+
+def add_vendor_to_path() -> None:
+    """Make the bundled packages importable, ahead of installed ones.
+
+    Ensures the addon works without requiring users to install
+    dependencies.
+    """
+    for path in (VENDOR_ZIP, VENDOR_DIR):
+        if os.path.exists(path) and path not in sys.path:
+            sys.path.insert(0, path)
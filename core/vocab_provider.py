@@ -3,12 +3,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Protocol, runtime_checkable
+from typing import Callable, Optional, Protocol, runtime_checkable
 
 
-@dataclass
+@dataclass(frozen=True)
 class VocabItem:
-    """Simple container for vocabulary information."""
+    """Simple immutable container for vocabulary information."""
 
     term: str = ""
     term_translation: str = ""
@@ -17,6 +17,24 @@ class VocabItem:
 
 
 
+class BatchVocabError(Exception):
+    """Raised when only some items of a batch lookup failed.
+
+    ``items`` holds the results in request order, ``None`` for the indices
+    whose exception is in ``errors``, so the successful ones are not lost.
+    """
+
+    def __init__(
+        self, items: list[Optional[VocabItem]], errors: dict[int, Exception]
+    ) -> None:
+        super().__init__(
+            f"{len(errors)} of {len(items)} items failed: "
+            + "; ".join(str(e) for e in errors.values())
+        )
+        self.items = items
+        self.errors = errors
+
+
 @runtime_checkable
 class VocabProvider(Protocol):
     """Protocol describing a provider capable of returning vocabulary info."""
@@ -26,3 +44,25 @@ class VocabProvider(Protocol):
         ...
 
 
+@runtime_checkable
+class BatchVocabProvider(VocabProvider, Protocol):
+    """Provider that can also look up many terms with a single request."""
+
+    def get_vocab_batch(self, items: list[tuple[str, str]]) -> list[VocabItem]:
+        """Return a :class:`VocabItem` per ``(term, context)`` pair, in order."""
+        ...
+
+
+@runtime_checkable
+class StreamingVocabProvider(VocabProvider, Protocol):
+    """Provider that can report vocabulary fields while they are generated."""
+
+    def get_vocab_stream(
+        self,
+        term: str,
+        context: str,
+        on_update: Callable[[VocabItem], None],
+    ) -> VocabItem:
+        """Return the final :class:`VocabItem`, passing partial ones to
+        ``on_update`` as fields become available."""
+        ...
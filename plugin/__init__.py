@@ -1,93 +1,101 @@
 # ruff: noqa: E402
 import os
 import sys
-from typing import Optional
+from types import ModuleType
+from typing import Any
 
 # Add the addon directory to Python path so core package can be found
 addon_dir = os.path.dirname(__file__)
 if addon_dir not in sys.path:
     sys.path.insert(0, addon_dir)
 
-from aqt import mw  # type: ignore
+from anki import hooks  # type: ignore
+from aqt import gui_hooks, mw  # type: ignore
 from aqt.qt import QAction  # type: ignore
 
-from core.german_card import GermanCard
-from core.gtts_audio_provider import GttsAudioProvider
-from core.openai_vocab_provider import OpenaiVocabProvider
+# Milliseconds after the profile opened before the providers are prepared
+PREWARM_DELAY_MS = 3000
 
-from .anki_service import AnkiService
+# Everything else, including the OpenAI and gTTS libraries, is imported
+# when first needed, so the addon adds almost nothing to Anki's startup.
+_ACTIONS_MODULE = f"{__name__}.actions"
 
-MODEL_NAME = "German Contextual Vocab"
-TEMPLATE_NAME = "Contextual Audio Card"
-from .view import (
-    CardPreviewResult,
-    SettingsResult,
-    get_card_input_dialog,
-    get_settings_dialog,
-    show_card_preview_dialog,
-    show_info,
-    show_warning,
-)
 
+def _actions() -> ModuleType:
+    from . import actions
 
-def ensure_settings() -> Optional[SettingsResult]:
-    """Return API key and target language from config, prompting the user if needed."""
-    config = mw.addonManager.getConfig(__name__) or {}
-    api_key = config.get("openai_api_key", "")
-    target_language = config.get("target_language", "")
-    if not api_key or not target_language:
-        result = get_settings_dialog(mw, api_key, target_language or "English")
-        if not result:
-            return None
-
-        config["openai_api_key"] = result.api_key
-        config["target_language"] = result.target_language
-        mw.addonManager.writeConfig(__name__, config)
-    # If config is present, construct a SettingsResult
-    return SettingsResult(api_key=api_key, target_language=target_language)
-
-def generate_card() -> None:
-    settings = ensure_settings()
-    if not settings:
-        show_warning("OpenAI configuration required to generate card.")
-        return
+    return actions
+
+
+def _loaded_actions() -> Any:
+    """Return the actions module if it was imported already, else ``None``."""
+    return sys.modules.get(_ACTIONS_MODULE)
+
+
+def _forget_notes(col: Any, note_ids: Any) -> None:
+    # Without the actions module there is no duplicate index to update
+    actions = _loaded_actions()
+    if actions is not None:
+        actions.anki_service.forget_notes(note_ids)
+
+
+def _invalidate_notes(*args: Any) -> None:
+    # Notes may have been added or changed behind the duplicate index
+    actions = _loaded_actions()
+    if actions is not None:
+        actions.anki_service.invalidate()
+
+
+def _operation_did_execute(changes: Any, handler: Any) -> None:
+    if changes.note_text or changes.notetype:
+        _invalidate_notes()
 
-    result = get_card_input_dialog(mw)
-    if not result:
+
+def _config_updated(config: Any) -> None:
+    actions = _loaded_actions()
+    if actions is not None:
+        actions.config_updated(config)
+
+
+# Once is enough, even when the user switches profiles
+_prewarmed = False
+
+
+def _schedule_prewarm() -> None:
+    global _prewarmed
+    if _prewarmed:
         return
+    _prewarmed = True
+    config = mw.addonManager.getConfig(__name__) or {}
+    if not config.get("prewarm_on_startup", True):
+        return
+    mw.progress.single_shot(
+        PREWARM_DELAY_MS,
+        lambda: mw.taskman.run_in_background(
+            lambda: _actions().prewarm(), lambda future: None
+        ),
+        False,
+    )
 
-    while True:  # Allow regeneration loop
-        vocab_provider = OpenaiVocabProvider(settings.api_key, settings.target_language)
-        audio_provider = GttsAudioProvider("de")
-
-        card = GermanCard.create_from_user_input(
-            result.term, result.context, vocab_provider, audio_provider
-        )
-        if not card.is_valid():
-            show_warning("Invalid card data.")
-            return
-
-        preview_dialog_result = show_card_preview_dialog(mw, card)
-        if preview_dialog_result.result == CardPreviewResult.SAVE:
-            try:
-                anki_service = AnkiService(mw, MODEL_NAME, TEMPLATE_NAME)
-                removed = anki_service.save_card(card, result.selected_deck_id)
-                success_message = f"German card created: {card.term}"
-                if removed:
-                    success_message += f", Removed duplicate cards: {removed}"
-                show_info(success_message)
-                return
-            except Exception as e:
-                show_warning(f"Failed to create card: {str(e)}")
-                return
-        elif preview_dialog_result.result == CardPreviewResult.CANCEL:
-            return
-        elif preview_dialog_result.result == CardPreviewResult.REGENERATE:
-            # Update context if provided
-            if preview_dialog_result.updated_context is not None:
-                result.context = preview_dialog_result.updated_context
-            continue
 
 action = QAction("German Card", mw)
-action.triggered.connect(generate_card)
+action.triggered.connect(lambda: _actions().generate_card())
 mw.form.menuTools.addAction(action)
+
+batch_action = QAction("German Cards (Batch)", mw)
+batch_action.triggered.connect(lambda: _actions().generate_batch())
+mw.form.menuTools.addAction(batch_action)
+
+# Explains how to turn tracing on while it is off
+timing_action = QAction("German Cards: Timing Summary", mw)
+timing_action.triggered.connect(lambda: _actions().show_timing_summary())
+mw.form.menuTools.addAction(timing_action)
+
+# Keep the duplicate index in sync with notes deleted anywhere in Anki
+hooks.notes_will_be_deleted.append(_forget_notes)
+# and rebuild it after anything else that may add or edit notes
+gui_hooks.operation_did_execute.append(_operation_did_execute)
+gui_hooks.sync_did_finish.append(_invalidate_notes)
+gui_hooks.collection_did_load.append(_invalidate_notes)
+mw.addonManager.setConfigUpdatedAction(__name__, _config_updated)
+gui_hooks.profile_did_open.append(_schedule_prewarm)
@@ -0,0 +1,468 @@
+"""Menu actions of the addon, imported on first use to keep startup fast."""
+
+import os
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+from aqt import mw  # type: ignore
+
+from core import tracing
+from core.batch import BatchCardGenerator, BatchResult, parse_batch_input
+from core.batch_journal import BatchJournal, find_unfinished
+from core.cached_vocab_provider import RefreshingVocabProvider
+from core.german_card import GermanCard
+from core.prefetch import Prefetch
+
+from .anki_service import AnkiService
+from .media_writer import MediaWriter
+from .providers import ProviderRegistry
+from .view import (
+    CardInputResult,
+    CardPreviewDialogResult,
+    CardPreviewResult,
+    GenerationProgressDialog,
+    SettingsResult,
+    ask_choice,
+    ask_user,
+    get_batch_input_dialog,
+    get_card_input_dialog,
+    get_settings_dialog,
+    show_card_preview_dialog,
+    show_info,
+    show_warning,
+)
+
+# Anki identifies the addon by its package name
+ADDON_NAME = __name__.rsplit(".", 1)[0]
+MODEL_NAME = "German Contextual Vocab"
+TEMPLATE_NAME = "Contextual Audio Card"
+SAVE_CHUNK_SIZE = 50
+# Anki keeps the user_files folder when the addon is updated
+USER_FILES_DIR = os.path.join(os.path.dirname(__file__), "user_files")
+TRACE_LOG = os.path.join(USER_FILES_DIR, "trace.jsonl")
+# Journals of batch jobs, kept until every term is saved or the user
+# discards them
+BATCH_JOBS_DIR = os.path.join(USER_FILES_DIR, "batch_jobs")
+RESUME_BATCH = "Resume"
+DISCARD_BATCH = "Discard"
+KEEP_BATCH = "Not now"
+providers = ProviderRegistry(USER_FILES_DIR)
+anki_service = AnkiService(mw, MODEL_NAME, TEMPLATE_NAME, confirm=ask_user)
+# Alternative card generated while the preview is shown, keyed by term and
+# context, served when the user asks to regenerate
+_alternative: Optional[Prefetch[tuple[str, str], GermanCard]] = None
+# Holds the alternative's vocabulary back from the cache until it is used
+_alternative_vocab: Optional[RefreshingVocabProvider] = None
+
+
+def config_updated(config: dict[str, Any]) -> None:
+    """Apply a changed addon config."""
+    providers.invalidate()
+    configure_tracing(config)
+
+def configure_tracing(config: dict[str, Any]) -> None:
+    if config.get("tracing_enabled", False):
+        os.makedirs(USER_FILES_DIR, exist_ok=True)
+        tracing.configure(True, TRACE_LOG)
+    else:
+        tracing.configure(False)
+
+configure_tracing(mw.addonManager.getConfig(ADDON_NAME) or {})
+
+
+def ensure_settings() -> Optional[SettingsResult]:
+    """Return API key and target language from config, prompting the user if needed."""
+    config = mw.addonManager.getConfig(ADDON_NAME) or {}
+    api_key = config.get("openai_api_key", "")
+    target_language = config.get("target_language", "")
+    # A self-hosted OpenAI-compatible server may not need a key
+    needs_key = not config.get("openai_base_url")
+    if (needs_key and not api_key) or not target_language:
+        result = get_settings_dialog(mw, api_key, target_language or "English")
+        if not result:
+            return None
+
+        config["openai_api_key"] = result.api_key
+        config["target_language"] = result.target_language
+        mw.addonManager.writeConfig(ADDON_NAME, config)
+    # If config is present, construct a SettingsResult
+    return SettingsResult(api_key=api_key, target_language=target_language)
+
+def ensure_audio_config(config: dict[str, Any]) -> bool:
+    """Return whether audio can be generated, warning the user if not."""
+    error = providers.audio_config_error(config)
+    if error is not None:
+        show_warning(error)
+        return False
+    return True
+
+def generate_card() -> None:
+    settings = ensure_settings()
+    if not settings:
+        show_warning("OpenAI configuration required to generate card.")
+        return
+    if not ensure_audio_config(mw.addonManager.getConfig(ADDON_NAME) or {}):
+        return
+
+    # Existing cards are pointed out in the preview, the typed term may not
+    # be the dictionary form the card is saved under
+    result = get_card_input_dialog(mw)
+    if not result:
+        return
+
+    generate_card_in_background(result)
+
+def generate_card_in_background(
+    request: CardInputResult,
+    regenerate: bool = False,
+    prefetched: Optional[Future[GermanCard]] = None,
+) -> None:
+    """Generate the card off the main thread and preview it when ready.
+
+    A ``prefetched`` card being generated already is used instead, unless
+    generating it failed.
+    """
+    if prefetched is not None and prefetched.done() and not prefetched.exception():
+        preview_card(request, prefetched.result())
+        return
+    config = mw.addonManager.getConfig(ADDON_NAME) or {}
+    if not ensure_audio_config(config):
+        return
+    vocab_provider = providers.vocab_provider(config)
+    audio_provider = providers.audio_provider(config)
+    progress = GenerationProgressDialog(mw, f"Generating card: {request.term}")
+
+    def task() -> GermanCard:
+        if prefetched is not None:
+            try:
+                return prefetched.result()
+            except Exception:
+                # Generate it again below, reporting progress this time
+                pass
+        return GermanCard.create_from_user_input(
+            request.term,
+            request.context,
+            # Regenerate must not serve the answer the user just rejected
+            vocab_provider.refreshing() if regenerate else vocab_provider,
+            audio_provider,
+            on_update=lambda partial: mw.taskman.run_on_main(
+                lambda: progress.show_partial(partial)
+            ),
+            # Stops the stream and the audio jobs once the user cancels
+            is_cancelled=progress.cancelled.is_set,
+        )
+
+    def on_done(future: Future[GermanCard]) -> None:
+        progress.accept()
+        if progress.cancelled.is_set():
+            return
+        try:
+            card = future.result()
+        except Exception as e:
+            show_warning(f"Failed to generate card: {str(e)}")
+            return
+        preview_card(request, card)
+
+    progress.show()
+    mw.taskman.run_in_background(task, on_done)
+
+def preview_card(request: CardInputResult, card: GermanCard) -> None:
+    if not card.is_valid():
+        show_warning("Invalid card data.")
+        return
+
+    _prefetch_alternative(request)
+    preview_dialog_result = show_card_preview_dialog(
+        mw, card, anki_service.card_exists(card.get_unique_id())
+    )
+    alternative = _take_alternative(request, preview_dialog_result)
+    if preview_dialog_result.result == CardPreviewResult.SAVE:
+        try:
+            removed = anki_service.save_card(card, request.selected_deck_id)
+            success_message = f"German card created: {card.term}"
+            if removed:
+                success_message += f", Removed duplicate cards: {removed}"
+            show_info(success_message)
+        except Exception as e:
+            show_warning(f"Failed to create card: {str(e)}")
+    elif preview_dialog_result.result == CardPreviewResult.REGENERATE:
+        # Update context if provided
+        if preview_dialog_result.updated_context is not None:
+            request.context = preview_dialog_result.updated_context
+        generate_card_in_background(request, regenerate=True, prefetched=alternative)
+
+def _prefetch_alternative(request: CardInputResult) -> None:
+    """Start generating another card for ``request`` while it is previewed."""
+    global _alternative, _alternative_vocab
+    if _alternative is not None:
+        _alternative.cancel()
+        _alternative = _alternative_vocab = None
+    config = mw.addonManager.getConfig(ADDON_NAME) or {}
+    if not config.get("prefetch_regenerate", True):
+        return
+    if providers.audio_config_error(config) is not None:
+        return
+    # The alternative must differ from the card being previewed, and is
+    # only cached once the user asks for it
+    vocab_provider = providers.vocab_provider(config).refreshing(store=False)
+    audio_provider = providers.audio_provider(config)
+    term, context = request.term, request.context
+
+    def generate(is_cancelled: Callable[[], bool]) -> GermanCard:
+        with tracing.span("card.prefetch"):
+            return GermanCard.create_from_user_input(
+                term,
+                context,
+                vocab_provider,
+                audio_provider,
+                is_cancelled=is_cancelled,
+            )
+
+    # The preview dialog returns the context stripped
+    _alternative = Prefetch((term, context.strip()), generate)
+    _alternative_vocab = vocab_provider
+
+def _take_alternative(
+    request: CardInputResult, dialog_result: CardPreviewDialogResult
+) -> Optional[Future[GermanCard]]:
+    """Return the prefetched card if the user wants to regenerate ``request``.
+
+    It is only usable while the context was not edited, in every other case
+    it is cancelled.
+    """
+    global _alternative, _alternative_vocab
+    alternative, _alternative = _alternative, None
+    vocab, _alternative_vocab = _alternative_vocab, None
+    if alternative is None or vocab is None:
+        return None
+    context = request.context
+    if dialog_result.updated_context is not None:
+        context = dialog_result.updated_context
+    if dialog_result.result != CardPreviewResult.REGENERATE:
+        alternative.cancel()
+        return None
+    future = alternative.take((request.term, context.strip()))
+    if future is not None:
+        # Only an alternative actually shown replaces the cached answer
+        future.add_done_callback(
+            lambda done: vocab.commit() if done.exception() is None else None
+        )
+    return future
+
+def generate_batch() -> None:
+    settings = ensure_settings()
+    if not settings:
+        show_warning("OpenAI configuration required to generate cards.")
+        return
+    if not ensure_audio_config(mw.addonManager.getConfig(ADDON_NAME) or {}):
+        return
+
+    journal = _unfinished_batch()
+    if journal is None:
+        result = get_batch_input_dialog(mw)
+        if not result:
+            return
+
+        entries = parse_batch_input(result.text)
+        if not entries:
+            show_warning("No terms found.")
+            return
+        os.makedirs(BATCH_JOBS_DIR, exist_ok=True)
+        journal = BatchJournal.create(
+            BATCH_JOBS_DIR, entries, result.selected_deck_id
+        )
+    run_batch(journal)
+
+def _unfinished_batch() -> Optional[BatchJournal]:
+    """Return the unfinished batch the user wants to resume, if any.
+
+    Every unfinished job is offered, newest first. Only the jobs the user
+    discards are deleted, the others are offered again next time.
+    """
+    for journal in reversed(find_unfinished(BATCH_JOBS_DIR)):
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(journal.created))
+        choice = ask_choice(
+            f"A batch of {len(journal.entries)} terms started {started} is "
+            f"unfinished, {journal.saved} of them are saved. Resume it?\n\n"
+            "Terms already looked up or synthesized are not requested again. "
+            "Discarding it deletes them.",
+            [RESUME_BATCH, DISCARD_BATCH, KEEP_BATCH],
+        )
+        if choice == RESUME_BATCH:
+            return journal
+        if choice == DISCARD_BATCH:
+            journal.remove()
+    return None
+
+def run_batch(journal: BatchJournal) -> None:
+    """Generate and save the unsaved terms of ``journal``.
+
+    Every finished stage is recorded in the journal, so after a crash or
+    cancel the job continues where it stopped instead of paying again.
+    """
+    config = mw.addonManager.getConfig(ADDON_NAME) or {}
+    entries = journal.batch_entries
+    generator = BatchCardGenerator(
+        providers.vocab_provider(config, batch=True),
+        providers.audio_provider(config),
+        vocab_workers=providers.vocab_workers(config),
+        audio_workers=providers.audio_workers(config),
+    )
+    deck_id = journal.deck_id
+    already_saved = journal.saved
+    progress = GenerationProgressDialog(mw, "Generating German cards...")
+    # Audio is written on a worker thread so disk I/O doesn't hold up saving
+    media_writer = MediaWriter(mw.col.media, background=True)
+    saved: list[str] = []
+    merged: list[str] = []
+    failed: list[str] = []
+    # Left over by a cancel, kept in the journal for the next run
+    not_processed: list[str] = []
+    # Indices saved in this run, duplicates share the note of their leader
+    saved_in_run: set[int] = set()
+
+    def left_by_cancel(batch_result: BatchResult) -> bool:
+        return progress.cancelled.is_set() and batch_result.error == "Cancelled"
+
+    def save(batch_results: list[BatchResult]) -> None:
+        # Runs on the main thread, where the collection may be modified.
+        cards = []
+        indices = []
+        duplicates = []
+        saved_indices = []
+        for batch_result in batch_results:
+            if batch_result.duplicate_of is not None:
+                duplicates.append(batch_result)
+            elif batch_result.card is None:
+                if left_by_cancel(batch_result):
+                    not_processed.append(batch_result.entry.term)
+                else:
+                    failed.append(f"{batch_result.entry.term}: {batch_result.error}")
+            else:
+                cards.append(batch_result.card)
+                indices.append(batch_result.index)
+        try:
+            save_results = anki_service.save_cards(cards, deck_id, media_writer)
+        except Exception as e:
+            failed.extend(f"{card.term}: {str(e)}" for card in cards)
+            save_results = []
+        for index, card, save_result in zip(indices, cards, save_results):
+            if save_result.error is None:
+                if save_result.replaced_by is None:
+                    saved.append(card.term)
+                else:
+                    # A later term with the same card id took its place
+                    merged.append(card.term)
+                saved_indices.append(index)
+                saved_in_run.add(index)
+            else:
+                failed.append(f"{card.term}: {save_result.error}")
+        for duplicate in duplicates:
+            # Its leader came first, in this chunk or an earlier one
+            if duplicate.duplicate_of in saved_in_run:
+                merged.append(duplicate.entry.term)
+                saved_indices.append(duplicate.index)
+            elif left_by_cancel(duplicate):
+                not_processed.append(duplicate.entry.term)
+            else:
+                failed.append(
+                    f"{duplicate.entry.term}: "
+                    f"{duplicate.error or 'Duplicate of a term that failed'}"
+                )
+        # Only once their audio is in the media folder the terms are done
+        media_writer.after_writes(lambda: journal.record_saved(saved_indices))
+
+    def update_progress(done: int, total: int) -> None:
+        progress.set_progress(
+            done, total, f"Generating German cards: {done}/{total}"
+        )
+
+    def task() -> None:
+        pending: list[BatchResult] = []
+        for batch_result in generator.iter_results(
+            entries,
+            on_progress=lambda done, total: mw.taskman.run_on_main(
+                lambda: update_progress(done, total)
+            ),
+            is_cancelled=progress.cancelled.is_set,
+            journal=journal,
+        ):
+            # Notes are added in chunks, each with a single collection save
+            pending.append(batch_result)
+            if len(pending) >= SAVE_CHUNK_SIZE:
+                mw.taskman.run_on_main(lambda chunk=pending: save(chunk))
+                pending = []
+        if pending:
+            mw.taskman.run_on_main(lambda: save(pending))
+
+    def on_done(future: Future[None]) -> None:
+        error = future.exception()
+        if error:
+            mw.taskman.run_in_background(media_writer.close)
+            progress.accept()
+            show_warning(
+                f"Batch generation failed: {str(error)}\n"
+                "Run the batch again to resume it."
+            )
+            return
+        progress.set_progress(len(entries), len(entries), "Writing audio files...")
+        mw.taskman.run_in_background(media_writer.close, on_flushed)
+
+    def on_flushed(future: Future[list[str]]) -> None:
+        progress.accept()
+        failed.extend(future.result())
+        # Merged duplicates are done too, their card was created once
+        done = already_saved + len(saved) + len(merged)
+        message = f"German cards created: {done} of {len(entries)}"
+        cancelled = progress.cancelled.is_set()
+        if cancelled:
+            message += " (cancelled)"
+        if not_processed:
+            message += (
+                f"\n{len(not_processed)} not processed, "
+                "run the batch again to resume."
+            )
+        if merged:
+            message += f"\nDuplicate terms merged: {', '.join(merged)}"
+        if not cancelled and journal.complete:
+            journal.remove()
+        elif not cancelled:
+            # Kept until the user retries or discards the unsaved terms
+            message += "\nRun the batch again to retry the failed terms."
+        if failed:
+            message += "\nFailed:\n" + "\n".join(failed)
+        show_info(message)
+
+    progress.show()
+    mw.taskman.run_in_background(task, on_done)
+
+def show_timing_summary() -> None:
+    """Show the p50/p95 duration of every traced stage."""
+    active = tracing.tracer()
+    if active is None:
+        show_info("Timing is off. Set tracing_enabled to true in the addon config.")
+        return
+    stages = active.summary()
+    if not stages:
+        show_info("No timings recorded yet.")
+        return
+    lines = [
+        f"{stage.name}: {stage.count}x, p50 {stage.p50:.1f} ms, "
+        f"p95 {stage.p95:.1f} ms"
+        for stage in stages
+    ]
+    show_info("\n".join(lines) + f"\n\nDetails are logged to {TRACE_LOG}")
+
+def prewarm() -> None:
+    """Create the providers, importing the bundled SDKs, ahead of first use.
+
+    Runs on a background thread. Failures are ignored, they are reported
+    when the user generates a card.
+    """
+    config: dict[str, Any] = mw.addonManager.getConfig(ADDON_NAME) or {}
+    for create in (providers.vocab_provider, providers.audio_provider):
+        try:
+            create(config)
+        except Exception:
+            pass
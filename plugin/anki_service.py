@@ -1,14 +1,67 @@
-import os
-from typing import Any
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
 
 from core.audio_card import AudioCard
+from core.tracing import span
+
+from .media_writer import MediaWriter
+from .note_index import NoteIdIndex
+
+
+@dataclass
+class SaveResult:
+    card: AudioCard
+    removed: int = 0
+    error: Optional[str] = None
+    # Index of the later card with the same id whose note was added instead
+    replaced_by: Optional[int] = None
 
 
 class AnkiService:
-    def __init__(self, mw: Any, model_name: str, template_name: str) -> None:
+    def __init__(
+        self,
+        mw: Any,
+        model_name: str,
+        template_name: str,
+        confirm: Optional[Callable[[str], bool]] = None,
+    ) -> None:
         self.mw = mw
         self.model_name = model_name
         self.template_name = template_name
+        # Asked before an existing note type is changed, declined without it
+        self.confirm = confirm
+        self._keep_model = False
+        # Field name -> index of that field, built on first use per collection
+        self._indexes: dict[str, NoteIdIndex] = {}
+
+    def _note_index(self, model: Any, field_name: str) -> NoteIdIndex:
+        index = self._indexes.get(field_name)
+        if index is None or not index.is_current(self.mw.col, model):
+            index = NoteIdIndex(self.mw.col, model, field_name)
+            self._indexes[field_name] = index
+        return index
+
+    def invalidate(self) -> None:
+        """Drop the indexes, they are rebuilt on next use.
+
+        Needed whenever notes may have changed outside this service, e.g. by
+        a sync, an import or an edit in the browser.
+        """
+        self._indexes.clear()
+
+    def forget_notes(self, note_ids: Sequence[int]) -> None:
+        """Drop removed notes from the indexes."""
+        for index in self._indexes.values():
+            index.remove(note_ids)
+
+    def card_exists(self, card_id: tuple[str, str]) -> bool:
+        """Return whether a note with the given card ID is already saved."""
+        model = self.mw.col.models.by_name(self.model_name)
+        if not model:
+            return False
+        field_name, field_value = card_id
+        return bool(self._note_index(model, field_name).find(field_value))
 
     def _ensure_model_exists(self, card: AudioCard) -> Any:
         """
@@ -18,6 +71,19 @@ class AnkiService:
         """
         model = self.mw.col.models.by_name(self.model_name)
         if model:
+            # Models created by older versions may lack newer fields
+            existing = {field['name'] for field in model['flds']}
+            missing = [name for name in card.get_fields() if name not in existing]
+            if missing and not self._keep_model and self._confirm_update(missing):
+                for name in missing:
+                    self.mw.col.models.add_field(
+                        model, self.mw.col.models.new_field(name)
+                    )
+                self._show_new_fields(model, card, missing)
+                self.mw.col.models.update_dict(model)
+            elif missing:
+                # Not asked again this session, notes are saved without them
+                self._keep_model = True
             return model
 
         # Create a new model and add fields
@@ -37,47 +103,161 @@ class AnkiService:
         self.mw.col.models.add(model)
         return model
 
-    def _save_card_audio_to_media(self, card: AudioCard) -> None:
+    def _confirm_update(self, names: list[str]) -> bool:
+        if self.confirm is None:
+            return False
+        return self.confirm(
+            f"The note type '{self.model_name}' lacks the fields "
+            f"{', '.join(names)} used by this version of the addon. Add them "
+            "and show them on its cards?\n\n"
+            "Changing a note type requires a full sync, the next sync uploads "
+            "the whole collection. Without them new cards are saved "
+            "without this content."
+        )
+
+    @staticmethod
+    def _show_new_fields(model: Any, card: AudioCard, names: list[str]) -> None:
         """
-        Save the audio data from the AudioCard to Anki's media directory,
-        overwriting if it exists.
-        Does nothing if there is no audio data or filename.
+        Make fields added to an existing model appear on its cards.
+        Templates still matching the shipped one apart from the new fields are
+        replaced by the current version. Customized templates keep their
+        layout and get the new fields appended to the front.
         """
-        audio_data = card.get_audio_data()
-        filename = card.get_audio_filename()
-        if audio_data is None or not filename:
-            return
-        media_dir = self.mw.col.media.dir()
-        destination = os.path.join(media_dir, filename)
-        try:
-            with open(destination, "wb") as fh:
-                fh.write(audio_data)
-        except Exception:
-            pass
-
-    def _delete_duplicated_cards(self, card_id: tuple[str, str]) -> int:
-        field_name, field_value = card_id
-        query = f'note:"{self.model_name}" {field_name}:"{field_value}"'
-        note_ids = self.mw.col.find_notes(query)
+        references = {name: "{{" + name + "}}" for name in names}
+        template_data = card.get_template()
+        for template in model['tmpls']:
+            updated = True
+            for key in ('qfmt', 'afmt'):
+                shipped = template_data.get(key, '')
+                previous = "\n".join(
+                    line for line in shipped.split("\n")
+                    if line.strip() not in references.values()
+                )
+                if template[key] != previous:
+                    updated = False
+            if updated:
+                template['qfmt'] = template_data.get('qfmt', '')
+                template['afmt'] = template_data.get('afmt', '')
+                continue
+            shown = template['qfmt'] + template['afmt']
+            for reference in references.values():
+                if reference not in shown:
+                    template['qfmt'] += "\n" + reference
+
+    def _save_card_audio_to_media(
+        self, card: AudioCard, media_writer: MediaWriter
+    ) -> None:
+        """
+        Save the audio data from the AudioCard to Anki's media folder,
+        replacing files with different content.
+        Skips the sentence or term audio if it has no data or filename.
+        """
+        for audio_data, filename in (
+            (card.get_audio_data(), card.get_audio_filename()),
+            (card.get_term_audio_data(), card.get_term_audio_filename()),
+        ):
+            if audio_data is None or not filename:
+                continue
+            with span("anki.media_write", bytes=len(audio_data)):
+                media_writer.write(filename, audio_data)
+
+    def _delete_duplicated_cards(
+        self, model: Any, added: dict[tuple[str, str], int]
+    ) -> dict[tuple[str, str], int]:
+        """
+        Remove the notes replaced by the freshly added ones with a single call.
+        ``added`` maps card IDs to the note added for them, which is kept.
+        Returns the number of removed notes per card ID.
+        """
+        removed = {}
+        note_ids: list[int] = []
+        for (field_name, field_value), keep in added.items():
+            found = [
+                note_id
+                for note_id in self._note_index(model, field_name).find(field_value)
+                if note_id != keep
+            ]
+            removed[(field_name, field_value)] = len(found)
+            note_ids.extend(found)
         if note_ids:
             self.mw.col.remove_notes(note_ids)
-            self.mw.col.save()
+            self.forget_notes(note_ids)
+        return removed
 
-        return len(note_ids)
+    def save_cards(
+        self,
+        cards: Sequence[AudioCard],
+        deck_id: Any,
+        media_writer: Optional[MediaWriter] = None,
+    ) -> list[SaveResult]:
+        """
+        Save many AudioCards to Anki in the specified deck at once.
+        Existing notes with the same card IDs are removed in one call once their
+        replacements have been added, so a card failing to save keeps its old
+        note. The collection is saved once. When several cards share an ID only the last
+        one is added, the others are reported with ``replaced_by`` and share
+        its outcome. Audio goes through ``media_writer``, by default written
+        before each note is added. Returns a SaveResult per card, in order.
+        """
+        if not cards:
+            return []
+        with span("anki.save_cards", cards=len(cards)):
+            return self._save_cards(cards, deck_id, media_writer)
+
+    def _save_cards(
+        self,
+        cards: Sequence[AudioCard],
+        deck_id: Any,
+        media_writer: Optional[MediaWriter],
+    ) -> list[SaveResult]:
+        if media_writer is None:
+            media_writer = MediaWriter(self.mw.col.media)
+        with span("anki.model_lookup"):
+            model = self._ensure_model_exists(cards[0])
+        model_fields = {field['name'] for field in model['flds']}
+
+        last_index = {card.get_unique_id(): i for i, card in enumerate(cards)}
+        added: dict[tuple[str, str], int] = {}
+        results = []
+        for i, card in enumerate(cards):
+            card_id = card.get_unique_id()
+            if last_index[card_id] != i:
+                results.append(SaveResult(card, replaced_by=last_index[card_id]))
+                continue
+            try:
+                self._save_card_audio_to_media(card, media_writer)
+                with span("anki.add_note"):
+                    note = self.mw.col.new_note(model)
+                    for name, value in card.get_fields().items():
+                        # The user may have kept a note type lacking fields
+                        if name in model_fields:
+                            note[name] = value
+                    self.mw.col.add_note(note, deck_id)
+                self._note_index(model, card_id[0]).add(card_id[1], note.id)
+                added[card_id] = note.id
+                results.append(SaveResult(card))
+            except Exception as e:
+                results.append(SaveResult(card, error=str(e)))
+
+        # Only notes that got a replacement are removed
+        with span("anki.duplicate_search"):
+            removed = self._delete_duplicated_cards(model, added)
+        for result in results:
+            if result.error is None and result.replaced_by is None:
+                result.removed = removed[result.card.get_unique_id()]
+        for result in results:
+            if result.replaced_by is not None:
+                result.error = results[result.replaced_by].error
+        with span("anki.commit"):
+            self.mw.col.save()
+        return results
 
     def save_card(self, card: AudioCard, deck_id: Any) -> int:
         """
         Save an AudioCard to Anki in the specified deck.
         Replaces all cards with the same card ID and returns the number of removed.
         """
-        model = self._ensure_model_exists(card)
-        removed = self._delete_duplicated_cards(card.get_unique_id())
-
-        note = self.mw.col.new_note(model)
-        fields_map = card.get_fields()
-        for i, value in enumerate(fields_map.values()):
-            note.fields[i] = value
-        self.mw.col.add_note(note, deck_id)
-        self.mw.col.save()
-        self._save_card_audio_to_media(card)
-        return removed
+        result = self.save_cards([card], deck_id)[0]
+        if result.error is not None:
+            raise RuntimeError(result.error)
+        return result.removed
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class MediaWriter:
+    """
+    Write media files through Anki's media manager, so sync picks them up.
+    Files already holding identical bytes are left untouched. With
+    ``background`` the writes happen on a worker thread and ``flush`` waits
+    for them and returns the errors encountered; ``close`` does the same
+    and stops the worker.
+    """
+
+    def __init__(self, media: Any, *, background: bool = False) -> None:
+        self.media = media
+        self._lock = threading.Lock()
+        # File name -> checksum of the content known to be on disk
+        self._written: dict[str, str] = {}
+        self._errors: list[str] = []
+        self._pending: list[Future[None]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if background:
+            # A single worker keeps the writes of a file in submission order
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def write(self, filename: str, data: bytes) -> None:
+        """Store ``data`` as ``filename`` unless it is already there."""
+        if self._executor is None:
+            self._write(filename, data)
+            return
+        future = self._executor.submit(self._write_logged, filename, data)
+        with self._lock:
+            self._pending.append(future)
+
+    def after_writes(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` once the writes submitted so far are done."""
+        if self._executor is None:
+            callback()
+            return
+        future = self._executor.submit(self._call_logged, callback)
+        with self._lock:
+            self._pending.append(future)
+
+    def flush(self) -> list[str]:
+        """Wait for background writes and return their errors."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+        with self._lock:
+            errors, self._errors = self._errors, []
+        return errors
+
+    def close(self) -> list[str]:
+        """Wait for background writes, stop the worker and return the errors."""
+        errors = self.flush()
+        if self._executor is not None:
+            self._executor.shutdown()
+        return errors
+
+    def _write_logged(self, filename: str, data: bytes) -> None:
+        try:
+            self._write(filename, data)
+        except Exception as e:
+            with self._lock:
+                self._errors.append(f"{filename}: {str(e)}")
+
+    def _call_logged(self, callback: Callable[[], None]) -> None:
+        try:
+            callback()
+        except Exception as e:
+            with self._lock:
+                self._errors.append(str(e))
+
+    def _write(self, filename: str, data: bytes) -> None:
+        checksum = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            if self._written.get(filename) == checksum:
+                return
+        path = os.path.join(self.media.dir(), filename)
+        if os.path.exists(path):
+            if self._file_checksum(path, len(data)) == checksum:
+                with self._lock:
+                    self._written[filename] = checksum
+                return
+            # Anki would store different content under a new name, but the
+            # note already refers to this one
+            self.media.trash_files([filename])
+        stored = self.media.write_data(filename, data)
+        if stored != filename:
+            raise RuntimeError(f"Media file stored as {stored}")
+        with self._lock:
+            self._written[filename] = checksum
+
+    @staticmethod
+    def _file_checksum(path: str, expected_size: int) -> Optional[str]:
+        if os.path.getsize(path) != expected_size:
+            return None
+        with open(path, "rb") as fh:
+            return hashlib.sha1(fh.read()).hexdigest()
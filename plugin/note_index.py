@@ -0,0 +1,50 @@
+from collections.abc import Iterable
+from typing import Any
+
+
+class NoteIdIndex:
+    """
+    In-memory map from the values of one note type field to note ids.
+    Built with a single query and then kept up to date incrementally, so
+    duplicate checks do not need a collection search. Changes made elsewhere,
+    like syncs, imports and edits, are not seen; the owner has to drop the
+    index when they happen.
+    """
+
+    def __init__(self, col: Any, model: Any, field_name: str) -> None:
+        self.col = col
+        self.model_id = model['id']
+        self.field_name = field_name
+        self._notes: dict[str, set[int]] = {}
+        self._values: dict[int, str] = {}
+
+        ords = [f['ord'] for f in model['flds'] if f['name'] == field_name]
+        if not ords:
+            return
+        field_ord = ords[0]
+        rows = col.db.all("select id, flds from notes where mid = ?", self.model_id)
+        for note_id, fields in rows:
+            values = fields.split("\x1f")
+            if field_ord < len(values):
+                self.add(values[field_ord], note_id)
+
+    def is_current(self, col: Any, model: Any) -> bool:
+        """Return whether the index was built for this collection and model."""
+        return col is self.col and model['id'] == self.model_id
+
+    def find(self, value: str) -> list[int]:
+        return sorted(self._notes.get(value, ()))
+
+    def add(self, value: str, note_id: int) -> None:
+        self._notes.setdefault(value, set()).add(note_id)
+        self._values[note_id] = value
+
+    def remove(self, note_ids: Iterable[int]) -> None:
+        for note_id in note_ids:
+            value = self._values.pop(note_id, None)
+            if value is None:
+                continue
+            notes = self._notes[value]
+            notes.discard(note_id)
+            if not notes:
+                del self._notes[value]
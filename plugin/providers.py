@@ -0,0 +1,235 @@
+import os
+import shutil
+import threading
+from typing import Any, Optional, Union
+
+from core.cached_audio_provider import CachedAudioProvider
+from core.cached_vocab_provider import CachedVocabProvider
+from core.german_card import GermanCard
+from core.gtts_audio_provider import GttsAudioProvider
+from core.local_tts_audio_provider import ENGINES, LocalTtsAudioProvider
+from core.openai_vocab_provider import OpenaiVocabProvider
+from core.request_scheduler import RequestScheduler
+
+
+class ProviderRegistry:
+    """
+    Lazily create the vocab and audio providers once per Anki session.
+    Providers keep their HTTP connection pools and loaded prompts between
+    generations and are only rebuilt when the config values they use change.
+    """
+
+    def __init__(self, user_files_dir: str) -> None:
+        self.user_files_dir = user_files_dir
+        self._lock = threading.Lock()
+        # Role ("interactive" or "batch") -> (config key, provider)
+        self._vocab: dict[str, tuple[tuple[Any, ...], CachedVocabProvider]] = {}
+        self._audio: Optional[CachedAudioProvider] = None
+        self._audio_key: Optional[tuple[Any, ...]] = None
+        self._schedulers: dict[str, tuple[tuple[Any, ...], RequestScheduler]] = {}
+
+    def vocab_provider(
+        self, config: dict[str, Any], *, batch: bool = False
+    ) -> CachedVocabProvider:
+        """Return the OpenAI vocab provider wrapped by the persistent cache.
+
+        With ``batch`` the provider for batch imports is returned. It talks to
+        ``batch_base_url`` when one is configured, e.g. a llama.cpp or vLLM
+        server on the local network, and is the interactive one otherwise.
+        """
+        role = self._vocab_role(config, batch)
+        endpoint = self._vocab_endpoint(config, role)
+        ttl_days = config.get("vocab_cache_ttl_days", 90)
+        max_entries = config.get("vocab_cache_max_entries", 20000)
+        key: tuple[Any, ...] = endpoint + (
+            config.get("target_language", ""),
+            config.get("openai_structured_output", "strict"),
+            ttl_days,
+            max_entries,
+        )
+        with self._lock:
+            scheduler = self._openai_scheduler(config, role)
+            # Compared by identity, a new scheduler needs a new provider
+            key += (scheduler,)
+            cached = self._vocab.get(role)
+            if cached is None or key != cached[0]:
+                api_key, base_url, model = endpoint
+                provider = OpenaiVocabProvider(
+                    api_key,
+                    config.get("target_language", ""),
+                    model=model,
+                    base_url=base_url or None,
+                    scheduler=scheduler,
+                    structured_output=config.get("openai_structured_output", "strict"),
+                )
+                os.makedirs(self.user_files_dir, exist_ok=True)
+                cached = key, CachedVocabProvider(
+                    provider,
+                    os.path.join(self.user_files_dir, "vocab_cache.sqlite3"),
+                    namespace=provider.cache_namespace,
+                    max_entries=max_entries,
+                    ttl_seconds=ttl_days * 86400 if ttl_days else None,
+                    # Variants of a term end up as the same card anyway
+                    normalize=lambda term: GermanCard.unique_id_for_term(term)[1],
+                )
+                # Closing is safe while a generation still uses the old one,
+                # it only stops caching
+                previous = self._vocab.get(role)
+                if previous is not None:
+                    previous[1].close()
+                self._vocab[role] = cached
+            return cached[1]
+
+    def vocab_workers(self, config: dict[str, Any]) -> int:
+        """Return how many batch vocab requests may run in parallel."""
+        role = self._vocab_role(config, batch=True)
+        return max(1, int(self._scheduler_limits(config, role)[2]))
+
+    @staticmethod
+    def _vocab_role(config: dict[str, Any], batch: bool) -> str:
+        return "batch" if batch and config.get("batch_base_url") else "interactive"
+
+    @staticmethod
+    def _vocab_endpoint(config: dict[str, Any], role: str) -> tuple[str, str, str]:
+        """Return the API key, base URL and model used for ``role``."""
+        model = config.get("openai_model") or "gpt-3.5-turbo"
+        if role == "batch":
+            return (
+                config.get("batch_api_key", ""),
+                config.get("batch_base_url", ""),
+                config.get("batch_model") or model,
+            )
+        return (
+            config.get("openai_api_key", ""),
+            config.get("openai_base_url", ""),
+            model,
+        )
+
+    @staticmethod
+    def _scheduler_limits(config: dict[str, Any], role: str) -> tuple[int, int, int]:
+        """Return requests and tokens per minute and concurrency for ``role``."""
+        if role == "batch":
+            # Our own server has no rate limits, only so many parallel slots
+            return (0, 0, config.get("batch_max_concurrency", 8))
+        return (
+            config.get("openai_requests_per_minute", 500),
+            config.get("openai_tokens_per_minute", 200000),
+            config.get("openai_max_concurrency", 4),
+        )
+
+    def _openai_scheduler(self, config: dict[str, Any], role: str) -> RequestScheduler:
+        """Return the scheduler shared by all requests made to an endpoint."""
+        key = self._vocab_endpoint(config, role) + self._scheduler_limits(config, role)
+        cached = self._schedulers.get(role)
+        if cached is None or key != cached[0]:
+            requests_per_minute, tokens_per_minute, max_concurrency = key[3:]
+            cached = key, RequestScheduler(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrency=max(1, max_concurrency),
+            )
+            self._schedulers[role] = cached
+        return cached[1]
+
+    def audio_provider(self, config: dict[str, Any]) -> CachedAudioProvider:
+        """Return the configured audio provider wrapped by the persistent cache."""
+        key = (
+            config.get("audio_cache_max_mb", 200),
+            config.get("audio_engine", "gtts"),
+            config.get("local_tts_executable", ""),
+            config.get("local_tts_voice", ""),
+            config.get("gtts_requests_per_minute", 300),
+            config.get("gtts_max_concurrency", 4),
+        )
+        with self._lock:
+            if self._audio is None or key != self._audio_key:
+                provider = self._create_audio_provider(config)
+                self._close_audio()
+                self._audio = CachedAudioProvider(
+                    provider,
+                    os.path.join(self.user_files_dir, "audio_cache"),
+                    namespace=provider.cache_namespace,
+                    max_bytes=key[0] * 1024 * 1024,
+                )
+                self._audio_key = key
+            return self._audio
+
+    @staticmethod
+    def _create_audio_provider(
+        config: dict[str, Any],
+    ) -> Union[GttsAudioProvider, LocalTtsAudioProvider]:
+        engine = config.get("audio_engine", "gtts")
+        if engine == "gtts":
+            return GttsAudioProvider(
+                "de",
+                scheduler=GttsAudioProvider.default_scheduler(
+                    requests_per_minute=config.get("gtts_requests_per_minute", 300),
+                    max_concurrency=max(1, config.get("gtts_max_concurrency", 4)),
+                ),
+            )
+        return LocalTtsAudioProvider(
+            engine,
+            ProviderRegistry._local_voice(config),
+            executable=config.get("local_tts_executable", ""),
+        )
+
+    @staticmethod
+    def _local_voice(config: dict[str, Any]) -> str:
+        voice = str(config.get("local_tts_voice", ""))
+        if not voice and config.get("audio_engine") == "espeak-ng":
+            voice = "de"
+        return voice
+
+    @staticmethod
+    def audio_config_error(config: dict[str, Any]) -> Optional[str]:
+        """Return why no audio provider can be created from ``config``.
+
+        Checks only what is cheap, so it can run on the main thread before
+        any provider is created.
+        """
+        engine = config.get("audio_engine", "gtts")
+        if engine == "gtts":
+            return None
+        if engine not in ENGINES:
+            return (
+                f"Unknown audio_engine '{engine}'. Use gtts, "
+                f"{' or '.join(ENGINES)} in the addon config."
+            )
+        if not ProviderRegistry._local_voice(config):
+            return (
+                "No Piper voice configured. Set local_tts_voice to the path "
+                "of a Piper .onnx voice model in the addon config."
+            )
+        executable = config.get("local_tts_executable", "") or engine
+        if shutil.which(executable) is None:
+            return (
+                f"The '{executable}' program was not found. Please install "
+                f"{engine} or set local_tts_executable in the addon config."
+            )
+        return None
+
+    def _close_audio(self) -> None:
+        # Local engines keep processes running, they are stopped once the
+        # generations still using them are done
+        if self._audio is not None:
+            provider = self._audio.provider
+            if isinstance(provider, LocalTtsAudioProvider):
+                provider.close()
+
+    @staticmethod
+    def audio_workers(config: dict[str, Any]) -> int:
+        """Return how many texts to synthesize in parallel during batches."""
+        if config.get("audio_engine", "gtts") == "gtts":
+            return max(1, int(config.get("gtts_max_concurrency", 4)))
+        # Local engines are bound by the CPU, not by a remote service
+        return os.cpu_count() or 4
+
+    def invalidate(self) -> None:
+        """Drop all providers, they are recreated on next use."""
+        with self._lock:
+            for _, provider in self._vocab.values():
+                provider.close()
+            self._vocab.clear()
+            self._close_audio()
+            self._audio = None
+            self._schedulers.clear()
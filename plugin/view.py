@@ -1,3 +1,4 @@
+import threading
 from dataclasses import dataclass
 from enum import Enum, auto
 from typing import Any, Optional
@@ -8,13 +9,15 @@ from aqt.qt import (  # type: ignore
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QProgressBar,
     QPushButton,
     QTextEdit,
     QVBoxLayout,
 )
-from aqt.utils import showInfo, showWarning  # type: ignore
+from aqt.utils import askUser, askUserDialog, showInfo, showWarning  # type: ignore
 
 from core.german_card import GermanCard
+from core.vocab_provider import VocabItem
 
 
 class CardPreviewResult(Enum):
@@ -28,6 +31,11 @@ class CardInputResult:
     selected_deck_id: int
     context: str
 
+@dataclass
+class BatchInputResult:
+    text: str
+    selected_deck_id: int
+
 @dataclass
 class SettingsResult:
     api_key: str
@@ -39,6 +47,56 @@ class CardPreviewDialogResult:
     updated_context: Optional[str] = None
 
 
+class GenerationProgressDialog(QDialog):  # type: ignore[misc]
+    """
+    Non-modal progress window for work running in the background.
+    Closing it or pressing Cancel sets ``cancelled``, which may be checked from
+    any thread.
+    """
+
+    def __init__(self, mw: Any, message: str) -> None:
+        super().__init__(mw)
+        self.setWindowTitle("German Card Generator")
+        self.setMinimumWidth(300)
+        self.cancelled = threading.Event()
+
+        layout = QVBoxLayout()
+        self._label = QLabel(message)
+        self._label.setWordWrap(True)
+        # A range of 0..0 shows a busy indicator until progress is known
+        self._bar = QProgressBar()
+        self._bar.setRange(0, 0)
+        # Filled in while the vocabulary is streamed
+        self._preview = QLabel()
+        self._preview.setWordWrap(True)
+        self._preview.hide()
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        layout.addWidget(self._label)
+        layout.addWidget(self._bar)
+        layout.addWidget(self._preview)
+        layout.addWidget(cancel_button)
+        self.setLayout(layout)
+
+    def set_progress(self, done: int, total: int, message: str) -> None:
+        self._label.setText(message)
+        self._bar.setRange(0, total)
+        self._bar.setValue(done)
+
+    def show_partial(self, item: VocabItem) -> None:
+        self._preview.setText(
+            f"<div><b>{item.term}</b></div>"
+            f"<div>{item.term_translation}</div>"
+            f"<div>{item.sentence}</div>"
+            f"<div>{item.sentence_translation}</div>"
+        )
+        self._preview.show()
+
+    def reject(self) -> None:
+        self.cancelled.set()
+        super().reject()
+
+
 def get_settings_dialog(
     mw: Any,
     api_key: str,
@@ -78,6 +136,23 @@ def get_settings_dialog(
         target_language=lang_input.text().strip()
     )
 
+def _create_deck_combo(mw: Any) -> Any:
+    """Return a deck selector with the current deck preselected."""
+    deck_combo = QComboBox()
+    decks = mw.col.decks.all()
+    current_deck_id = mw.col.decks.current()['id']
+    current_deck_name = ""
+    for deck in decks:
+        deck_name = deck['name']
+        deck_combo.addItem(deck_name, deck['id'])
+        if deck['id'] == current_deck_id:
+            current_deck_name = deck_name
+    if current_deck_name:
+        index = deck_combo.findText(current_deck_name)
+        if index >= 0:
+            deck_combo.setCurrentIndex(index)
+    return deck_combo
+
 def get_card_input_dialog(mw: Any) -> Optional[CardInputResult]:
     """
     Show the card input dialog and return CardInputResult or None if cancelled.
@@ -103,19 +178,7 @@ def get_card_input_dialog(mw: Any) -> Optional[CardInputResult]:
 
     # Deck selection
     deck_label = QLabel("Select deck:")
-    deck_combo = QComboBox()
-    decks = mw.col.decks.all()
-    current_deck_id = mw.col.decks.current()['id']
-    current_deck_name = ""
-    for deck in decks:
-        deck_name = deck['name']
-        deck_combo.addItem(deck_name, deck['id'])
-        if deck['id'] == current_deck_id:
-            current_deck_name = deck_name
-    if current_deck_name:
-        index = deck_combo.findText(current_deck_name)
-        if index >= 0:
-            deck_combo.setCurrentIndex(index)
+    deck_combo = _create_deck_combo(mw)
     layout.addWidget(deck_label)
     layout.addWidget(deck_combo)
 
@@ -139,15 +202,70 @@ def get_card_input_dialog(mw: Any) -> Optional[CardInputResult]:
     selected_deck_id = deck_combo.currentData()
     return CardInputResult(term, selected_deck_id, context)
 
+def get_batch_input_dialog(mw: Any) -> Optional[BatchInputResult]:
+    """
+    Show the batch input dialog and return BatchInputResult or None if cancelled.
+    """
+    dialog = QDialog(mw)
+    dialog.setWindowTitle("German Card Batch Generator")
+    dialog.setMinimumWidth(400)
+
+    layout = QVBoxLayout()
+
+    # Term list input
+    terms_label = QLabel(
+        "Enter one term per line, optionally followed by context "
+        "(<i>term;context</i>):"
+    )
+    terms_input = QTextEdit()
+    terms_input.setAcceptRichText(False)
+    terms_input.setMinimumHeight(240)
+    layout.addWidget(terms_label)
+    layout.addWidget(terms_input)
+
+    # Deck selection
+    deck_label = QLabel("Select deck:")
+    deck_combo = _create_deck_combo(mw)
+    layout.addWidget(deck_label)
+    layout.addWidget(deck_combo)
+
+    # Buttons
+    button_layout = QHBoxLayout()
+    ok_button = QPushButton("Generate Cards")
+    cancel_button = QPushButton("Cancel")
+    button_layout.addWidget(ok_button)
+    button_layout.addWidget(cancel_button)
+    layout.addLayout(button_layout)
+
+    dialog.setLayout(layout)
+    ok_button.clicked.connect(dialog.accept)
+    cancel_button.clicked.connect(dialog.reject)
+
+    if dialog.exec() != QDialog.DialogCode.Accepted:
+        return None
+
+    return BatchInputResult(terms_input.toPlainText(), deck_combo.currentData())
+
 def show_info(message: str) -> None:
     showInfo(message)
 
 def show_warning(message: str) -> None:
     showWarning(message)
 
-def show_card_preview_dialog(mw: Any, card: GermanCard) -> CardPreviewDialogResult:
+def ask_user(message: str) -> bool:
+    return bool(askUser(message))
+
+def ask_choice(message: str, buttons: list[str]) -> Optional[str]:
+    """Return the label of the button clicked, ``None`` if the dialog was closed."""
+    choice = askUserDialog(message, buttons).run()
+    return str(choice) if choice else None
+
+def show_card_preview_dialog(
+    mw: Any, card: GermanCard, replaces_existing: bool = False
+) -> CardPreviewDialogResult:
     """
     Show a preview dialog of the card before saving.
+    ``replaces_existing`` shows a note that saving replaces an existing card.
     Returns:
         CardPreviewDialogResult with:
         - result: One of:
@@ -189,6 +307,11 @@ def show_card_preview_dialog(mw: Any, card: GermanCard) -> CardPreviewDialogResu
     back_group.addWidget(back_content)
     layout.addLayout(back_group)
 
+    if replaces_existing:
+        layout.addWidget(
+            QLabel("<i>Saving replaces the existing card for this term.</i>")
+        )
+
     # Context input for regeneration
     context_group = QVBoxLayout()
     context_label = QLabel("<b>Context (edit to regenerate with new context):</b>")
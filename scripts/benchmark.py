@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Benchmark the card generation pipeline with deterministic fake providers.
+
+The fake vocab and audio providers sleep for a configurable latency, so
+the results show how well the pipeline overlaps and parallelizes calls
+rather than how fast the network is. Cards are saved through the real
+AnkiService into an in-memory collection, or a temporary real Anki
+collection with --collection real when the anki package is installed.
+
+For every benchmark cards/sec, p50/p99 latency and peak traced memory are
+reported. Efficiency compares the time taken with the ideal time implied
+by the injected latencies and worker counts, which keeps it comparable
+between machines. --check fails when an efficiency drops below the
+minimum in the baseline file, which is how CI catches regressions.
+Throughput and latencies depend on the machine and are only reported.
+
+Usage: python scripts/benchmark.py [--quick] [--check BASELINE] [--json OUT]
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from core.audio_handle import AudioSpool  # noqa: E402
+from core.batch import BatchCardGenerator, BatchEntry  # noqa: E402
+from core.german_card import GermanCard  # noqa: E402
+from core.vocab_provider import VocabItem  # noqa: E402
+from tests.fakes import FakeCollection, load_plugin_module  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "scripts", "benchmark_baseline.json")
+
+
+class FakeVocabProvider:
+    """Answer after ``latency`` seconds, one request per call or batch."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    @staticmethod
+    def _item(term):
+        return VocabItem(
+            term=term,
+            term_translation=f"{term} translation",
+            sentence=f"Das ist ein Beispielsatz mit dem Wort {term}.",
+            sentence_translation=f"This is an example sentence with {term}.",
+        )
+
+    def get_vocab(self, term, context=""):
+        time.sleep(self.latency)
+        return self._item(term)
+
+    def get_vocab_batch(self, items):
+        time.sleep(self.latency)
+        return [self._item(term) for term, _ in items]
+
+
+class FakeAudioProvider:
+    """Return ``size`` bytes of audio unique to the text after ``latency``."""
+
+    def __init__(self, latency, size=16 * 1024):
+        self.latency = latency
+        self.size = size
+
+    def get_audio(self, text):
+        time.sleep(self.latency)
+        return (text.encode() * (self.size // len(text) + 1))[:self.size]
+
+    def get_file_name(self, base):
+        return f"{base}_fake.mp3"
+
+
+def open_collection(kind, directory):
+    os.makedirs(directory)
+    if kind == "real":
+        from anki.collection import Collection
+
+        return Collection(os.path.join(directory, "collection.anki2"))
+    media_dir = os.path.join(directory, "media")
+    os.makedirs(media_dir)
+    return FakeCollection(media_dir)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name, cards, elapsed, latencies, peak_bytes, ideal=None):
+    result = {
+        "cards": cards,
+        "seconds": elapsed,
+        "cards_per_second": cards / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "peak_mb": peak_bytes / 1e6,
+    }
+    if ideal is not None:
+        result["efficiency"] = min(1.0, ideal / elapsed) if elapsed else 0.0
+    line = (
+        f"{name:<20} {result['cards_per_second']:9.1f} cards/s"
+        f"  p50 {result['p50_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms"
+        f"  peak {result['peak_mb']:7.2f} MB"
+    )
+    if ideal is not None:
+        line += f"  efficiency {result['efficiency']:.2f}"
+    print(line)
+    return result
+
+
+def traced(run):
+    """Call ``run`` and return its result and the peak traced memory."""
+    tracemalloc.start()
+    try:
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def bench_interactive(args):
+    """Sequential single cards, as generated from the menu."""
+    vocab = FakeVocabProvider(args.vocab_latency)
+    audio = FakeAudioProvider(args.audio_latency)
+
+    def run():
+        latencies = []
+        for i in range(args.interactive_cards):
+            started = time.perf_counter()
+            GermanCard.create_from_user_input(f"wort{i}", "", vocab, audio)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    latencies, peak = traced(run)
+    elapsed = time.perf_counter() - started
+    # The term audio overlaps the vocab request, the sentence audio follows it
+    ideal = args.interactive_cards * (args.vocab_latency + args.audio_latency)
+    return report("interactive", len(latencies), elapsed, latencies, peak, ideal)
+
+
+def bench_save_card(args, anki_service, collection):
+    """Single card saves, each with its own collection save."""
+    service = anki_service.AnkiService(
+        types.SimpleNamespace(col=collection), "German Contextual Vocab", "Card"
+    )
+    audio = FakeAudioProvider(0)
+    cards = []
+    for i in range(args.save_cards):
+        card = GermanCard.create_from_vocab(FakeVocabProvider._item(f"save{i}"), "")
+        card.attach_audio(audio)
+        cards.append(card)
+
+    def run():
+        latencies = []
+        for card in cards:
+            started = time.perf_counter()
+            service.save_card(card, 1)
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    latencies, peak = traced(run)
+    elapsed = time.perf_counter() - started
+    return report("save_card", len(latencies), elapsed, latencies, peak)
+
+
+def bench_batch(args, anki_service, collection, spool_dir):
+    """A batch import, generated and then saved in chunks.
+
+    The latency of a card is the time from the start of the batch until
+    it is ready to be saved.
+    """
+    vocab = FakeVocabProvider(args.vocab_latency)
+    audio = FakeAudioProvider(args.audio_latency)
+    spool = AudioSpool(spool_dir)
+    generator = BatchCardGenerator(
+        vocab,
+        audio,
+        vocab_workers=args.workers,
+        audio_workers=args.workers,
+        vocab_batch_size=args.batch_size,
+        audio_spool=spool,
+    )
+    service = anki_service.AnkiService(
+        types.SimpleNamespace(col=collection), "German Contextual Vocab", "Card"
+    )
+    entries = [BatchEntry(f"batch{i}") for i in range(args.batch_cards)]
+
+    def run():
+        latencies = []
+        pending = []
+        started = time.perf_counter()
+        for result in generator.iter_results(entries):
+            latencies.append(time.perf_counter() - started)
+            if result.card is None:
+                raise RuntimeError(result.error)
+            pending.append(result.card)
+            if len(pending) >= 50:
+                service.save_cards(pending, 1)
+                pending = []
+        service.save_cards(pending, 1)
+        return latencies
+
+    started = time.perf_counter()
+    latencies, peak = traced(run)
+    elapsed = time.perf_counter() - started
+    # Two audio files per card; vocab requests overlap the audio stage
+    vocab_rounds = math.ceil(
+        math.ceil(args.batch_cards / args.batch_size) / args.workers
+    )
+    audio_rounds = math.ceil(2 * args.batch_cards / args.workers)
+    ideal = max(
+        vocab_rounds * args.vocab_latency + 2 * args.audio_latency,
+        audio_rounds * args.audio_latency,
+    )
+    return report("batch", len(latencies), elapsed, latencies, peak, ideal)
+
+
+# Relative to the ideal time, so shared CI runners can be compared with
+# a generous margin. Absolute timings are too noisy to gate on.
+CHECKED_METRICS = ("efficiency",)
+
+
+def check(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    failures = []
+    for name, limits in baseline.items():
+        result = results.get(name)
+        if result is None:
+            continue
+        for metric, minimum in limits.items():
+            key = metric[len("min_"):]
+            if key not in CHECKED_METRICS:
+                raise SystemExit(f"{baseline_path}: {key} is not a relative metric")
+            if result[key] < minimum:
+                failures.append(
+                    f"{name}: {key} {result[key]:.2f} is below {minimum}"
+                )
+    for failure in failures:
+        print(f"✗ {failure}")
+    if not failures:
+        print("✓ All benchmarks within the baseline")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="fewer cards, for CI")
+    parser.add_argument("--vocab-latency", type=float, default=0.05)
+    parser.add_argument("--audio-latency", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--collection", choices=["memory", "real"], default="memory")
+    parser.add_argument("--check", nargs="?", const=BASELINE, metavar="BASELINE")
+    parser.add_argument("--json", metavar="OUT", help="write the results as JSON")
+    args = parser.parse_args()
+    scale = 1 if args.quick else 5
+    args.interactive_cards = 20 * scale
+    args.save_cards = 200 * scale
+    args.batch_cards = 200 * scale
+
+    anki_service = load_plugin_module("anki_service")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        results["interactive"] = bench_interactive(args)
+        collection = open_collection(args.collection, os.path.join(directory, "save"))
+        results["save_card"] = bench_save_card(args, anki_service, collection)
+        collection = open_collection(args.collection, os.path.join(directory, "batch"))
+        results["batch"] = bench_batch(
+            args, anki_service, collection, os.path.join(directory, "spool")
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    if args.check and not check(results, args.check):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
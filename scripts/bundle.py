@@ -1,56 +1,268 @@
 #!/usr/bin/env python3
 """
 Bundle script for German Card Anki addon.
-This script copies all required dependencies into the addon directory.
+This script copies all required dependencies into the addon directory,
+prunes what the addon never imports and precompiles the bytecode.
+
+Usage: python scripts/bundle.py [--python PATH] [--zip]
+
+--python  Interpreter matching the Python version of the target Anki
+          (Anki 2.1.50+ ships Python 3.9). Bytecode only works for the
+          version it was compiled for. Defaults to this interpreter.
+--zip     Pack the pure Python packages into plugin/vendor.zip, imported
+          with zipimport. Packages with compiled extensions stay in
+          plugin/vendor, since extensions cannot be loaded from a zip.
 """
 
+import argparse
 import os
 import sys
 import shutil
 import subprocess
+import zipfile
 from pathlib import Path
 
-def bundle_dependencies():
+# Top-level names in the vendor directory the addon never imports
+PRUNE_TOP_LEVEL = [
+    "bin",
+    "pip",
+    "setuptools",
+    "wheel",
+    "pkg_resources",
+    "_distutils_hack",
+    "distutils-precedence.pth",
+    # Only used by the gtts command line tool
+    "click",
+]
+# Paths inside packages only needed by command line tools
+PRUNE_PATHS = [
+    "gtts/cli.py",
+    "openai/cli",
+]
+# Directory names dropped anywhere in the tree
+PRUNE_DIRS = {"tests", "test", "testing", "docs", "doc", "examples", "__pycache__"}
+# File suffixes dropped anywhere in the tree, type stubs and docs
+PRUNE_SUFFIXES = {".pyi", ".md", ".rst", ".c", ".h", ".pyx", ".pxd"}
+PRUNE_FILES = {"py.typed"}
+# Modules imported by the addon, used to check the bundle still works
+SMOKE_IMPORTS = [
+    "import openai; openai.OpenAI",
+    "from gtts import gTTS",
+    "import requests",
+]
+
+
+def tree_size(paths):
+    """Return total bytes and number of files below ``paths``."""
+    size = files = 0
+    for path in paths:
+        if path.is_file():
+            size += path.stat().st_size
+            files += 1
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                size += os.path.getsize(os.path.join(root, name))
+                files += 1
+    return size, files
+
+
+def cold_import_ms(python, paths, runs=3):
+    """Return the fastest of ``runs`` timings of importing the SDKs.
+
+    Bytecode writing is disabled, so a bundle without .pyc files pays
+    for compiling every module on each run, like on a user's machine.
+    """
+    code = (
+        "import time; started = time.perf_counter(); "
+        + "; ".join(SMOKE_IMPORTS)
+        + "; print((time.perf_counter() - started) * 1000)"
+    )
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(str(p) for p in paths),
+        PYTHONDONTWRITEBYTECODE="1",
+    )
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [python, "-c", code], env=env, capture_output=True, text=True
+        )
+        if output.returncode != 0:
+            print(output.stderr)
+            return None
+        timings.append(float(output.stdout.strip()))
+    return min(timings)
+
+
+def prune(vendor_dir):
+    """Remove packages, tests, docs and stubs the addon does not need."""
+    removed = 0
+    targets = [vendor_dir / name for name in PRUNE_TOP_LEVEL + PRUNE_PATHS]
+    # The metadata of removed packages would be misleading
+    for name in PRUNE_TOP_LEVEL:
+        targets.extend(vendor_dir.glob(f"{name}-*.dist-info"))
+    for root, dirs, files in os.walk(vendor_dir):
+        root_path = Path(root)
+        for name in list(dirs):
+            if name in PRUNE_DIRS:
+                targets.append(root_path / name)
+                dirs.remove(name)
+        for name in files:
+            path = root_path / name
+            if path.suffix in PRUNE_SUFFIXES or name in PRUNE_FILES:
+                # Licenses are kept, they have to ship with the packages
+                if not name.upper().startswith("LICENSE"):
+                    targets.append(path)
+    for target in targets:
+        if target.is_dir():
+            shutil.rmtree(target)
+            removed += 1
+        elif target.exists():
+            target.unlink()
+            removed += 1
+    return removed
+
+
+def has_extensions(path):
+    """Return ``True`` if ``path`` contains compiled extension modules."""
+    if path.is_file():
+        return path.suffix in (".so", ".pyd")
+    return any(
+        name.endswith((".so", ".pyd"))
+        for _, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def move_pure_packages(vendor_dir, staging):
+    """Move the packages of ``vendor_dir`` without extensions to ``staging``."""
+    moved = []
+    staging.mkdir()
+    for entry in sorted(vendor_dir.iterdir()):
+        if entry.name == "__init__.py" or has_extensions(entry):
+            continue
+        if entry.is_file() and entry.suffix != ".py":
+            continue
+        shutil.move(str(entry), str(staging / entry.name))
+        moved.append(entry.name)
+    return moved
+
+
+def write_zip(directory, zip_path):
+    """Store the contents of ``directory`` in ``zip_path``."""
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, _, names in os.walk(directory):
+            for name in sorted(names):
+                path = Path(root) / name
+                archive.write(path, path.relative_to(directory))
+
+
+def compile_bytecode(python, path, legacy):
+    """Precompile ``path`` with ``python``.
+
+    Unchecked hash based .pyc files are used without comparing them to
+    the source timestamps, which installation may change. ``legacy``
+    writes them next to the sources, the only place zipimport looks.
+    """
+    command = [
+        python, "-m", "compileall", "-q", "-j", "0",
+        "--invalidation-mode", "unchecked-hash",
+    ]
+    if legacy:
+        command.append("-b")
+    subprocess.check_call(command + [str(path)])
+
+
+def bundle_dependencies(python=sys.executable, use_zip=False):
     """Bundle dependencies into the addon directory."""
     print("Bundling dependencies for German Card addon...")
-    
+
     # Get paths
     project_root = Path(__file__).parent.parent
     addon_dir = project_root / "plugin"
     vendor_dir = addon_dir / "vendor"
-    
+    zip_path = addon_dir / "vendor.zip"
+
     # Clean vendor directory if it exists
     if vendor_dir.exists():
         print(f"Cleaning existing vendor directory: {vendor_dir}")
         shutil.rmtree(vendor_dir)
+    if zip_path.exists():
+        zip_path.unlink()
     vendor_dir.mkdir(exist_ok=True)
-    
+
     # Read dependencies from central file
     deps_file = project_root / "requirements.txt"
     if not deps_file.exists():
         print(f"✗ Dependencies file not found: {deps_file}")
         return False
-    
+
     print("Installing dependencies to vendor directory (including sub-dependencies)...")
-    
-    # Install dependencies to vendor directory (with sub-dependencies)
+
+    # Install dependencies to vendor directory (with sub-dependencies).
+    # Bytecode is compiled below, for the target Python.
     try:
         subprocess.check_call([
-            sys.executable, "-m", "pip", "install",
+            python, "-m", "pip", "install",
             "--target", str(vendor_dir),
+            "--no-compile",
             "-r", str(deps_file)
         ])
         print("✓ Dependencies installed to vendor directory")
     except subprocess.CalledProcessError as e:
         print(f"✗ Failed to install dependencies: {e}")
         return False
-    
+
+    size_before, files_before = tree_size([vendor_dir])
+    import_before = cold_import_ms(python, [vendor_dir])
+
+    removed = prune(vendor_dir)
+    size_pruned, _ = tree_size([vendor_dir])
+    print(f"✓ Pruned {removed} unused packages, tests, docs and stubs")
+
+    if use_zip:
+        staging = addon_dir / "vendor_zip_build"
+        if staging.exists():
+            shutil.rmtree(staging)
+        packed = move_pure_packages(vendor_dir, staging)
+        compile_bytecode(python, staging, legacy=True)
+        write_zip(staging, zip_path)
+        shutil.rmtree(staging)
+        print(f"✓ Packed {len(packed)} pure Python packages into {zip_path.name}")
+    compile_bytecode(python, vendor_dir, legacy=False)
+    print("✓ Precompiled bytecode")
+
     # Create __init__.py in vendor directory
     vendor_init = vendor_dir / "__init__.py"
     vendor_init.write_text("# Vendor directory for bundled dependencies\n")
-    
-    print(f"✓ Bundle created at: {vendor_dir}")
+
+    bundle_paths = [zip_path, vendor_dir] if use_zip else [vendor_dir]
+    import_after = cold_import_ms(python, bundle_paths)
+    if import_after is None:
+        print("✗ The pruned bundle cannot import the SDKs")
+        return False
+    size_after, files_after = tree_size(bundle_paths)
+
+    print(f"✓ Bundle created at: {', '.join(str(p) for p in bundle_paths)}")
+    print(
+        f"  size:        {size_before / 1e6:6.1f} MB -> {size_after / 1e6:6.1f} MB"
+        f" ({size_pruned / 1e6:.1f} MB of sources after pruning, without .pyc)"
+    )
+    print(f"  files:       {files_before:6d}    -> {files_after:6d}")
+    if import_before is not None:
+        print(f"  cold import: {import_before:6.0f} ms -> {import_after:6.0f} ms")
     return True
 
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--zip", action="store_true")
+    args = parser.parse_args()
+    if not bundle_dependencies(args.python, args.zip):
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    bundle_dependencies() 
\ No newline at end of file
+    main()
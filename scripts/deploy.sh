@@ -40,6 +40,9 @@ cp plugin/*.md "$ANKI_ADDONS_DIR/"
 # Copy vendor directory (bundled dependencies)
 echo -e "${YELLOW}Copying bundled dependencies...${NC}"
 cp -r plugin/vendor "$ANKI_ADDONS_DIR/"
+if [ -f plugin/vendor.zip ]; then
+    cp plugin/vendor.zip "$ANKI_ADDONS_DIR/"
+fi
 
 # Copy prompts directory (prompt templates)
 echo -e "${YELLOW}Copying prompts directory...${NC}"
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure the peak memory of a batch generation with fake providers.
+Every mode runs in its own process, because peak RSS never goes down.
+
+With ``--max-spool-mb`` it exits with an error when the spooled run grows
+by more, so CI catches audio of finished cards being kept in memory.
+
+Usage: python scripts/measure_batch_memory.py [--cards 5000] [--max-spool-mb N]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SENTENCE_AUDIO_BYTES = 30 * 1024
+TERM_AUDIO_BYTES = 8 * 1024
+
+
+class FakeVocabProvider:
+    def get_vocab(self, term, context=""):
+        from core.vocab_provider import VocabItem
+
+        return VocabItem(
+            term=term,
+            term_translation=f"{term} translation",
+            sentence=f"Das ist ein Beispielsatz mit dem Wort {term}.",
+            sentence_translation=f"This is an example sentence with {term}.",
+        )
+
+
+class FakeAudioProvider:
+    def get_audio(self, text):
+        size = TERM_AUDIO_BYTES if text.startswith("wort") else SENTENCE_AUDIO_BYTES
+        # Unique content per text, like real audio
+        return (text.encode() * (size // len(text) + 1))[:size]
+
+    def get_file_name(self, base):
+        return f"{base}_fake.mp3"
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run(cards, spool):
+    from core.audio_handle import AudioSpool
+    from core.batch import BatchCardGenerator, BatchEntry
+
+    audio_spool = AudioSpool() if spool else None
+    generator = BatchCardGenerator(
+        FakeVocabProvider(), FakeAudioProvider(), audio_spool=audio_spool
+    )
+    baseline = peak_rss_mb()
+    results = generator.generate([BatchEntry(f"wort{i}") for i in range(cards)])
+    assert all(r.ok for r in results)
+    print(f"{peak_rss_mb() - baseline:.1f}")
+    if audio_spool:
+        audio_spool.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--mode", choices=["memory", "spool"])
+    parser.add_argument(
+        "--max-spool-mb",
+        type=float,
+        help="fail if the spooled run grows by more than this",
+    )
+    args = parser.parse_args()
+
+    if args.mode:
+        run(args.cards, args.mode == "spool")
+        return
+
+    print(f"Peak RSS growth while holding {args.cards} pending cards:")
+    growth = {}
+    for mode in ("memory", "spool"):
+        output = subprocess.check_output([
+            sys.executable, __file__, "--cards", str(args.cards), "--mode", mode
+        ])
+        growth[mode] = float(output.decode().strip())
+        print(f"  audio in {mode:>6}: {growth[mode]:.1f} MB")
+
+    if args.max_spool_mb is not None and growth["spool"] > args.max_spool_mb:
+        sys.exit(
+            f"Spooled audio grew by {growth['spool']:.1f} MB, "
+            f"more than {args.max_spool_mb:g} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Measure the import cost of the addon, split into what is loaded when Anki
+starts and what is deferred until the first card is generated.
+Every module is imported in a fresh interpreter with ``-X importtime``.
+The startup row imports plugin/__init__.py itself, with Anki and Qt
+replaced by stubs since Anki has loaded them before any addon.
+
+Usage: python scripts/measure_startup.py
+"""
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+VENDOR_DIR = os.path.join(ROOT, "plugin", "vendor")
+VENDOR_ZIP = VENDOR_DIR + ".zip"
+
+# Stands in for Anki and Qt, so the addon's entry point can be imported
+ANKI_STUBS = """
+import sys
+
+class Stub:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        return Stub()
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __bool__(self):
+        return False
+
+for name in ("anki", "anki.hooks", "aqt", "aqt.qt"):
+    module = type(sys)(name)
+    module.__getattr__ = lambda attr: Stub()
+    sys.modules[name] = module
+"""
+
+STARTUP = ["plugin"]
+# Imported by plugin/actions.py on first use, or by the background prewarm
+DEFERRED = [
+    "core.batch",
+    "core.cached_vocab_provider",
+    "core.cached_audio_provider",
+    "core.openai_vocab_provider",
+    "core.gtts_audio_provider",
+    "core.local_tts_audio_provider",
+]
+VENDORED = ["openai", "gtts", "requests"]
+
+
+def import_ms(modules, path, setup=""):
+    """Return the milliseconds spent importing ``modules`` and their imports.
+
+    ``setup`` runs first, the imports it makes itself are counted as well.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    code = f"{setup}\nimport {', '.join(modules)}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[0].startswith("import time:"):
+            self_us = parts[0].split(":")[1].strip()
+            if self_us.isdigit():
+                total += int(self_us)
+    return total / 1000
+
+
+def main():
+    print("Import cost in a fresh interpreter:")
+    rows = [
+        ("startup (plugin/__init__.py)", STARTUP, [ROOT], ANKI_STUBS),
+        ("deferred core modules", DEFERRED, [ROOT], ""),
+        ("deferred vendored SDKs", VENDORED, [VENDOR_ZIP, VENDOR_DIR], ""),
+    ]
+    # Python's own startup imports are counted in every row
+    baseline = import_ms(["sys"], [ROOT]) or 0.0
+    for label, modules, path, setup in rows:
+        ms = import_ms(modules, path, setup)
+        if ms is None:
+            print(f"  {label:<30} not importable here")
+        else:
+            print(f"  {label:<30} {max(0.0, ms - baseline):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
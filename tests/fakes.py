@@ -0,0 +1,121 @@
+"""
+Fakes of the Anki collection shared by the tests and scripts/benchmark.py.
+
+Only the parts of the collection the plugin uses are implemented, all kept
+in memory. Adding a note with the term ``broken`` and writing a media file
+whose name starts with ``readonly`` fail, to test error handling.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+PLUGIN_DIR = os.path.join(os.path.dirname(__file__), '..', 'plugin')
+
+
+def load_plugin_module(name):
+    """Import plugin/<name>.py without running the Anki entry point."""
+    package = types.ModuleType("german_cardgen_plugin")
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules.setdefault(package.__name__, package)
+    return importlib.import_module(f"{package.__name__}.{name}")
+
+
+class FakeNote(dict):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.id = 0
+
+
+class FakeModels:
+    def __init__(self):
+        self._models = {}
+
+    def by_name(self, name):
+        return self._models.get(name)
+
+    def new(self, name):
+        return {"name": name, "id": len(self._models) + 1, "flds": [], "tmpls": []}
+
+    def new_field(self, name):
+        return {"name": name}
+
+    def add_field(self, model, field):
+        field["ord"] = len(model["flds"])
+        model["flds"].append(field)
+
+    def new_template(self, name):
+        return {"name": name}
+
+    def add_template(self, model, template):
+        model["tmpls"].append(template)
+
+    def add(self, model):
+        self._models[model["name"]] = model
+
+    def update_dict(self, model):
+        self._models[model["name"]] = model
+
+
+class FakeDb:
+    def __init__(self, notes):
+        self._notes = notes
+
+    def all(self, sql, model_id):
+        return [
+            (note_id, "\x1f".join(note.values()))
+            for note_id, note in self._notes.items()
+            if note.model["id"] == model_id
+        ]
+
+
+class FakeMedia:
+    def __init__(self, directory):
+        self.directory = directory
+        self.writes = []
+        self.trashed = []
+
+    def dir(self):
+        return self.directory
+
+    def write_data(self, name, data):
+        if name.startswith("readonly"):
+            raise OSError("read-only")
+        self.writes.append(name)
+        with open(os.path.join(self.directory, name), "wb") as fh:
+            fh.write(data)
+        return name
+
+    def trash_files(self, names):
+        self.trashed.extend(names)
+        for name in names:
+            os.remove(os.path.join(self.directory, name))
+
+
+class FakeCollection:
+    def __init__(self, media_dir=""):
+        self.models = FakeModels()
+        self.notes = {}
+        self.db = FakeDb(self.notes)
+        self.media = FakeMedia(media_dir)
+        self.saves = 0
+        self._next_id = 1
+
+    def new_note(self, model):
+        return FakeNote(model)
+
+    def add_note(self, note, deck_id):
+        if note.get("term") == "broken":
+            raise ValueError("cannot add")
+        note.id = self._next_id
+        self._next_id += 1
+        self.notes[note.id] = note
+
+    def remove_notes(self, note_ids):
+        for note_id in note_ids:
+            self.notes.pop(note_id, None)
+
+    def save(self):
+        self.saves += 1
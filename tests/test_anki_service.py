@@ -0,0 +1,189 @@
+import os
+import sys
+import types
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.fakes import FakeCollection, load_plugin_module
+
+anki_service = load_plugin_module("anki_service")
+
+FRONT = "<div>{{term}}</div>\n{{term_audio}}\n<div>{{sentence}}</div>"
+BACK = "{{FrontSide}}<hr>{{translation}}"
+
+
+class DummyCard:
+    def __init__(self, term, fields=None, audio=None):
+        self.term = term
+        self.audio = audio
+        self.fields = fields or {
+            "term": term,
+            "term_audio": "",
+            "sentence": f"S {term}",
+            "translation": f"{term}_t",
+        }
+
+    def get_unique_id(self):
+        return ("term", self.term)
+
+    def get_fields(self):
+        return self.fields
+
+    def get_template(self):
+        return {"qfmt": FRONT, "afmt": BACK, "css": ".card {}"}
+
+    def get_audio_data(self):
+        return self.audio
+
+    def get_audio_filename(self):
+        return f"{self.term}_dummy.mp3"
+
+    def get_term_audio_data(self):
+        return None
+
+    def get_term_audio_filename(self):
+        return ""
+
+
+def _service(media_dir="", confirm=lambda message: True):
+    mw = types.SimpleNamespace(col=FakeCollection(media_dir))
+    return anki_service.AnkiService(mw, "German", "Card", confirm), mw.col
+
+
+def _old_model(col, qfmt, afmt):
+    model = col.models.new("German")
+    for name in ("term", "sentence", "translation"):
+        col.models.add_field(model, col.models.new_field(name))
+    template = col.models.new_template("Card")
+    template["qfmt"] = qfmt
+    template["afmt"] = afmt
+    col.models.add_template(model, template)
+    col.models.add(model)
+    return model
+
+
+def test_new_fields_replace_unmodified_old_template():
+    service, col = _service()
+    _old_model(col, "<div>{{term}}</div>\n<div>{{sentence}}</div>", BACK)
+
+    model = service._ensure_model_exists(DummyCard("hund"))
+
+    assert [f["name"] for f in model["flds"]][-1] == "term_audio"
+    assert model["tmpls"][0]["qfmt"] == FRONT
+    assert model["tmpls"][0]["afmt"] == BACK
+
+
+def test_new_fields_are_appended_to_customized_template():
+    service, col = _service()
+    _old_model(col, "<b>{{term}}</b> {{sentence}}", "{{FrontSide}} {{translation}}")
+
+    model = service._ensure_model_exists(DummyCard("hund"))
+
+    assert model["tmpls"][0]["qfmt"] == "<b>{{term}}</b> {{sentence}}\n{{term_audio}}"
+    assert model["tmpls"][0]["afmt"] == "{{FrontSide}} {{translation}}"
+
+
+def test_declined_note_type_update_keeps_old_note_type():
+    questions = []
+
+    def decline(message):
+        questions.append(message)
+        return False
+
+    service, col = _service(confirm=decline)
+    qfmt = "<div>{{term}}</div>\n<div>{{sentence}}</div>"
+    _old_model(col, qfmt, BACK)
+
+    results = service.save_cards([DummyCard("hund")], 1)
+    service.save_cards([DummyCard("katze")], 1)
+
+    model = col.models.by_name("German")
+    assert [f["name"] for f in model["flds"]] == ["term", "sentence", "translation"]
+    assert model["tmpls"][0]["qfmt"] == qfmt
+    assert results[0].error is None
+    assert "term_audio" not in col.notes[1]
+    assert len(questions) == 1
+    assert "term_audio" in questions[0]
+
+
+def test_save_cards_adds_notes_and_writes_audio(tmp_path):
+    service, col = _service(str(tmp_path))
+
+    results = service.save_cards(
+        [DummyCard("hund", audio=b"wau"), DummyCard("katze")], 1
+    )
+
+    assert [(r.error, r.removed) for r in results] == [(None, 0), (None, 0)]
+    assert sorted(note["term"] for note in col.notes.values()) == ["hund", "katze"]
+    assert (tmp_path / "hund_dummy.mp3").read_bytes() == b"wau"
+    assert col.saves == 1
+
+
+def test_save_cards_replaces_saved_notes():
+    service, col = _service()
+    service.save_cards([DummyCard("hund")], 1)
+
+    result = service.save_cards([DummyCard("hund")], 1)[0]
+
+    assert result.removed == 1
+    assert [note["term"] for note in col.notes.values()] == ["hund"]
+
+
+def test_save_cards_merges_cards_sharing_an_id():
+    service, col = _service()
+    first = DummyCard("hund")
+    second = DummyCard("hund")
+    second.fields["sentence"] = "S2 hund"
+
+    results = service.save_cards([first, second], 1)
+
+    assert [(r.error, r.replaced_by) for r in results] == [(None, 1), (None, None)]
+    assert [note["sentence"] for note in col.notes.values()] == ["S2 hund"]
+
+
+def test_save_cards_reports_failures_per_card():
+    service, col = _service()
+    broken = DummyCard("broken")
+    replaced = DummyCard("broken")
+
+    results = service.save_cards([replaced, DummyCard("hund"), broken], 1)
+
+    assert [r.error for r in results] == ["cannot add", None, "cannot add"]
+    assert results[0].replaced_by == 2
+    assert [note["term"] for note in col.notes.values()] == ["hund"]
+    assert service.card_exists(("term", "hund"))
+    assert not service.card_exists(("term", "broken"))
+
+
+def test_failed_replacement_keeps_saved_note(tmp_path):
+    service, col = _service(str(tmp_path / "missing"))
+    service.save_cards([DummyCard("hund")], 1)
+    # Saved before adding it started failing, e.g. by another device
+    note = col.new_note(col.models.by_name("German"))
+    note.update(DummyCard("broken").get_fields())
+    col.notes[99] = note
+    service.invalidate()
+
+    results = service.save_cards(
+        [DummyCard("hund", audio=b"wau"), DummyCard("broken")], 1
+    )
+
+    assert results[0].error is not None
+    assert results[1].error == "cannot add"
+    assert sorted(note["term"] for note in col.notes.values()) == ["broken", "hund"]
+    assert service.card_exists(("term", "hund"))
+    assert service.card_exists(("term", "broken"))
+
+
+def test_invalidate_sees_notes_added_elsewhere():
+    service, col = _service()
+    service.save_cards([DummyCard("hund")], 1)
+    assert not service.card_exists(("term", "katze"))
+    # e.g. synced from another device
+    note = col.new_note(col.models.by_name("German"))
+    note.update(DummyCard("katze").get_fields())
+    col.add_note(note, 1)
+
+    assert not service.card_exists(("term", "katze"))
+    service.invalidate()
+    assert service.card_exists(("term", "katze"))
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.audio_handle import AudioHandle, AudioSpool
+
+
+def test_memory_handle():
+    handle = AudioHandle(data=b"abc")
+    assert handle.in_memory
+    assert handle.read() == b"abc"
+    assert handle.size == 3
+
+def test_handle_requires_exactly_one_source():
+    with pytest.raises(ValueError):
+        AudioHandle()
+    with pytest.raises(ValueError):
+        AudioHandle(data=b"abc", path="file")
+
+def test_spool_stores_identical_audio_once(tmp_path):
+    spool = AudioSpool(str(tmp_path))
+    first = spool.store(b"abc")
+    second = spool.store(b"abc")
+
+    assert not first.in_memory
+    assert first.read() == second.read() == b"abc"
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_spool_cleanup():
+    spool = AudioSpool()
+    spool.store(b"abc")
+    spool.cleanup()
+    assert not os.path.exists(spool.directory)
+
+def test_durable_spool_syncs_files(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+
+    AudioSpool(str(tmp_path / "plain")).store(b"abc")
+    assert synced == []
+    AudioSpool(str(tmp_path / "durable"), durable=True).store(b"abc")
+    assert len(synced) == 1
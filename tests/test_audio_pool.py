@@ -0,0 +1,67 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.audio_pool import AudioSynthesisPool
+
+
+class SlowAudioProvider:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+
+    def get_audio(self, text):
+        with self.lock:
+            self.calls.append(text)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        # Earlier texts take longer, so they finish last
+        time.sleep(0.001 * (10 - int(text[-1])))
+        with self.lock:
+            self.running -= 1
+        if text == "bad1":
+            raise RuntimeError("boom")
+        return text.encode()
+
+    def get_file_name(self, base):
+        return f"{base}.mp3"
+
+
+def test_map_keeps_input_order():
+    provider = SlowAudioProvider()
+    texts = [f"text{i}" for i in range(10)]
+    with AudioSynthesisPool(provider, workers=3) as pool:
+        results = list(pool.map(texts))
+
+    assert [r.text for r in results] == texts
+    assert [r.data for r in results] == [t.encode() for t in texts]
+    assert provider.peak <= 3
+
+def test_map_reports_errors_per_text():
+    with AudioSynthesisPool(SlowAudioProvider()) as pool:
+        results = list(pool.map(["ok1", "bad1", "ok2"]))
+
+    assert [r.ok for r in results] == [True, False, True]
+    assert results[1].error == "boom"
+
+def test_identical_pending_texts_are_synthesized_once():
+    provider = SlowAudioProvider()
+    with AudioSynthesisPool(provider, workers=1) as pool:
+        first = pool.submit("same1")
+        second = pool.submit("same1")
+        assert first.result() == second.result() == b"same1"
+
+    assert provider.calls == ["same1"]
+
+def test_cancelled_pool_skips_provider():
+    provider = SlowAudioProvider()
+    with AudioSynthesisPool(provider, is_cancelled=lambda: True) as pool:
+        results = list(pool.map(["text1"]))
+
+    assert results[0].error == "Cancelled"
+    assert provider.calls == []
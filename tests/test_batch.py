@@ -0,0 +1,204 @@
+import gc
+import os
+import sys
+import threading
+import weakref
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.audio_handle import AudioSpool
+from core.audio_pool import AudioSynthesisPool
+from core.batch import (
+    BatchCardGenerator,
+    BatchEntry,
+    _CardAudio,
+    parse_batch_input,
+)
+from core.vocab_provider import BatchVocabError, VocabItem
+
+
+class DummyProvider:
+    def get_vocab(self, term, context: str = "") -> VocabItem:
+        if term == "fail":
+            raise ValueError("boom")
+        return VocabItem(
+            term=term,
+            term_translation=f"{term}_t",
+            sentence=f"S {term}",
+            sentence_translation=f"ST {term}",
+        )
+
+class DummyAudioProvider:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_audio(self, text: str) -> bytes:
+        with self._lock:
+            self.calls.append(text)
+        return text.encode()
+
+    def get_file_name(self, base: str) -> str:
+        return f"{base}_dummy.mp3"
+
+class DummyBatchProvider(DummyProvider):
+    def __init__(self):
+        self.batches = []
+
+    def get_vocab_batch(self, items):
+        self.batches.append(len(items))
+        return [self.get_vocab(term, context) for term, context in items]
+
+def test_parse_batch_input():
+    text = (
+        "Hund\n"
+        "\n"
+        "# comment\n"
+        "laufen; im Park\n"
+        'Bank;"financial; not a bench"\n'
+    )
+    assert parse_batch_input(text) == [
+        BatchEntry("Hund", ""),
+        BatchEntry("laufen", "im Park"),
+        BatchEntry("Bank", "financial; not a bench"),
+    ]
+
+def test_generate_returns_results_in_input_order():
+    audio = DummyAudioProvider()
+    generator = BatchCardGenerator(DummyProvider(), audio, vocab_workers=3)
+    entries = [BatchEntry(f"Wort{i}") for i in range(20)]
+    progress = []
+
+    results = generator.generate(
+        entries, on_progress=lambda done, total: progress.append((done, total))
+    )
+
+    assert [r.entry for r in results] == entries
+    assert all(r.ok for r in results)
+    assert results[5].card.sentence == "S Wort5"
+    assert results[5].card.get_audio_data() == b"S Wort5"
+    assert results[5].card.get_term_audio_data() == b"Wort5"
+    assert len(audio.calls) == 40
+    assert progress[0] == (0, 20)
+    assert progress[-1] == (20, 20)
+
+def test_generate_reports_failures():
+    generator = BatchCardGenerator(DummyProvider(), DummyAudioProvider())
+    results = generator.generate([BatchEntry("Hund"), BatchEntry("fail")])
+
+    assert results[0].ok
+    assert not results[1].ok
+    assert results[1].error == "boom"
+
+def test_generate_cancelled():
+    audio = DummyAudioProvider()
+    generator = BatchCardGenerator(DummyProvider(), audio)
+    results = generator.generate(
+        [BatchEntry("Hund"), BatchEntry("Katze")], is_cancelled=lambda: True
+    )
+
+    assert [r.error for r in results] == ["Cancelled", "Cancelled"]
+    assert audio.calls == []
+
+def test_generate_uses_batch_vocab_provider():
+    provider = DummyBatchProvider()
+    generator = BatchCardGenerator(
+        provider, DummyAudioProvider(), vocab_batch_size=4
+    )
+    results = generator.generate([BatchEntry(f"Wort{i}") for i in range(10)])
+
+    assert all(r.ok for r in results)
+    assert sorted(provider.batches) == [2, 4, 4]
+
+def test_generate_spills_audio_to_spool(tmp_path):
+    generator = BatchCardGenerator(
+        DummyProvider(), DummyAudioProvider(), audio_spool=AudioSpool(str(tmp_path))
+    )
+    results = generator.generate([BatchEntry("Hund"), BatchEntry("Katze")])
+
+    card = results[0].card
+    assert not card._audio.in_memory
+    assert card.get_audio_data() == b"S Hund"
+    assert card.get_term_audio_data() == b"Hund"
+    assert len(os.listdir(tmp_path)) == 4
+
+def test_generate_coalesces_entries_with_the_same_card_id():
+    terms = []
+
+    class CountingProvider(DummyProvider):
+        def get_vocab(self, term, context: str = "") -> VocabItem:
+            terms.append((term, context))
+            return super().get_vocab(term, context)
+
+    generator = BatchCardGenerator(CountingProvider(), DummyAudioProvider())
+    entries = [
+        BatchEntry("Hund"),
+        BatchEntry("hund"),
+        BatchEntry("Katze"),
+        BatchEntry("HUND"),
+        BatchEntry("Hund", "other context"),
+    ]
+    results = generator.generate(entries)
+
+    assert [r.duplicate_of for r in results] == [None, 0, None, 0, None]
+    assert results[1].card is results[0].card
+    assert all(r.ok for r in results)
+    assert sorted(terms) == [("Hund", ""), ("Hund", "other context"), ("Katze", "")]
+
+def test_generate_keeps_items_of_partially_failed_batch():
+    class PartialBatchProvider(DummyProvider):
+        def get_vocab_batch(self, items):
+            fetched = [self.get_vocab(term, context) for term, context in items[:-1]]
+            raise BatchVocabError(fetched + [None], {len(items) - 1: ValueError("x")})
+
+    generator = BatchCardGenerator(
+        PartialBatchProvider(), DummyAudioProvider(), vocab_batch_size=3
+    )
+    results = generator.generate([BatchEntry("a"), BatchEntry("b"), BatchEntry("c")])
+
+    assert [r.ok for r in results] == [True, True, False]
+    assert results[2].error == "x"
+
+def test_generate_looks_up_items_left_out_of_a_batch():
+    class ShortBatchProvider(DummyBatchProvider):
+        def get_vocab_batch(self, items):
+            return super().get_vocab_batch(items)[:-1]
+
+    generator = BatchCardGenerator(
+        ShortBatchProvider(), DummyAudioProvider(), vocab_batch_size=3
+    )
+    results = generator.generate([BatchEntry("a"), BatchEntry("b"), BatchEntry("c")])
+
+    assert [r.ok for r in results] == [True, True, True]
+    assert results[2].card.term == "c"
+
+def test_generate_fails_batch_with_too_many_items():
+    class LongBatchProvider(DummyBatchProvider):
+        def get_vocab_batch(self, items):
+            return super().get_vocab_batch(items) * 2
+
+    generator = BatchCardGenerator(
+        LongBatchProvider(), DummyAudioProvider(), vocab_batch_size=2
+    )
+    results = generator.generate([BatchEntry("a"), BatchEntry("b")])
+
+    assert [r.ok for r in results] == [False, False]
+    assert "4 items for 2" in results[0].error
+
+
+def test_finished_audio_is_freed_without_the_gc():
+    outcomes = []
+    pool = AudioSynthesisPool(DummyAudioProvider())
+    gc.disable()
+    try:
+        sentence = pool.submit("S hund")
+        term = pool.submit("hund")
+        _CardAudio(lambda *audio: outcomes.append(audio)).watch(sentence, term)
+        pool.close()
+        refs = [weakref.ref(sentence), weakref.ref(term)]
+        del sentence, term
+
+        assert outcomes == [((b"S hund", None), (b"hund", None))]
+        assert [ref() for ref in refs] == [None, None]
+    finally:
+        gc.enable()
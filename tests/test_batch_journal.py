@@ -0,0 +1,153 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.batch import BatchCardGenerator, BatchEntry
+from core.batch_journal import (
+    AUDIO_DONE,
+    SAVED,
+    VOCAB_DONE,
+    BatchJournal,
+    find_unfinished,
+)
+from core.vocab_provider import VocabItem
+
+
+class DummyProvider:
+    def __init__(self):
+        self.terms = []
+
+    def get_vocab(self, term, context: str = "") -> VocabItem:
+        if term == "fail":
+            raise ValueError("boom")
+        self.terms.append(term)
+        return VocabItem(
+            term=term,
+            term_translation=f"{term}_t",
+            sentence=f"S {term}",
+            sentence_translation=f"ST {term}",
+        )
+
+class DummyAudioProvider:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_audio(self, text: str) -> bytes:
+        with self._lock:
+            self.calls.append(text)
+        return text.encode()
+
+    def get_file_name(self, base: str) -> str:
+        return f"{base}_dummy.mp3"
+
+
+def _entries(*terms):
+    return [BatchEntry(term) for term in terms]
+
+
+def test_journal_replays_recorded_stages(tmp_path):
+    journal = BatchJournal.create(str(tmp_path), _entries("a", "b", "c"), 7)
+    journal.record_vocab(0, VocabItem("a", "a_t", "S a", "ST a"))
+    journal.record_vocab(1, VocabItem("b", "b_t", "S b", "ST b"))
+    journal.record_audio(
+        1, journal.spool.store(b"sentence"), journal.spool.store(b"term")
+    )
+    journal.record_saved([1])
+
+    reopened = BatchJournal(journal.directory)
+    assert reopened.deck_id == 7
+    assert [e.entry.term for e in reopened.entries] == ["a", "b", "c"]
+    assert [e.state for e in reopened.entries] == [VOCAB_DONE, SAVED, "pending"]
+    assert reopened.entries[0].vocab == VocabItem("a", "a_t", "S a", "ST a")
+    assert reopened.entries[1].sentence_audio.read() == b"sentence"
+    assert reopened.saved == 1
+    assert not reopened.complete
+
+
+def test_journal_ignores_torn_last_line(tmp_path):
+    journal = BatchJournal.create(str(tmp_path), _entries("a"), None)
+    journal.record_vocab(0, VocabItem("a", "a_t", "S a", "ST a"))
+    with open(journal.path, "a", encoding="utf-8") as fh:
+        fh.write('{"op": "saved", "i": [')
+
+    reopened = BatchJournal(journal.directory)
+    assert reopened.entries[0].state == VOCAB_DONE
+    reopened.record_saved([0])
+    assert BatchJournal(journal.directory).complete
+
+
+def test_journal_falls_back_when_audio_file_is_missing(tmp_path):
+    journal = BatchJournal.create(str(tmp_path), _entries("a"), None)
+    journal.record_vocab(0, VocabItem("a", "a_t", "S a", "ST a"))
+    handle = journal.spool.store(b"sentence")
+    journal.record_audio(0, handle, None)
+    os.remove(handle.path)
+
+    reopened = BatchJournal(journal.directory)
+    assert reopened.entries[0].state == VOCAB_DONE
+    assert reopened.entries[0].sentence_audio is None
+
+
+def test_generator_records_stages(tmp_path):
+    journal = BatchJournal.create(str(tmp_path), _entries("a", "fail"), None)
+    generator = BatchCardGenerator(DummyProvider(), DummyAudioProvider())
+
+    results = sorted(
+        generator.iter_results(journal.batch_entries, journal=journal),
+        key=lambda r: r.index,
+    )
+
+    assert [r.ok for r in results] == [True, False]
+    reopened = BatchJournal(journal.directory)
+    assert reopened.entries[0].state == AUDIO_DONE
+    assert reopened.entries[0].term_audio.read() == b"a"
+    assert reopened.entries[1].state == "pending"
+    # The audio is kept in the journal's directory, not in memory
+    assert not results[0].card._audio.in_memory
+
+
+def test_resume_skips_completed_stages(tmp_path):
+    journal = BatchJournal.create(str(tmp_path), _entries("a", "b", "c", "d"), None)
+    journal.record_vocab(0, VocabItem("a", "a_t", "S a", "ST a"))
+    journal.record_audio(0, journal.spool.store(b"S a"), None)
+    journal.record_saved([0])
+    journal.record_vocab(1, VocabItem("b", "b_t", "S b", "ST b"))
+    journal.record_audio(1, journal.spool.store(b"S b"), journal.spool.store(b"b"))
+    journal.record_vocab(2, VocabItem("c", "c_t", "S c", "ST c"))
+
+    resumed = BatchJournal(journal.directory)
+    vocab = DummyProvider()
+    audio = DummyAudioProvider()
+    generator = BatchCardGenerator(vocab, audio)
+    progress = []
+    results = sorted(
+        generator.iter_results(
+            resumed.batch_entries,
+            journal=resumed,
+            on_progress=lambda done, total: progress.append((done, total)),
+        ),
+        key=lambda r: r.index,
+    )
+
+    assert [r.index for r in results] == [1, 2, 3]
+    assert all(r.ok for r in results)
+    assert progress[-1] == (3, 3)
+    assert vocab.terms == ["d"]
+    assert sorted(audio.calls) == ["S c", "S d", "c", "d"]
+    assert results[0].card.get_audio_data() == b"S b"
+    assert results[0].card.get_term_audio_data() == b"b"
+
+
+def test_find_unfinished(tmp_path):
+    done = BatchJournal.create(str(tmp_path), _entries("a"), None)
+    done.record_saved([0])
+    unfinished = BatchJournal.create(str(tmp_path), _entries("b"), None)
+
+    found = find_unfinished(str(tmp_path))
+
+    assert [j.directory for j in found] == [unfinished.directory]
+    assert not os.path.exists(done.directory)
+    assert find_unfinished(str(tmp_path / "missing")) == []
@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cached_audio_provider import CachedAudioProvider
+
+
+class CountingAudioProvider:
+    def __init__(self):
+        self.calls = []
+
+    def get_audio(self, text: str) -> bytes:
+        self.calls.append(text)
+        return text.encode() * 10
+
+    def get_file_name(self, base: str) -> str:
+        return f"{base}_dummy.mp3"
+
+
+def test_audio_is_cached_by_normalized_text(tmp_path):
+    provider = CountingAudioProvider()
+    cache = CachedAudioProvider(provider, str(tmp_path), namespace="gtts:de")
+
+    first = cache.get_audio("Der Hund bellt.")
+    second = cache.get_audio("  Der  Hund\nbellt. ")
+    restarted = CachedAudioProvider(provider, str(tmp_path), namespace="gtts:de")
+
+    assert first == second == restarted.get_audio("Der Hund bellt.")
+    assert provider.calls == ["Der Hund bellt."]
+    assert cache.get_file_name("hund") == "hund_dummy.mp3"
+
+def test_namespace_is_part_of_key(tmp_path):
+    provider = CountingAudioProvider()
+    CachedAudioProvider(provider, str(tmp_path), namespace="gtts:de").get_audio("Hallo")
+    CachedAudioProvider(provider, str(tmp_path), namespace="gtts:en").get_audio("Hallo")
+
+    assert provider.calls == ["Hallo", "Hallo"]
+
+def test_least_recently_used_audio_is_evicted(tmp_path):
+    provider = CountingAudioProvider()
+    # Each entry is 10 bytes per character, room for two 5 character texts
+    cache = CachedAudioProvider(provider, str(tmp_path), max_bytes=100)
+
+    cache.get_audio("aaaaa")
+    cache.get_audio("bbbbb")
+    # Make "aaaaa" the most recently used entry
+    for name, (size, _) in list(cache._index.items()):
+        cache._index[name] = (size, 0.0)
+    cache.get_audio("aaaaa")
+    cache.get_audio("ccccc")
+
+    assert len(os.listdir(tmp_path)) == 2
+    cache.get_audio("aaaaa")
+    cache.get_audio("bbbbb")
+    assert provider.calls == ["aaaaa", "bbbbb", "ccccc", "bbbbb"]
+
+
+def test_concurrent_misses_share_one_synthesis(tmp_path):
+    release = threading.Event()
+
+    class SlowProvider(CountingAudioProvider):
+        def get_audio(self, text: str) -> bytes:
+            release.wait(5)
+            return super().get_audio(text)
+
+    provider = SlowProvider()
+    cache = CachedAudioProvider(provider, str(tmp_path))
+    results = []
+    threads = [
+        threading.Thread(target=lambda t=text: results.append(cache.get_audio(t)))
+        for text in ("Der Hund bellt.", "Der  Hund bellt. ", "Der Hund bellt.")
+    ]
+    for thread in threads:
+        thread.start()
+    while cache._flights.shared < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(provider.calls) == 1
+    assert len(set(results)) == 1
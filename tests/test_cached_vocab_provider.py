@@ -0,0 +1,213 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.cached_vocab_provider import CachedVocabProvider
+from core.vocab_provider import BatchVocabError, VocabItem
+
+
+class CountingProvider:
+    def __init__(self):
+        self.calls = []
+
+    def get_vocab(self, term, context: str = "") -> VocabItem:
+        self.calls.append((term, context))
+        return VocabItem(
+            term=term,
+            term_translation=f"{term}_t{len(self.calls)}",
+            sentence=f"S {term}",
+            sentence_translation=f"ST {term}",
+        )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_hit_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, path, namespace="ns")
+    first = cache.get_vocab("Hund", "ctx")
+    cache.close()
+
+    cache = CachedVocabProvider(provider, path, namespace="ns")
+    assert cache.get_vocab("Hund", "ctx") == first
+    assert provider.calls == [("Hund", "ctx")]
+
+    # Different context or namespace is a different key
+    cache.get_vocab("Hund", "other")
+    CachedVocabProvider(provider, path, namespace="ns2").get_vocab("Hund", "ctx")
+    assert len(provider.calls) == 3
+
+def test_refreshing_bypasses_and_updates_cache(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    cache.get_vocab("Hund")
+
+    refreshed = cache.refreshing().get_vocab("Hund")
+
+    assert refreshed.term_translation == "Hund_t2"
+    assert cache.get_vocab("Hund").term_translation == "Hund_t2"
+    assert len(provider.calls) == 2
+
+def test_refreshing_without_store_caches_only_on_commit(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    cache.get_vocab("Hund")
+    speculative = cache.refreshing(store=False)
+
+    assert speculative.get_vocab("Hund").term_translation == "Hund_t2"
+    assert cache.get_vocab("Hund").term_translation == "Hund_t1"
+
+    speculative.commit()
+    assert cache.get_vocab("Hund").term_translation == "Hund_t2"
+    assert len(provider.calls) == 2
+
+def test_ttl_and_lru_eviction(tmp_path):
+    clock = FakeClock()
+    provider = CountingProvider()
+    cache = CachedVocabProvider(
+        provider,
+        str(tmp_path / "cache.sqlite3"),
+        max_entries=2,
+        ttl_seconds=100,
+        clock=clock,
+    )
+    cache.get_vocab("a")
+    clock.now += 1
+    cache.get_vocab("b")
+    clock.now += 1
+    cache.get_vocab("a")  # hit, "b" becomes least recently used
+    clock.now += 1
+    cache.get_vocab("c")  # evicts "b"
+    assert len(provider.calls) == 3
+
+    cache.get_vocab("a")
+    cache.get_vocab("b")
+    assert len(provider.calls) == 4
+
+    clock.now += 200
+    cache.get_vocab("a")
+    assert len(provider.calls) == 5
+
+def test_get_vocab_batch_only_fetches_misses(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    cache.get_vocab("Hund")
+
+    items = cache.get_vocab_batch([("Hund", ""), ("Katze", "")])
+
+    assert [item.term for item in items] == ["Hund", "Katze"]
+    assert provider.calls == [("Hund", ""), ("Katze", "")]
+
+def test_get_vocab_stream_reports_cached_item_once(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    updates = []
+
+    first = cache.get_vocab_stream("Hund", "", updates.append)
+    second = cache.get_vocab_stream("Hund", "", updates.append)
+
+    assert first == second
+    assert updates == [first, first]
+    assert len(provider.calls) == 1
+
+
+def test_concurrent_misses_for_term_variants_share_one_request(tmp_path):
+    release = threading.Event()
+
+    class SlowProvider(CountingProvider):
+        def get_vocab(self, term, context: str = "") -> VocabItem:
+            release.wait(5)
+            return super().get_vocab(term, context)
+
+    provider = SlowProvider()
+    cache = CachedVocabProvider(
+        provider,
+        str(tmp_path / "cache.sqlite3"),
+        normalize=lambda term: term.strip().lower(),
+    )
+    results = []
+    threads = [
+        threading.Thread(target=lambda t=term: results.append(cache.get_vocab(t)))
+        for term in ("Hund", "hund", "Hund ")
+    ]
+    for thread in threads:
+        thread.start()
+    while cache._flights.shared < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(provider.calls) == 1
+    assert len(set(results)) == 1
+
+
+def test_get_vocab_batch_requests_term_variants_once(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(
+        provider,
+        str(tmp_path / "cache.sqlite3"),
+        normalize=lambda term: term.strip().lower(),
+    )
+
+    items = cache.get_vocab_batch([("Hund", ""), ("hund", ""), ("Katze", "")])
+
+    assert provider.calls == [("Hund", ""), ("Katze", "")]
+    assert items[0] == items[1]
+
+
+def test_get_vocab_batch_caches_items_of_partial_failure(tmp_path):
+    class PartialProvider(CountingProvider):
+        def get_vocab_batch(self, items):
+            fetched = [self.get_vocab(term, context) for term, context in items]
+            fetched[0] = None
+            raise BatchVocabError(fetched, {0: ValueError("boom")})
+
+    provider = PartialProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    cache.get_vocab("Hund")
+
+    try:
+        cache.get_vocab_batch([("Hund", ""), ("Katze", ""), ("Maus", "")])
+    except BatchVocabError as exc:
+        assert [item and item.term for item in exc.items] == ["Hund", None, "Maus"]
+        assert list(exc.errors) == [1]
+    else:
+        raise AssertionError("Expected BatchVocabError")
+    assert cache.get_vocab("Maus").term == "Maus"
+    assert provider.calls[-1] == ("Maus", "")
+
+
+def test_get_vocab_batch_raises_when_provider_returns_too_few(tmp_path):
+    class ShortProvider(CountingProvider):
+        def get_vocab_batch(self, items):
+            return [self.get_vocab(term, context) for term, context in items[1:]]
+
+    cache = CachedVocabProvider(ShortProvider(), str(tmp_path / "cache.sqlite3"))
+
+    try:
+        cache.get_vocab_batch([("Hund", ""), ("Katze", "")])
+    except ValueError as exc:
+        assert "1 items for 2 terms" in str(exc)
+    else:
+        raise AssertionError("Expected ValueError")
+
+def test_closed_cache_passes_lookups_to_the_provider(tmp_path):
+    provider = CountingProvider()
+    cache = CachedVocabProvider(provider, str(tmp_path / "cache.sqlite3"))
+    cache.get_vocab("Hund")
+
+    cache.close()
+    cache.close()
+
+    assert cache.get_vocab("Hund").term_translation == "Hund_t2"
+    assert len(provider.calls) == 2
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.card_templates import TemplateCache
+from core.german_card import GermanCard
+
+
+def _write_template(directory, front):
+    template_dir = directory / "simple"
+    template_dir.mkdir(exist_ok=True)
+    (template_dir / "front.html").write_text(front, encoding="utf-8")
+    (template_dir / "back.html").write_text("back", encoding="utf-8")
+    (template_dir / "style.css").write_text("style", encoding="utf-8")
+    return template_dir
+
+
+def test_cards_share_the_loaded_template():
+    first = GermanCard("Haus", "")
+    second = GermanCard("Hund", "")
+
+    assert first._template is second._template
+    assert "{{term}}" in first.get_template()["qfmt"]
+
+def test_template_is_read_once(tmp_path):
+    template_dir = _write_template(tmp_path, "front")
+    cache = TemplateCache(str(tmp_path))
+    template = cache.get("simple")
+
+    (template_dir / "front.html").write_text("changed", encoding="utf-8")
+
+    assert cache.get("simple") is template
+    assert template.front == "front"
+
+def test_clear_reloads_changed_template(tmp_path):
+    template_dir = _write_template(tmp_path, "front")
+    cache = TemplateCache(str(tmp_path))
+    cache.get("simple")
+
+    (template_dir / "front.html").write_text("changed", encoding="utf-8")
+    cache.clear()
+
+    assert cache.get("simple").front == "changed"
@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
@@ -34,6 +35,10 @@ def test_german_card_creation():
     assert card.get_audio_filename() == ""
     assert card.is_valid()
 
+def test_german_card_is_slotted():
+    card = GermanCard(term="Haus", context="")
+    assert not hasattr(card, "__dict__")
+
 def test_german_card_invalid():
     card = GermanCard(term="", context="Test")
     assert not card.is_valid()
@@ -99,9 +104,114 @@ def test_create_from_user_input():
     assert card.sentence_translation == "ST Hund"
     assert card.get_audio_data() == b"dummy"
     assert card.get_audio_filename().endswith("_dummy.mp3")
+    assert card.get_term_audio_data() == b"dummy"
+    assert card.get_term_audio_filename() == "hund-term_dummy.mp3"
+    assert card.get_fields()["term_audio"] == "[sound:hund-term_dummy.mp3]"
+
+def test_create_from_user_input_synthesizes_term_audio_concurrently():
+    term_audio_started = threading.Event()
+
+    class WaitingProvider(DummyProvider):
+        def get_vocab(self, term, context: str = "") -> VocabItem:
+            # Deadlocks (and times out) unless term audio runs in parallel
+            assert term_audio_started.wait(timeout=5)
+            return super().get_vocab(term, context)
+
+    class RecordingAudioProvider(DummyAudioProvider):
+        def get_audio(self, text: str) -> bytes:
+            term_audio_started.set()
+            return text.encode()
+
+    card = GermanCard.create_from_user_input(
+        "Hund", "", WaitingProvider(), RecordingAudioProvider()
+    )
+    assert card.get_term_audio_data() == b"Hund"
+    assert card.get_audio_data() == b"S Hund"
+
+def test_create_from_user_input_without_term_audio():
+    class FailingTermAudioProvider(DummyAudioProvider):
+        def get_audio(self, text: str) -> bytes:
+            if text == "Hund":
+                raise RuntimeError("no audio")
+            return b"sentence"
+
+    card = GermanCard.create_from_user_input(
+        "Hund", "", DummyProvider(), FailingTermAudioProvider()
+    )
+    assert card.get_audio_data() == b"sentence"
+    assert card.get_term_audio_data() is None
+    assert card.get_fields()["term_audio"] == ""
+
+def test_create_from_user_input_starts_sentence_audio_while_streaming():
+    sentence_audio_started = threading.Event()
+    updates = []
+
+    class StreamingProvider(DummyProvider):
+        def get_vocab_stream(self, term, context, on_update) -> VocabItem:
+            data = self.get_vocab(term, context)
+            on_update(VocabItem(term=data.term))
+            on_update(VocabItem(term=data.term, sentence=data.sentence))
+            # The translation only arrives after sentence audio has started
+            assert sentence_audio_started.wait(timeout=5)
+            on_update(data)
+            return data
+
+    class RecordingAudioProvider(DummyAudioProvider):
+        def get_audio(self, text: str) -> bytes:
+            if text == "S Hund":
+                sentence_audio_started.set()
+            return text.encode()
+
+    card = GermanCard.create_from_user_input(
+        "Hund", "", StreamingProvider(), RecordingAudioProvider(), updates.append
+    )
+    assert card.get_audio_data() == b"S Hund"
+    assert card.sentence_translation == "ST Hund"
+    assert [u.sentence for u in updates] == ["", "S Hund", "S Hund"]
 
 if __name__ == "__main__":
     test_german_card_creation()
     test_german_card_invalid()
     test_gen_id()
     print("All tests passed!")
+
+def test_cancelling_stops_stream_and_audio_jobs():
+    cancelled = threading.Event()
+    term_audio_release = threading.Event()
+    audio_calls = []
+    updates = []
+
+    class StreamingProvider(DummyProvider):
+        def get_vocab_stream(self, term, context, on_update) -> VocabItem:
+            data = self.get_vocab(term, context)
+            on_update(VocabItem(term=data.term))
+            cancelled.set()
+            on_update(VocabItem(term=data.term, sentence=data.sentence))
+            on_update(data)
+            return data
+
+    class BlockingAudioProvider(DummyAudioProvider):
+        def get_audio(self, text: str) -> bytes:
+            audio_calls.append(text)
+            # The term audio is still running when the user cancels
+            term_audio_release.wait(timeout=5)
+            return b"dummy"
+
+    try:
+        GermanCard.create_from_user_input(
+            "Hund",
+            "",
+            StreamingProvider(),
+            BlockingAudioProvider(),
+            on_update=updates.append,
+            is_cancelled=cancelled.is_set,
+        )
+    except RuntimeError as exc:
+        assert str(exc) == "Cancelled"
+    else:
+        raise AssertionError("Expected RuntimeError")
+    finally:
+        term_audio_release.set()
+    # Neither the rest of the stream nor the sentence audio was processed
+    assert len(updates) == 1
+    assert audio_calls == ["Hund"]
@@ -1,9 +1,15 @@
+import inspect
 import os
 import sys
+import threading
+import urllib.parse
+
+import pytest
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.gtts_audio_provider import GttsAudioProvider
+from core.gtts_audio_provider import _AUDIO_PATTERN, GttsAudioProvider
+from core.request_scheduler import HostScheduler, RequestScheduler
 
 
 class _FakeGttsInstance:
@@ -33,3 +39,149 @@ def test_get_audio_and_filename():
     assert data == b"dummy"
     assert factory.last_kwargs == {"text": "Hallo", "lang": "de"}
     assert provider.get_file_name("card1") == "card1_gtts.mp3"
+    assert provider.cache_namespace == "gtts:de"
+
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, chunk_size):
+        yield b")]}'"
+        yield ('[["wrb.fr","jQ1olc","[\\"' + self.payload + '\\"]"]]').encode()
+
+
+class _FakeSession:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, prepared, proxies, timeout):
+        self.sent.append(prepared)
+        return _FakeResponse(prepared)
+
+
+class _FakePreparingGtts:
+    timeout = None
+
+    def __init__(self, text, lang="de"):
+        self.text = text
+
+    def _prepare_requests(self):
+        # One request per text part, the payload is already base64 encoded
+        return ["YWJj", "ZGVm"]
+
+
+def test_get_audio_reuses_session():
+    session = _FakeSession()
+    provider = GttsAudioProvider(
+        "de", gtts_factory=_FakePreparingGtts, session_factory=lambda: session
+    )
+
+    assert provider.get_audio("Hallo") == b"abcdef"
+    assert provider.get_audio("Tschüss") == b"abcdef"
+    assert len(session.sent) == 4
+
+
+def test_get_audio_uses_one_session_per_thread():
+    sessions = []
+
+    def session_factory():
+        sessions.append(_FakeSession())
+        return sessions[-1]
+
+    provider = GttsAudioProvider(
+        "de", gtts_factory=_FakePreparingGtts, session_factory=session_factory
+    )
+    provider.get_audio("Hallo")
+    provider.get_audio("Hund")
+    thread = threading.Thread(target=provider.get_audio, args=("Katze",))
+    thread.start()
+    thread.join()
+
+    assert [len(session.sent) for session in sessions] == [4, 2]
+
+
+class _FlakyResponse(_FakeResponse):
+    def __init__(self, payload, status_code):
+        super().__init__(payload)
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            error = RuntimeError(f"HTTP {self.status_code}")
+            error.response = self
+            raise error
+
+
+class _FlakySession:
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.hosts = []
+
+    def send(self, prepared, proxies, timeout):
+        self.hosts.append(prepared.url)
+        return _FlakyResponse(prepared.payload, self.statuses.pop(0))
+
+
+class _Prepared:
+    def __init__(self, url, payload):
+        self.url = url
+        self.payload = payload
+
+
+class _FakeUrlGtts:
+    timeout = None
+
+    def __init__(self, text, lang="de"):
+        self.text = text
+
+    def _prepare_requests(self):
+        return [_Prepared("https://translate.google.com/batchexecute", "YWJj")]
+
+
+def test_get_audio_retries_transient_errors_per_host():
+    sleeps = []
+    scheduler = HostScheduler(
+        lambda: RequestScheduler(max_retries=2, sleep=sleeps.append)
+    )
+    session = _FlakySession([503, 429, 200])
+    provider = GttsAudioProvider(
+        "de", gtts_factory=_FakeUrlGtts,
+        session_factory=lambda: session,
+        scheduler=scheduler,
+    )
+
+    assert provider.get_audio("Hallo") == b"abc"
+    assert len(session.hosts) == 3
+    assert len(sleeps) == 2
+    metrics = scheduler.for_host("translate.google.com").metrics()
+    assert metrics.retries == 2
+
+
+def test_falls_back_to_write_to_fp_without_prepared_requests():
+    sessions = []
+    provider = GttsAudioProvider(
+        "de",
+        gtts_factory=_FakeGttsFactory(),
+        session_factory=lambda: sessions.append(_FakeSession()),
+    )
+
+    assert provider.get_audio("Hallo") == b"dummy"
+    assert sessions == []
+
+
+def test_gtts_private_api_has_the_expected_shape():
+    # The shared session path relies on gTTS internals, see requirements.txt
+    gtts = pytest.importorskip("gtts")
+    tts = gtts.gTTS(text="Der Hund bellt.", lang="de")
+
+    prepared = tts._prepare_requests()
+
+    assert isinstance(prepared, list) and prepared
+    for request in prepared:
+        assert urllib.parse.urlsplit(request.url).netloc == "translate.google.com"
+    assert hasattr(tts, "timeout")
+    assert _AUDIO_PATTERN.pattern in inspect.getsource(type(tts).stream)
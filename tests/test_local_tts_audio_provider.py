@@ -0,0 +1,199 @@
+import io
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.local_tts_audio_provider import LocalTtsAudioProvider
+
+# Any existing program will do, the processes are faked
+EXECUTABLE = sys.executable
+
+
+class FakeEspeak:
+    def __init__(self, args, stdin, stdout, stderr):
+        self.args = args
+        self.returncode = 0
+
+    def communicate(self, data):
+        return b"RIFF" + data, b""
+
+
+class FakePiperStdin(io.BytesIO):
+    def __init__(self, process):
+        super().__init__()
+        self.process = process
+
+    def flush(self):
+        # Answer every complete request line like Piper does
+        for line in self.getvalue().splitlines():
+            request = json.loads(line)
+            with open(request["output_file"], "wb") as fh:
+                fh.write(b"RIFF" + request["text"].encode())
+            self.process.stdout.lines.append(request["output_file"] + "\n")
+        self.seek(0)
+        self.truncate()
+
+
+class FakePiperStdout:
+    def __init__(self):
+        self.lines = []
+
+    def readline(self):
+        return self.lines.pop(0).encode() if self.lines else b""
+
+
+class FakePiper:
+    started = []
+
+    def __init__(self, args, stdin, stdout, stderr):
+        self.args = args
+        self.stdin = FakePiperStdin(self)
+        self.stdout = FakePiperStdout()
+        self.closed = False
+        FakePiper.started.append(self)
+
+    def wait(self, timeout):
+        self.closed = True
+
+    def kill(self):
+        self.closed = True
+
+
+def test_espeak_synthesizes_from_stdin():
+    calls = []
+
+    def popen(args, **kwargs):
+        calls.append(args)
+        return FakeEspeak(args, **kwargs)
+
+    provider = LocalTtsAudioProvider(
+        "espeak-ng", "de", executable=EXECUTABLE, popen=popen
+    )
+
+    assert provider.get_audio("Der Hund bellt.") == b"RIFFDer Hund bellt."
+    assert calls[0][1:] == ["-v", "de", "--stdin", "--stdout"]
+    assert provider.get_file_name("hund") == "hund_espeakng.wav"
+    assert provider.cache_namespace == "espeak-ng:de"
+
+def test_espeak_failure_is_reported():
+    class FailingEspeak(FakeEspeak):
+        def communicate(self, data):
+            self.returncode = 1
+            return b"", b"unknown voice"
+
+    provider = LocalTtsAudioProvider(
+        "espeak-ng", "xx", executable=EXECUTABLE, popen=FailingEspeak
+    )
+    with pytest.raises(RuntimeError, match="unknown voice"):
+        provider.get_audio("Hallo")
+
+def test_piper_reuses_running_processes():
+    FakePiper.started = []
+    provider = LocalTtsAudioProvider(
+        "piper", "/voices/de_DE-thorsten.onnx", executable=EXECUTABLE,
+        workers=2, popen=FakePiper,
+    )
+
+    texts = [f"Satz {i}" for i in range(20)]
+    results = {}
+
+    def synthesize(text):
+        results[text] = provider.get_audio(text)
+
+    threads = [threading.Thread(target=synthesize, args=(t,)) for t in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {t: b"RIFF" + t.encode() for t in texts}
+    assert 1 <= len(FakePiper.started) <= 2
+    assert "--json-input" in FakePiper.started[0].args
+    assert provider.cache_namespace == "piper:de_DE-thorsten.onnx"
+
+    provider.close()
+    assert all(process.closed for process in FakePiper.started)
+
+def test_piper_replaces_crashed_process():
+    FakePiper.started = []
+    provider = LocalTtsAudioProvider(
+        "piper", "model.onnx", executable=EXECUTABLE, workers=1, popen=FakePiper
+    )
+    provider.get_audio("eins")
+    # Simulate Piper exiting without answering
+    FakePiper.started[0].stdin.flush = lambda: None
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        provider.get_audio("zwei")
+    assert provider.get_audio("drei") == b"RIFFdrei"
+    assert len(FakePiper.started) == 2
+
+def test_piper_failure_does_not_block_waiting_callers():
+    FakePiper.started = []
+    provider = LocalTtsAudioProvider(
+        "piper", "model.onnx", executable=EXECUTABLE, workers=1, popen=FakePiper
+    )
+    provider.get_audio("eins")
+    release = threading.Event()
+
+    def crash():
+        # Piper exits while a second caller waits for the only process
+        release.wait()
+
+    FakePiper.started[0].stdin.flush = crash
+    errors = []
+    results = []
+
+    def synthesize(text, into):
+        try:
+            into.append(provider.get_audio(text))
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    first = threading.Thread(
+        target=synthesize, args=("zwei", results), daemon=True
+    )
+    first.start()
+    second = threading.Thread(
+        target=synthesize, args=("drei", results), daemon=True
+    )
+    second.start()
+    second.join(timeout=0.05)
+    release.set()
+    first.join(timeout=5)
+    second.join(timeout=5)
+
+    assert not first.is_alive() and not second.is_alive()
+    assert len(errors) == 1
+    assert results in ([b"RIFFzwei"], [b"RIFFdrei"])
+    assert len(FakePiper.started) == 2
+
+def test_piper_close_stops_busy_processes_when_done():
+    FakePiper.started = []
+    provider = LocalTtsAudioProvider(
+        "piper", "model.onnx", executable=EXECUTABLE, workers=1, popen=FakePiper
+    )
+    provider.get_audio("eins")
+    process = FakePiper.started[0]
+    answer = process.stdin.flush
+
+    def close_while_busy():
+        provider.close()
+        assert not process.closed
+        answer()
+
+    process.stdin.flush = close_while_busy
+
+    assert provider.get_audio("zwei") == b"RIFFzwei"
+    assert process.closed
+
+def test_missing_program_is_reported():
+    with pytest.raises(FileNotFoundError):
+        LocalTtsAudioProvider("espeak-ng", "de", executable="no-such-tts-program")
+    with pytest.raises(ValueError):
+        LocalTtsAudioProvider("festival", "de", executable=EXECUTABLE)
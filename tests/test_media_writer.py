@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.fakes import FakeMedia, load_plugin_module
+
+MediaWriter = load_plugin_module("media_writer").MediaWriter
+
+
+def test_identical_content_is_written_once(tmp_path):
+    (tmp_path / "on_disk.mp3").write_bytes(b"old")
+    media = FakeMedia(str(tmp_path))
+    writer = MediaWriter(media)
+
+    writer.write("a.mp3", b"a")
+    writer.write("a.mp3", b"a")
+    writer.write("on_disk.mp3", b"old")
+
+    assert media.writes == ["a.mp3"]
+
+
+def test_changed_content_replaces_the_file(tmp_path):
+    (tmp_path / "a.mp3").write_bytes(b"old")
+    media = FakeMedia(str(tmp_path))
+    writer = MediaWriter(media)
+
+    writer.write("a.mp3", b"new")
+
+    assert media.trashed == ["a.mp3"]
+    assert (tmp_path / "a.mp3").read_bytes() == b"new"
+
+
+def test_foreground_errors_are_raised(tmp_path):
+    writer = MediaWriter(FakeMedia(str(tmp_path)))
+
+    with pytest.raises(OSError):
+        writer.write("readonly.mp3", b"a")
+
+
+def test_background_errors_are_collected(tmp_path):
+    media = FakeMedia(str(tmp_path))
+    writer = MediaWriter(media, background=True)
+    done = []
+
+    writer.write("readonly.mp3", b"a")
+    writer.write("b.mp3", b"b")
+    writer.after_writes(lambda: done.append(list(media.writes)))
+    writer.after_writes(lambda: 1 / 0)
+
+    errors = writer.flush()
+    assert errors == ["readonly.mp3: read-only", "division by zero"]
+    assert done == [["b.mp3"]]
+    assert writer.flush() == []
+
+
+def test_close_stops_the_worker(tmp_path):
+    writer = MediaWriter(FakeMedia(str(tmp_path)), background=True)
+    writer.write("a.mp3", b"a")
+
+    assert writer.close() == []
+    assert (tmp_path / "a.mp3").read_bytes() == b"a"
+    # A stopped executor refuses new work
+    with pytest.raises(RuntimeError):
+        writer.write("b.mp3", b"b")
@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.fakes import load_plugin_module
+
+NoteIdIndex = load_plugin_module("note_index").NoteIdIndex
+
+MODEL = {
+    "id": 7,
+    "flds": [{"name": "term", "ord": 0}, {"name": "sentence", "ord": 1}],
+}
+
+
+class FakeDb:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    def all(self, sql, model_id):
+        self.queries += 1
+        return [(note_id, fields) for note_id, mid, fields in self.rows
+                if mid == model_id]
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.db = FakeDb(rows)
+
+
+def test_index_is_built_with_one_query():
+    col = FakeCollection([
+        (1, 7, "hund\x1fS1"),
+        (2, 7, "katze\x1fS2"),
+        (3, 7, "hund\x1fS3"),
+        (4, 8, "hund\x1fS4"),
+    ])
+
+    index = NoteIdIndex(col, MODEL, "term")
+
+    assert index.find("hund") == [1, 3]
+    assert index.find("katze") == [2]
+    assert index.find("maus") == []
+    assert col.db.queries == 1
+
+
+def test_index_is_updated_incrementally():
+    index = NoteIdIndex(FakeCollection([(1, 7, "hund\x1fS1")]), MODEL, "term")
+
+    index.add("maus", 5)
+    index.remove([1, 42])
+
+    assert index.find("hund") == []
+    assert index.find("maus") == [5]
+
+
+def test_index_of_unknown_field_is_empty():
+    col = FakeCollection([(1, 7, "hund\x1fS1")])
+
+    index = NoteIdIndex(col, MODEL, "missing")
+
+    assert index.find("hund") == []
+    assert col.db.queries == 0
+
+
+def test_is_current_compares_collection_and_model():
+    col = FakeCollection([])
+    index = NoteIdIndex(col, MODEL, "term")
+
+    assert index.is_current(col, MODEL)
+    assert not index.is_current(FakeCollection([]), MODEL)
+    assert not index.is_current(col, {**MODEL, "id": 8})
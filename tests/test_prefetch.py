@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.german_card import GermanCard
+from core.prefetch import Prefetch
+from core.vocab_provider import VocabItem
+
+
+class DummyProvider:
+    def __init__(self):
+        self.calls = 0
+
+    def get_vocab(self, term, context: str = "") -> VocabItem:
+        self.calls += 1
+        return VocabItem(
+            term=term,
+            term_translation=f"{term}_t{self.calls}",
+            sentence=f"S {term}",
+            sentence_translation=f"ST {term}",
+        )
+
+class DummyAudioProvider:
+    def __init__(self):
+        self.calls = []
+
+    def get_audio(self, text: str) -> bytes:
+        self.calls.append(text)
+        return text.encode()
+
+    def get_file_name(self, base: str) -> str:
+        return f"{base}_dummy.mp3"
+
+
+def test_take_returns_result_for_same_key_once():
+    prefetch = Prefetch(("Hund", ""), lambda is_cancelled: "card")
+
+    future = prefetch.take(("Hund", ""))
+
+    assert future.result(timeout=5) == "card"
+    assert prefetch.take(("Hund", "")) is None
+
+
+def test_take_with_other_key_cancels():
+    release = threading.Event()
+    seen = []
+
+    def compute(is_cancelled):
+        release.wait(5)
+        seen.append(is_cancelled())
+        return "card"
+
+    prefetch = Prefetch(("Hund", ""), compute)
+    assert prefetch.take(("Hund", "edited context")) is None
+    release.set()
+
+    assert prefetch.cancelled
+    assert prefetch.take(("Hund", "")) is None
+    prefetch._future.result(timeout=5)
+    assert seen == [True]
+
+
+def test_cancelled_card_generation_skips_sentence_audio():
+    audio = DummyAudioProvider()
+    release = threading.Event()
+
+    class SlowProvider(DummyProvider):
+        def get_vocab(self, term, context: str = "") -> VocabItem:
+            release.wait(5)
+            return super().get_vocab(term, context)
+
+    prefetch = Prefetch(
+        ("Hund", ""),
+        lambda is_cancelled: GermanCard.create_from_user_input(
+            "Hund", "", SlowProvider(), audio, is_cancelled=is_cancelled
+        ),
+    )
+    prefetch.cancel()
+    release.set()
+
+    error = prefetch._future.exception(timeout=5)
+    assert str(error) == "Cancelled"
+    assert "S Hund" not in audio.calls
+
+
+def test_prefetched_card_is_complete():
+    prefetch = Prefetch(
+        ("Hund", ""),
+        lambda is_cancelled: GermanCard.create_from_user_input(
+            "Hund", "", DummyProvider(), DummyAudioProvider(),
+            is_cancelled=is_cancelled,
+        ),
+    )
+
+    card = prefetch.take(("Hund", "")).result(timeout=5)
+
+    assert card.get_audio_data() == b"S Hund"
+    assert card.get_term_audio_data() == b"Hund"
@@ -0,0 +1,49 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from tests.fakes import load_plugin_module
+
+ProviderRegistry = load_plugin_module("providers").ProviderRegistry
+
+# Any existing program will do, no process is started
+LOCAL = {"audio_engine": "espeak-ng", "local_tts_executable": sys.executable}
+
+
+def test_audio_config_error():
+    assert ProviderRegistry.audio_config_error({}) is None
+    assert ProviderRegistry.audio_config_error(LOCAL) is None
+    assert "festival" in ProviderRegistry.audio_config_error(
+        {"audio_engine": "festival"}
+    )
+    assert "local_tts_voice" in ProviderRegistry.audio_config_error(
+        {**LOCAL, "audio_engine": "piper"}
+    )
+    assert "no-such-tts" in ProviderRegistry.audio_config_error(
+        {**LOCAL, "local_tts_executable": "no-such-tts"}
+    )
+
+
+def test_replaced_local_audio_provider_is_closed(tmp_path):
+    registry = ProviderRegistry(str(tmp_path))
+    first = registry.audio_provider(LOCAL).provider
+
+    second = registry.audio_provider({**LOCAL, "local_tts_voice": "de+f2"}).provider
+    assert first is not second
+    assert first._closed and not second._closed
+
+    registry.invalidate()
+    assert second._closed
+
+
+def test_replaced_vocab_provider_is_closed(tmp_path):
+    registry = ProviderRegistry(str(tmp_path))
+    config = {"openai_api_key": "key", "target_language": "English"}
+    first = registry.vocab_provider(config)
+
+    second = registry.vocab_provider({**config, "target_language": "French"})
+    assert first._closed and not second._closed
+
+    registry.invalidate()
+    assert second._closed
@@ -0,0 +1,222 @@
+import os
+import random
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.openai_vocab_provider import OpenaiVocabProvider
+from core.request_scheduler import RequestScheduler, is_retryable, retry_after
+
+
+class FakeTime:
+    """Clock whose sleep advances time instantly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(headers or {})
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def make_scheduler(fake_time, **kwargs):
+    return RequestScheduler(
+        clock=fake_time.clock,
+        sleep=fake_time.sleep,
+        rng=random.Random(0),
+        **kwargs,
+    )
+
+
+def test_is_retryable():
+    assert is_retryable(FakeStatusError(429))
+    assert is_retryable(FakeStatusError(503))
+    assert not is_retryable(FakeStatusError(400))
+    assert is_retryable(APIConnectionError())
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(ValueError())
+
+def test_retry_after_header():
+    assert retry_after(FakeStatusError(429, {"retry-after": "7"}), 0) == 7
+    assert retry_after(FakeStatusError(429, {"retry-after-ms": "250"}), 0) == 0.25
+    assert retry_after(FakeStatusError(429), 0) is None
+    assert retry_after(ValueError(), 0) is None
+
+def test_requests_per_minute_budget():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time, requests_per_minute=2)
+    starts = [scheduler.run(fake_time.clock) for _ in range(5)]
+
+    assert starts == [0, 0, 60, 60, 120]
+    metrics = scheduler.metrics()
+    assert metrics.requests == 5
+    assert metrics.throttled == 2
+    assert metrics.max_wait == 60
+
+def test_tokens_per_minute_budget_uses_actual_usage():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time, tokens_per_minute=1000)
+
+    # The estimate would fill the budget, the reported usage does not
+    scheduler.run(lambda: 100, tokens=900, usage=lambda used: used)
+    assert scheduler.run(fake_time.clock, tokens=800) == 0
+    assert scheduler.run(fake_time.clock, tokens=500) == 60
+
+def test_oversized_request_runs_alone():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time, tokens_per_minute=100)
+    assert scheduler.run(fake_time.clock, tokens=500) == 0
+    assert scheduler.run(fake_time.clock, tokens=10) == 60
+
+def test_retries_with_backoff():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time, base_delay=1.0)
+    errors = [FakeStatusError(500), FakeStatusError(502)]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert scheduler.run(call) == "ok"
+    assert len(fake_time.sleeps) == 2
+    # Full jitter stays below the exponential cap
+    assert 0 <= fake_time.sleeps[0] <= 1
+    assert 0 <= fake_time.sleeps[1] <= 2
+    assert scheduler.metrics().retries == 2
+
+def test_retry_after_pauses_all_requests():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time)
+    errors = [FakeStatusError(429, {"retry-after": "30"})]
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return fake_time.clock()
+
+    assert scheduler.run(call) >= 30
+    assert fake_time.sleeps[0] >= 30
+
+def test_gives_up_after_max_retries():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time, max_retries=2)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise FakeStatusError(429)
+
+    with pytest.raises(FakeStatusError):
+        scheduler.run(call)
+    assert len(calls) == 3
+    assert scheduler.metrics().failures == 1
+
+def test_non_retryable_error_is_raised_immediately():
+    fake_time = FakeTime()
+    scheduler = make_scheduler(fake_time)
+    with pytest.raises(FakeStatusError):
+        scheduler.run(lambda: (_ for _ in ()).throw(FakeStatusError(401)))
+    assert fake_time.sleeps == []
+
+def test_concurrency_is_bounded():
+    scheduler = RequestScheduler(max_concurrency=2)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def call():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    threads = [threading.Thread(target=scheduler.run, args=(call,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 2
+    metrics = scheduler.metrics()
+    assert metrics.requests == 6
+    assert metrics.queue_depth == 0
+    assert metrics.in_flight == 0
+
+
+class FlakyCompletions:
+    def __init__(self, content, failures):
+        self.content = content
+        self.failures = failures
+        self.calls = 0
+
+    def create(self, model, messages, temperature, stream=False):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+
+        class _Message:
+            content = self.content
+
+        class _Choice:
+            message = _Message()
+
+        class _Usage:
+            total_tokens = 42
+
+        class _Response:
+            choices = [_Choice()]
+            usage = _Usage()
+
+        return _Response()
+
+
+class FlakyOpenAI:
+    def __init__(self, completions):
+        self.api_key = None
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+def test_openai_provider_retries_rate_limits():
+    json_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    completions = FlakyCompletions(json_resp, [FakeStatusError(429)])
+    fake_time = FakeTime()
+    provider = OpenaiVocabProvider(
+        "test",
+        "English",
+        openai_client=FlakyOpenAI(completions),
+        scheduler=make_scheduler(fake_time, tokens_per_minute=10000),
+    )
+
+    assert provider.get_vocab("Hund").term == "der Hund"
+    assert completions.calls == 2
+    assert provider.scheduler.metrics().retries == 1
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.single_flight import SingleFlight
+
+
+def _run_concurrently(flight, key, call, callers=5):
+    results = []
+    errors = []
+
+    def worker():
+        try:
+            results.append(flight.do(key, call))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "audio"
+
+    threads, results, errors = _run_concurrently(flight, "key", call)
+    while flight.shared < 4:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["audio"] * 5
+    assert not errors
+    assert len(calls) == 1
+    assert (flight.calls, flight.shared) == (1, 4)
+
+
+def test_error_is_shared_and_next_call_runs_again():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise ValueError("boom")
+
+    threads, results, errors = _run_concurrently(flight, "key", fail, callers=3)
+    while flight.shared < 2:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert not results
+    assert [str(e) for e in errors] == ["boom"] * 3
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.calls == 2
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.shared == 0
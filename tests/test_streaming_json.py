@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core.streaming_json import StreamingJsonObject, extract_json
+
+
+def test_fields_complete_one_by_one():
+    text = (
+        '```json\n{"term": "der Hund, -e", "count": 12, '
+        '"sentence": "Er sagt \\"Hallo\\".", "tags": ["a", "b"]}\n```'
+    )
+    parser = StreamingJsonObject()
+    completed = []
+    for char in text:
+        completed.extend(parser.feed(char).items())
+
+    assert completed == [
+        ("term", "der Hund, -e"),
+        ("count", 12),
+        ("sentence", 'Er sagt "Hallo".'),
+        ("tags", ["a", "b"]),
+    ]
+    assert parser.text == text
+
+def test_incomplete_string_is_not_reported():
+    parser = StreamingJsonObject()
+    assert parser.feed('{"term": "der Hu') == {}
+    assert parser.feed('nd", "sen') == {"term": "der Hund"}
+    assert parser.fields == {"term": "der Hund"}
+
+
+def test_extract_json_ignores_surrounding_text():
+    assert extract_json('Sure: ```json\n{"a": [1, 2]}\n``` done') == {"a": [1, 2]}
+    assert extract_json('Note {not json} then [{"index": 0}]') == [{"index": 0}]
+    try:
+        extract_json("no json here {")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected ValueError")
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from core import tracing
+from core.cached_audio_provider import CachedAudioProvider
+
+
+@pytest.fixture(autouse=True)
+def tracing_off():
+    yield
+    tracing.configure(False)
+
+
+class DummyAudioProvider:
+    def get_audio(self, text):
+        return text.encode()
+
+    def get_file_name(self, base):
+        return f"{base}.mp3"
+
+
+def test_disabled_span_is_a_shared_noop():
+    assert tracing.tracer() is None
+    with tracing.span("stage", size=1) as first:
+        first.set(bytes=3)
+    assert tracing.span("other") is first
+
+def test_spans_are_summarized_and_logged(tmp_path):
+    log_path = str(tmp_path / "trace.jsonl")
+    tracer = tracing.configure(True, log_path)
+    with tracing.span("outer"):
+        with tracing.span("inner", chars=5) as inner:
+            inner.set(bytes=10)
+    with pytest.raises(ValueError):
+        with tracing.span("inner"):
+            raise ValueError("boom")
+
+    summary = {stage.name: stage for stage in tracer.summary()}
+    assert summary["inner"].count == 2
+    assert summary["outer"].count == 1
+    assert summary["inner"].p50 <= summary["inner"].p95
+
+    with open(log_path, encoding="utf-8") as fh:
+        records = [json.loads(line) for line in fh]
+    assert [r["span"] for r in records] == ["inner", "outer", "inner"]
+    assert records[0]["parent"] == "outer"
+    assert records[0]["bytes"] == 10
+    assert records[2]["error"] == "ValueError"
+
+def test_configure_keeps_tracer_for_same_log(tmp_path):
+    log_path = str(tmp_path / "trace.jsonl")
+    tracer = tracing.configure(True, log_path)
+    assert tracing.configure(True, log_path) is tracer
+    assert tracing.configure(True, None) is not tracer
+
+def test_log_rolls_over(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    log = tracing.RollingJsonlLog(path, max_bytes=100, backups=1)
+    for i in range(10):
+        log.write({"span": "stage", "i": i})
+
+    assert os.path.getsize(path) <= 100
+    assert os.path.exists(path + ".1")
+    assert not os.path.exists(path + ".2")
+
+def test_audio_cache_records_hits(tmp_path):
+    tracer = tracing.configure(True)
+    cache = CachedAudioProvider(DummyAudioProvider(), str(tmp_path))
+    cache.get_audio("Hallo")
+    cache.get_audio("Hallo")
+
+    stages = {stage.name: stage.count for stage in tracer.summary()}
+    assert stages == {"audio.cache": 2}
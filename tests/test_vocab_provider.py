@@ -1,23 +1,31 @@
 import os
 import sys
+import threading
+from string import Template
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from core.openai_vocab_provider import OpenaiVocabProvider
-from core.vocab_provider import VocabItem
+from core.vocab_provider import BatchVocabError, VocabItem
 
 
 class FakeCompletions:
     def __init__(self, content):
+        # A list of contents is returned one per call
         self.content = content
         self.last_args = None
+        self.calls = 0
 
-    def create(self, model, messages, temperature):
+    def create(self, model, messages, temperature, stream=False, **kwargs):
+        self.calls += 1
         self.last_args = {
             "model": model,
             "messages": messages,
             "temperature": temperature,
+            **kwargs,
         }
+        if stream:
+            return _stream_chunks(self.content)
         # Simulate OpenAI response object structure
         class _Message:
             def __init__(self, c):
@@ -28,9 +36,27 @@ class FakeCompletions:
         class _Response:
             def __init__(self, c):
                 self.choices = [_Choice(c)]
+        if isinstance(self.content, list):
+            return _Response(self.content.pop(0))
         return _Response(self.content)
 
 
+def _stream_chunks(content, size=3):
+    class _Delta:
+        def __init__(self, c):
+            self.content = c
+    class _Choice:
+        def __init__(self, c):
+            self.delta = _Delta(c)
+    class _Chunk:
+        def __init__(self, c):
+            self.choices = [_Choice(c)]
+    for i in range(0, len(content), size):
+        yield _Chunk(content[i:i + size])
+    # Final chunk carries no content
+    yield _Chunk(None)
+
+
 class FakeChat:
     def __init__(self, content):
         self.completions = FakeCompletions(content)
@@ -57,3 +83,291 @@ def test_get_vocab():
     system_msg = fake_client.chat.completions.last_args["messages"][0]["content"]
     assert "English" in system_msg
 
+
+def test_get_vocab_batch():
+    json_resp = (
+        '[{"index":1,"term":"laufen","term_translation":"to run",'
+        '"sentence":"Ich laufe.","sentence_translation":"I run."},'
+        '{"index":0,"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."}]'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+    data = provider.get_vocab_batch([("Hund", ""), ("laufen", "im Park")])
+
+    assert [item.term for item in data] == ["der Hund", "laufen"]
+    assert fake_client.chat.completions.calls == 1
+    user_msg = fake_client.chat.completions.last_args["messages"][2]["content"]
+    assert '"term": "Hund"' in user_msg
+    assert '"context": "im Park"' in user_msg
+
+def test_get_vocab_batch_falls_back_for_invalid_items():
+    batch_resp = (
+        '[{"index":0,"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."},'
+        '{"index":1,"term":"laufen"}]'
+    )
+    single_resp = (
+        '{"term":"laufen","term_translation":"to run","sentence":"Ich laufe."'
+        ',"sentence_translation":"I run."}'
+    )
+    fake_client = FakeOpenAI([batch_resp, single_resp])
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+    data = provider.get_vocab_batch([("Hund", ""), ("laufen", "")])
+
+    assert data[0].term == "der Hund"
+    assert data[1].sentence == "Ich laufe."
+    assert fake_client.chat.completions.calls == 2
+
+def test_get_vocab_batch_falls_back_on_unparsable_response():
+    single_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    fake_client = FakeOpenAI(["not json", single_resp])
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+    data = provider.get_vocab_batch([("Hund", "")])
+
+    assert data[0].term == "der Hund"
+    assert fake_client.chat.completions.calls == 2
+
+def test_cache_namespace_depends_on_language_and_model():
+    client = FakeOpenAI("{}")
+    english = OpenaiVocabProvider("test", "English", openai_client=client)
+    russian = OpenaiVocabProvider("test", "Russian", openai_client=client)
+    gpt4 = OpenaiVocabProvider("test", "English", model="gpt-4", openai_client=client)
+    local = OpenaiVocabProvider(
+        "", "English", base_url="http://llm.lan:8080/v1", openai_client=client
+    )
+
+    assert english.cache_namespace == english.cache_namespace
+    assert english.cache_namespace != russian.cache_namespace
+    assert english.cache_namespace != gpt4.cache_namespace
+    assert english.cache_namespace != local.cache_namespace
+
+def test_cache_namespace_depends_on_repair_prompt():
+    provider = OpenaiVocabProvider("test", "English", openai_client=FakeOpenAI("{}"))
+    before = provider.cache_namespace
+
+    provider._repair_template = Template("Only return $fields for $term.")
+
+    assert provider.cache_namespace != before
+
+def test_get_vocab_stream_reports_fields_in_order():
+    json_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+    updates = []
+
+    data = provider.get_vocab_stream("Hund", "", updates.append)
+
+    assert data == VocabItem("der Hund", "dog", "Der Hund bellt.", "The dog barks.")
+    assert [u.term for u in updates] == ["der Hund"] * 4
+    assert [u.sentence for u in updates] == ["", ""] + ["Der Hund bellt."] * 2
+    assert updates[-1] == data
+
+
+def test_get_vocab_extracts_json_from_surrounding_text():
+    json_resp = (
+        'Here is the card:\n```json\n{"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."}\n```'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+
+    data = provider.get_vocab("Hund")
+
+    assert data == VocabItem("der Hund", "dog", "Der Hund bellt.", "The dog barks.")
+    assert fake_client.chat.completions.calls == 1
+
+def test_get_vocab_repairs_only_missing_fields():
+    incomplete = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."}'
+    )
+    fake_client = FakeOpenAI([incomplete, '{"sentence_translation":"The dog barks."}'])
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="strict"
+    )
+
+    data = provider.get_vocab("Hund")
+
+    assert data == VocabItem("der Hund", "dog", "Der Hund bellt.", "The dog barks.")
+    args = fake_client.chat.completions.last_args
+    assert args["messages"][-2] == {"role": "assistant", "content": incomplete}
+    assert '"sentence_translation"' in args["messages"][-1]["content"]
+    schema = args["response_format"]["json_schema"]["schema"]
+    assert schema["required"] == ["sentence_translation"]
+
+def test_get_vocab_does_not_repair_without_structured_output():
+    fake_client = FakeOpenAI(['{"term":"der Hund"}'])
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+
+    try:
+        provider.get_vocab("Hund")
+    except ValueError as exc:
+        assert "term_translation" in str(exc)
+    else:
+        raise AssertionError("Expected ValueError")
+    assert fake_client.chat.completions.calls == 1
+
+def test_get_vocab_raises_when_repair_fails():
+    fake_client = FakeOpenAI(["no json at all", '{"term":"der Hund"}'])
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="json"
+    )
+
+    try:
+        provider.get_vocab("Hund")
+    except ValueError as exc:
+        assert "term_translation" in str(exc)
+    else:
+        raise AssertionError("Expected ValueError")
+    assert fake_client.chat.completions.calls == 2
+
+def test_structured_output_falls_back_when_unsupported():
+    class UnsupportedFormat(Exception):
+        status_code = 400
+
+    json_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    completions = fake_client.chat.completions
+    formats = []
+    create = completions.create
+
+    def picky_create(**kwargs):
+        response_format = kwargs.get("response_format")
+        formats.append(response_format and response_format["type"])
+        if response_format and response_format["type"] == "json_schema":
+            raise UnsupportedFormat("response_format json_schema is not supported")
+        return create(**kwargs)
+
+    completions.create = picky_create
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="strict"
+    )
+
+    assert provider.get_vocab("Hund").term == "der Hund"
+    assert provider.get_vocab("Hund").term == "der Hund"
+    assert formats == ["json_schema", "json_object", "json_object"]
+    assert provider.structured_output == "json"
+
+def test_concurrent_fallbacks_downgrade_structured_output_once():
+    class UnsupportedFormat(Exception):
+        status_code = 400
+
+    json_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    completions = fake_client.chat.completions
+    create = completions.create
+    # Both requests are sent in strict mode before either learns it fails
+    both_sent = threading.Barrier(2, timeout=5)
+    formats = []
+
+    def picky_create(**kwargs):
+        response_format = kwargs.get("response_format")
+        formats.append(response_format and response_format["type"])
+        if response_format and response_format["type"] == "json_schema":
+            both_sent.wait()
+            raise UnsupportedFormat("response_format json_schema is not supported")
+        return create(**kwargs)
+
+    completions.create = picky_create
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="strict"
+    )
+    threads = [
+        threading.Thread(target=provider.get_vocab, args=(term,))
+        for term in ("Hund", "Katze")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert provider.structured_output == "json"
+    assert sorted(formats) == ["json_object"] * 2 + ["json_schema"] * 2
+
+def test_get_vocab_batch_accepts_object_wrapping_the_items():
+    json_resp = (
+        '{"cards":[{"index":0,"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."}]}'
+    )
+    fake_client = FakeOpenAI(json_resp)
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="json"
+    )
+
+    data = provider.get_vocab_batch([("Hund", "")])
+
+    assert data[0].term == "der Hund"
+    assert fake_client.chat.completions.last_args["response_format"] == {
+        "type": "json_object"
+    }
+
+def test_get_vocab_stream_reports_repaired_item():
+    incomplete = '{"term":"der Hund","sentence":"Der Hund bellt."}'
+    fake_client = FakeOpenAI(incomplete)
+    provider = OpenaiVocabProvider(
+        "test", "English", openai_client=fake_client, structured_output="json"
+    )
+    fake_client.chat.completions.content = [
+        '{"term_translation":"dog","sentence_translation":"The dog barks."}'
+    ]
+    updates = []
+
+    def stream_then_repair(**kwargs):
+        if kwargs.get("stream"):
+            return _stream_chunks(incomplete)
+        return create(**kwargs)
+
+    create = fake_client.chat.completions.create
+    fake_client.chat.completions.create = stream_then_repair
+    data = provider.get_vocab_stream("Hund", "", updates.append)
+
+    assert data == VocabItem("der Hund", "dog", "Der Hund bellt.", "The dog barks.")
+    assert updates[-1] == data
+
+def test_get_vocab_batch_reports_failed_fallback_per_item():
+    batch_resp = (
+        '[{"index":0,"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."}]'
+    )
+    fake_client = FakeOpenAI([batch_resp, "no json", "still no json"])
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+
+    try:
+        provider.get_vocab_batch([("Hund", ""), ("laufen", "")])
+    except BatchVocabError as exc:
+        assert exc.items[0].term == "der Hund"
+        assert exc.items[1] is None
+        assert list(exc.errors) == [1]
+    else:
+        raise AssertionError("Expected BatchVocabError")
+
+def test_get_vocab_batch_rejects_duplicate_indices():
+    batch_resp = (
+        '[{"index":0,"term":"der Hund","term_translation":"dog",'
+        '"sentence":"Der Hund bellt.","sentence_translation":"The dog barks."},'
+        '{"index":0,"term":"laufen","term_translation":"to run",'
+        '"sentence":"Ich laufe.","sentence_translation":"I run."}]'
+    )
+    single_resp = (
+        '{"term":"der Hund","term_translation":"dog","sentence":"Der Hund bellt."'
+        ',"sentence_translation":"The dog barks."}'
+    )
+    fake_client = FakeOpenAI([batch_resp, single_resp])
+    provider = OpenaiVocabProvider("test", "English", openai_client=fake_client)
+
+    data = provider.get_vocab_batch([("Hund", "")])
+
+    assert data[0].term == "der Hund"
+    assert fake_client.chat.completions.calls == 2